@@ -0,0 +1,247 @@
+# bench.py
+# Reproducible benchmark suite for the lexer, parser and interpreter.
+# Every workload is generated deterministically, then the three phases are
+# timed separately: Lexer.tokenize(), Parser.parse() and Interpreter execution.
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench run --sizes small,medium --repeat 5 -o current.json
+#   python -m benchmarks.bench compare baseline.json current.json --threshold 10
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+from src.lexer import Lexer, TokenStream
+from src.my_parser import Parser
+from src.interpreter import Interpreter
+
+# Scale factor used by every workload for each named size
+SIZES = {
+    'small': 1,
+    'medium': 10,
+    'large': 100,
+}
+
+PHASES = ('lex', 'parse', 'exec')
+
+
+# === Workloads ===
+# Each workload takes a scale factor and returns program source text.
+
+def _balanced_expr(terms, rng):
+    """
+    Build a balanced arithmetic expression with the given number of terms.
+    Balanced nesting keeps recursion depth logarithmic in the number of terms.
+    """
+    if terms == 1:
+        return str(rng.randint(1, 9))
+    left = terms // 2
+    op = rng.choice('+-*')
+    return f"({_balanced_expr(left, rng)} {op} {_balanced_expr(terms - left, rng)})"
+
+def workload_arith(scale):
+    # One large arithmetic expression
+    rng = random.Random(1)
+    return f"x = {_balanced_expr(200 * scale, rng)};"
+
+def workload_nesting(scale):
+    # Deeply nested if blocks and parentheses, repeated scale times
+    depth = 40
+    inner = "y = " + "(" * depth + "1" + " + 1)" * depth + ";"
+    for level in range(depth):
+        inner = f"if (x > {level}) {{ {inner} }}"
+    return "x = 100;\n" + "\n".join([inner] * scale)
+
+def workload_while(scale):
+    # Long counting loop
+    return f"""
+    i = 0;
+    while (i < {2000 * scale}) {{
+        i = i + 1;
+    }}
+    """
+
+def workload_strings(scale):
+    # String building by repeated concatenation
+    return f"""
+    s = "";
+    i = 0;
+    while (i < {500 * scale}) {{
+        s = s + "ab";
+        i = i + 1;
+    }}
+    """
+
+def workload_printing(scale):
+    # Heavy printing; output is captured during the run
+    return f"""
+    i = 0;
+    while (i < {500 * scale}) {{
+        print "line " + "x" * 3;
+        print i;
+        i = i + 1;
+    }}
+    """
+
+def workload_rules(scale):
+    # Large generated rules file: many independent if/else rules
+    rng = random.Random(2)
+    lines = ['price = 12.5;', 'qty = 8;', 'region = "EU";', 'hits = 0;', 'misses = 0;']
+    for _ in range(100 * scale):
+        limit = rng.randint(10, 200)
+        region = rng.choice(['"EU"', '"US"', '"APAC"'])
+        lines.append(
+            f"if (price * qty > {limit} and region == {region}) "
+            f"{{ hits = hits + 1; }} else {{ misses = misses + 1; }}"
+        )
+    return "\n".join(lines)
+
+WORKLOADS = {
+    'arith': workload_arith,
+    'nesting': workload_nesting,
+    'while': workload_while,
+    'strings': workload_strings,
+    'printing': workload_printing,
+    'rules': workload_rules,
+}
+
+
+# === Measurement ===
+
+def time_phases(source):
+    """
+    Run source once and return a dict of phase name -> seconds.
+    Printed output is captured so terminal speed does not skew timings.
+    """
+    start = time.perf_counter()
+    lexer = Lexer(source)
+    tokens = lexer.tokenize()
+    lex = time.perf_counter() - start
+
+    start = time.perf_counter()
+    statements = Parser(TokenStream(tokens, lexer.lines)).parse()
+    parse = time.perf_counter() - start
+
+    interpreter = Interpreter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for stmt in statements:
+            interpreter.visit(stmt)
+        exec_ = time.perf_counter() - start
+
+    return {'lex': lex, 'parse': parse, 'exec': exec_}
+
+def summarize(samples):
+    # Summary statistics for a list of timings in seconds
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.mean(samples),
+        'max': max(samples),
+        'samples': samples,
+    }
+
+def run_suite(workloads=None, sizes=('small',), repeat=5, warmup=1, log=None):
+    """
+    Benchmark every workload at every size.
+    Returns a results dict suitable for json.dump() and compare_results().
+    """
+    workloads = workloads or list(WORKLOADS)
+    results = {}
+    for name in workloads:
+        for size in sizes:
+            source = WORKLOADS[name](SIZES[size])
+            for _ in range(warmup):
+                time_phases(source)
+            samples = {phase: [] for phase in PHASES}
+            for _ in range(repeat):
+                timings = time_phases(source)
+                for phase in PHASES:
+                    samples[phase].append(timings[phase])
+            key = f"{name}/{size}"
+            results[key] = {
+                'source_bytes': len(source),
+                'phases': {phase: summarize(samples[phase]) for phase in PHASES},
+            }
+            if log is not None:
+                medians = "  ".join(f"{phase}={results[key]['phases'][phase]['median'] * 1000:.3f}ms"
+                                    for phase in PHASES)
+                print(f"{key:<20} {medians}", file=log)
+    return {
+        'meta': {
+            'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'warmup': warmup,
+        },
+        'results': results,
+    }
+
+def compare_results(baseline, current, threshold=10.0):
+    """
+    Compare median phase timings of two result dicts.
+    Returns a list of (key, phase, baseline_s, current_s, percent_change, regressed)
+    rows for every workload/phase present in both.
+    """
+    rows = []
+    for key, entry in current['results'].items():
+        base_entry = baseline['results'].get(key)
+        if base_entry is None:
+            continue
+        for phase in PHASES:
+            old = base_entry['phases'][phase]['median']
+            new = entry['phases'][phase]['median']
+            change = (new - old) / old * 100 if old else 0.0
+            rows.append((key, phase, old, new, change, change > threshold))
+    return rows
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark the lexer, parser and interpreter.")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    run_cmd = commands.add_parser('run', help="run the benchmark suite")
+    run_cmd.add_argument('--workloads', default=','.join(WORKLOADS),
+                         help="comma-separated workload names (default: all)")
+    run_cmd.add_argument('--sizes', default='small', help="comma-separated sizes: " + ','.join(SIZES))
+    run_cmd.add_argument('--repeat', type=int, default=5, help="measured repetitions per workload")
+    run_cmd.add_argument('--warmup', type=int, default=1, help="unmeasured warmup runs per workload")
+    run_cmd.add_argument('-o', '--output', help="write JSON results to this file")
+
+    cmp_cmd = commands.add_parser('compare', help="compare results against a baseline")
+    cmp_cmd.add_argument('baseline')
+    cmp_cmd.add_argument('current')
+    cmp_cmd.add_argument('--threshold', type=float, default=10.0,
+                         help="percent slowdown reported as a regression (default: 10)")
+
+    args = arg_parser.parse_args(argv)
+
+    if args.command == 'run':
+        results = run_suite(args.workloads.split(','), args.sizes.split(','),
+                            args.repeat, args.warmup, log=sys.stdout)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = 0
+    for key, phase, old, new, change, regressed in compare_results(baseline, current, args.threshold):
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{key:<20} {phase:<6} {old * 1000:10.3f}ms -> {new * 1000:10.3f}ms  {change:+7.1f}%{flag}")
+        regressions += regressed
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# bench_checkpoint.py
+# Warm start from a checkpoint (src/checkpoint.py) against replaying the
+# setup script that built the state: a loop filling int, float and string
+# arrays plus a large string. Reports the replay time, the save and load
+# times, the load time of one variable picked out of the file, and the
+# checkpoint size. The restored state is checked against the replayed one.
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_checkpoint --elements 200000 --repeat 5
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+from src.program import Program
+from src.checkpoint import save_checkpoint, load_checkpoint
+
+SETUP = """
+ints = [];
+floats = [];
+words = [];
+i = 0;
+k = 0;
+while (i < n) {
+    append(ints, i * 3);
+    append(floats, i * 0.5);
+    k = k + 1;
+    if (k == 10) { append(words, "word"); k = 0; }
+    i = i + 1;
+}
+text = "ab" * n;
+func lookup(k) { return ints[k] + len(words); }
+"""
+
+
+def bench_checkpoint(elements, repeat):
+    """
+    Best-of-repeat seconds for replaying the setup, saving and loading
+    its checkpoint, and loading a single variable from it.
+    """
+    program = Program(SETUP)
+    variables = {'n': elements}
+    replay = lambda: program.run(variables=variables, output=io.StringIO())
+    state = replay()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "state.ckpt")
+        save = lambda: save_checkpoint(path, state.variables, state.functions, SETUP)
+        save()
+        checkpoint = load_checkpoint(path)
+        for name, value in state.variables.items():
+            if str(checkpoint.variables[name]) != str(value):
+                raise Exception(f"Checkpoint changed variable '{name}'")
+        results = {
+            'elements': elements,
+            'bytes': os.path.getsize(path),
+            'replay_seconds': min(timeit.repeat(replay, number=1, repeat=repeat)),
+            'save_seconds': min(timeit.repeat(save, number=1, repeat=repeat)),
+            'load_seconds': min(timeit.repeat(lambda: load_checkpoint(path), number=1, repeat=repeat)),
+            'load_one_seconds': min(timeit.repeat(lambda: load_checkpoint(path, names=['text']),
+                                                  number=1, repeat=repeat)),
+        }
+    results['speedup'] = results['replay_seconds'] / results['load_seconds']
+    return results
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark checkpoint warm starts.")
+    arg_parser.add_argument('--elements', type=int, default=200000,
+                            help="elements per array built by the setup (default 200000)")
+    arg_parser.add_argument('--repeat', type=int, default=5, help="measurements per timing (default 5)")
+    arg_parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = arg_parser.parse_args(argv)
+
+    results = bench_checkpoint(args.elements, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{results['elements']} elements, checkpoint of {results['bytes']} bytes")
+    print(f"replay setup:  {results['replay_seconds']:.4f}s")
+    print(f"save:          {results['save_seconds']:.4f}s")
+    print(f"load:          {results['load_seconds']:.4f}s  ({results['speedup']:.0f}x faster than replay)")
+    print(f"load one var:  {results['load_one_seconds']:.6f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# bench_expr_cache.py
+# Dependency-tracked expression cache (src/expr_cache.py): run time of a
+# loop whose body recomputes an expensive pure expression of variables that
+# change only now and then, compiled at optimize=2 and optimize=3, on the
+# recursive and stack engines. The cache hit rate of the optimize=3 run is
+# reported alongside.
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_expr_cache --repeat 5 --every 100
+
+import argparse
+import io
+import json
+import sys
+import timeit
+
+from src.program import Program
+
+def workload(every):
+    return f"""
+total = 0;
+i = 0;
+k = 0;
+while (i < n) {{
+    weight = (a * a + b * b) * (a - b) / (a + b) + (a * b - c) * (c + a * 3) - b / (c + 1);
+    total = total + weight * i;
+    k = k + 1;
+    if (k == {every}) {{
+        a = a + 1;
+        k = 0;
+    }}
+    i = i + 1;
+}}
+print total;
+"""
+
+VARIABLES = {'n': 20000, 'a': 7, 'b': 3, 'c': 11}
+
+
+def bench_expr_cache(repeat, every):
+    """
+    Best-of-repeat seconds per engine at optimize=2 and optimize=3, and the
+    optimize=3 cache stats. `every` is the number of iterations between
+    writes to a variable the cached expression reads.
+    """
+    source = workload(every)
+    plain = Program(source, optimize=2)
+    cached = Program(source, optimize=3)
+    rows = []
+    for engine in ('recursive', 'stack'):
+        row = {'engine': engine}
+        for name, program in (('O2', plain), ('O3', cached)):
+            run = lambda: program.run(variables=VARIABLES, output=io.StringIO(), engine=engine)
+            row[name] = min(timeit.repeat(run, number=1, repeat=repeat))
+        row['speedup'] = row['O2'] / row['O3']
+        row['cache'] = cached.run(variables=VARIABLES, output=io.StringIO(), engine=engine).expr_cache.stats()
+        rows.append(row)
+    return {
+        'report': repr(cached.report['expr_cache']),
+        'runs': rows,
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark the dependency-tracked expression cache.")
+    arg_parser.add_argument('--repeat', type=int, default=5, help="measurements per timing (default 5)")
+    arg_parser.add_argument('--every', type=int, default=100,
+                            help="iterations between changes to the cached expression's inputs (default 100)")
+    arg_parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = arg_parser.parse_args(argv)
+
+    results = bench_expr_cache(args.repeat, args.every)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(results['report'])
+    print(f"{'engine':<10} {'-O2':>10} {'-O3':>10} {'speedup':>8} {'hit rate':>9}")
+    for row in results['runs']:
+        print(f"{row['engine']:<10} {row['O2']:>9.4f}s {row['O3']:>9.4f}s {row['speedup']:>7.2f}x "
+              f"{row['cache']['hit_rate']:>8.1%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
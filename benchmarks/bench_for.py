@@ -0,0 +1,79 @@
+# bench_for.py
+# Counted for loop against the equivalent while loop:
+#   for (i = 0; n) { body }
+#   i = 0; while (i < n) { body i = i + 1; }
+# with an empty body (pure loop overhead) and with a small one, on each
+# engine and at optimisation levels 0 and 1. Both loops are checked to
+# leave the same globals.
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_for --iterations 200000 --repeat 5
+
+import argparse
+import io
+import json
+import sys
+import timeit
+
+from src.program import Program, ENGINES
+
+BODIES = {
+    'empty': "",
+    'small': "total = total + i * 2; ",
+}
+
+def loops(body):
+    # (for source, while source) for one loop body
+    for_loop = f"total = 0; for (i = 0; n) {{ {body}}}"
+    while_loop = f"total = 0; i = 0; while (i < n) {{ {body}i = i + 1; }}"
+    return for_loop, while_loop
+
+
+def bench_for(iterations, repeat, optimize_levels=(0, 1)):
+    """
+    Best-of-repeat seconds for the while and for versions of each body,
+    per engine and optimisation level.
+    """
+    variables = {'n': iterations}
+    rows = []
+    for body_name, body in BODIES.items():
+        for_source, while_source = loops(body)
+        for optimize in optimize_levels:
+            programs = {'while': Program(while_source, optimize=optimize),
+                        'for': Program(for_source, optimize=optimize)}
+            for engine in ENGINES:
+                results = {name: program.run(variables=variables, output=io.StringIO(), engine=engine).variables
+                           for name, program in programs.items()}
+                if dict(results['for']) != dict(results['while']):
+                    raise Exception(f"for and while loops disagree: {results}")
+                row = {'body': body_name, 'optimize': optimize, 'engine': engine}
+                for name, program in programs.items():
+                    run = lambda: program.run(variables=variables, output=io.StringIO(), engine=engine)
+                    row[name] = min(timeit.repeat(run, number=1, repeat=repeat))
+                row['speedup'] = row['while'] / row['for']
+                row['for_ns_per_iteration'] = row['for'] / iterations * 1e9
+                rows.append(row)
+    return {'iterations': iterations, 'runs': rows}
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark for loops against while loops.")
+    arg_parser.add_argument('--iterations', type=int, default=200000, help="loop trips (default 200000)")
+    arg_parser.add_argument('--repeat', type=int, default=5, help="measurements per timing (default 5)")
+    arg_parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = arg_parser.parse_args(argv)
+
+    results = bench_for(args.iterations, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{results['iterations']} iterations")
+    print(f"{'body':<6} {'-O':>2} {'engine':<10} {'while':>9} {'for':>9} {'speedup':>8} {'ns/iter':>8}")
+    for row in results['runs']:
+        print(f"{row['body']:<6} {row['optimize']:>2} {row['engine']:<10} {row['while']:>8.4f}s "
+              f"{row['for']:>8.4f}s {row['speedup']:>7.2f}x {row['for_ns_per_iteration']:>8.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# bench_fork.py
+# Benchmarks for copy-on-write interpreter forking (see src/environment.py):
+#   - fork cost compared with replaying the setup prelude on a fresh interpreter
+#   - variable lookup overhead through increasingly deep layer chains
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_fork --variables 1000 --repeat 5
+
+import argparse
+import json
+import sys
+import timeit
+
+from src.lexer import Lexer
+from src.my_parser import Parser
+from src.interpreter import Interpreter
+from src.environment import freeze
+
+
+def make_prelude(variables):
+    # Setup script assigning the given number of variables
+    return "\n".join(f"v{i} = {i} * 2 + 1;" for i in range(variables))
+
+def bench_fork_cost(variables, repeat):
+    """
+    Seconds per fork versus seconds per full prelude replay.
+    """
+    statements = Parser(Lexer(make_prelude(variables))).parse()
+
+    def replay():
+        interpreter = Interpreter()
+        for stmt in statements:
+            interpreter.visit(stmt)
+
+    base = Interpreter()
+    for stmt in statements:
+        base.visit(stmt)
+
+    number = 200
+    fork = min(timeit.repeat(base.fork, number=number, repeat=repeat)) / number
+    replay_time = min(timeit.repeat(replay, number=5, repeat=repeat)) / 5
+    return {'variables': variables, 'fork': fork, 'replay': replay_time}
+
+def bench_lookup_depth(depths, repeat):
+    """
+    Seconds per variable read when the variable lives in the bottom layer
+    of a chain of the given depth (layers are not flattened here).
+    """
+    # Leading literal: a statement starting with a bare identifier parses as
+    # a lone variable access
+    lookup = Parser(Lexer("0 + x + x + x + x + x + x + x + x")).parse()[0]
+    rows = []
+    for depth in depths:
+        interpreter = Interpreter()
+        interpreter.global_vars['x'] = 1
+        for level in range(depth - 1):
+            snap = freeze(interpreter.global_vars, max_layers=depth)
+            interpreter.global_vars = snap.new_environment()
+            interpreter.global_vars[f"layer{level}"] = level
+        number = 5000
+        seconds = min(timeit.repeat(lambda: interpreter.visit(lookup), number=number, repeat=repeat))
+        rows.append({'depth': depth, 'per_read': seconds / number / 8})
+    return rows
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark interpreter forking.")
+    arg_parser.add_argument('--variables', type=int, default=1000, help="variables set by the prelude")
+    arg_parser.add_argument('--depths', default='1,2,4,8,16,32', help="comma-separated chain depths")
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('-o', '--output', help="write JSON results to this file")
+    args = arg_parser.parse_args(argv)
+
+    fork = bench_fork_cost(args.variables, args.repeat)
+    print(f"fork:   {fork['fork'] * 1e6:10.2f}us  (prelude replay of {fork['variables']} "
+          f"variables: {fork['replay'] * 1e6:10.2f}us)")
+    depths = bench_lookup_depth([int(d) for d in args.depths.split(',')], args.repeat)
+    for row in depths:
+        print(f"depth {row['depth']:>3}: {row['per_read'] * 1e9:8.1f}ns per variable read")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'fork': fork, 'lookup': depths}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# bench_liveness.py
+# Early release of dead values (Program(liveness=True), see
+# release_dead_values() in src/optimizer.py): peak memory and run time of a
+# pipeline that builds a chain of large intermediate strings, each read
+# only by the next stage, with and without the liveness pass. Peak memory
+# is measured both by a MemoryAccountant (bytes held in globals) and by
+# tracemalloc (everything the run allocates). Both versions are checked to
+# print the same output.
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_liveness --size 1000000 --stages 8 --repeat 5
+
+import argparse
+import io
+import json
+import sys
+import timeit
+import tracemalloc
+
+from src.program import Program, ENGINES
+from src.limits import MemoryAccountant
+
+
+def pipeline(stages):
+    # Stage k derives s{k} from s{k-1}; only the lengths are printed
+    lines = ['s0 = "a" * size;']
+    for stage in range(1, stages + 1):
+        lines.append(f's{stage} = s{stage - 1} + "{stage % 10}";')
+        lines.append(f'n{stage} = len(s{stage});')
+    lines.append(f"print n{stages};")
+    return "\n".join(lines)
+
+
+def measure(program, variables, engine):
+    # (output, accounted peak bytes, traced peak bytes) of one run
+    output = io.StringIO()
+    accountant = MemoryAccountant()
+    tracemalloc.start()
+    try:
+        program.run(variables=variables, output=output, engine=engine, accountant=accountant)
+        traced = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return output.getvalue(), accountant.peak, traced
+
+
+def bench_liveness(size, stages, repeat):
+    """
+    Peak memory (bytes) and best-of-repeat seconds per engine, with and
+    without the liveness pass.
+    """
+    source = pipeline(stages)
+    variables = {'size': size}
+    programs = {'plain': Program(source), 'liveness': Program(source, liveness=True)}
+    rows = []
+    for engine in ENGINES:
+        row = {'engine': engine}
+        outputs = {}
+        for name, program in programs.items():
+            outputs[name], row[f'{name}_accounted'], row[f'{name}_traced'] = measure(program, variables, engine)
+            run = lambda: program.run(variables=variables, output=io.StringIO(), engine=engine)
+            row[f'{name}_seconds'] = min(timeit.repeat(run, number=1, repeat=repeat))
+        if outputs['plain'] != outputs['liveness']:
+            raise Exception(f"Liveness changed the output: {outputs}")
+        row['accounted_ratio'] = row['plain_accounted'] / row['liveness_accounted']
+        row['traced_ratio'] = row['plain_traced'] / row['liveness_traced']
+        rows.append(row)
+    return {'size': size, 'stages': stages, 'report': repr(programs['liveness'].report['liveness']),
+            'runs': rows}
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark early release of dead values.")
+    arg_parser.add_argument('--size', type=int, default=1000000, help="characters per string (default 1000000)")
+    arg_parser.add_argument('--stages', type=int, default=8, help="pipeline stages (default 8)")
+    arg_parser.add_argument('--repeat', type=int, default=5, help="measurements per timing (default 5)")
+    arg_parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = arg_parser.parse_args(argv)
+
+    results = bench_liveness(args.size, args.stages, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{results['stages']} stages of {results['size']} characters: {results['report']}")
+    print(f"{'engine':<10} {'accounted peak':>27} {'traced peak':>27} {'seconds':>19}")
+    for row in results['runs']:
+        print(f"{row['engine']:<10} {row['plain_accounted']:>10} -> {row['liveness_accounted']:>10} "
+              f"({row['accounted_ratio']:.1f}x) {row['plain_traced']:>10} -> {row['liveness_traced']:>10} "
+              f"({row['traced_ratio']:.1f}x) {row['plain_seconds']:.4f} -> {row['liveness_seconds']:.4f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
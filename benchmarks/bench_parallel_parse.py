@@ -0,0 +1,84 @@
+# bench_parallel_parse.py
+# Parallel front end (src/parallel_parse.py): wall time to lex and parse a
+# large generated program serially and with process pools of several sizes.
+# Every parallel result is checked against the serial statement list. The
+# time to find the chunk boundaries is reported separately.
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_parallel_parse --bytes 50000000 --workers 2,4,8
+#   python -m benchmarks.bench_parallel_parse --file big.txt --workers 4
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from src.lexer import Lexer
+from src.my_parser import Parser
+from src.parallel_parse import parse_parallel, split_source, DEFAULT_CHUNK_SIZE
+from benchmarks.generate import generate_program
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def bench_parallel_parse(source, workers_list, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Return the serial parse time and, per pool size, the parallel parse
+    time and speedup (seconds).
+    """
+    split_seconds, cuts = timed(split_source, source, chunk_size)
+    serial_seconds, expected = timed(lambda: Parser(Lexer(source)).parse())
+    expected = repr(expected)
+    rows = []
+    for workers in workers_list:
+        seconds, statements = timed(parse_parallel, source, workers=workers, chunk_size=chunk_size)
+        if repr(statements) != expected:
+            raise Exception(f"Parallel parse with {workers} workers differs from the serial parse")
+        rows.append({'workers': workers, 'seconds': seconds, 'speedup': serial_seconds / seconds})
+    return {
+        'bytes': len(source),
+        'chunks': len(cuts),
+        'split_seconds': split_seconds,
+        'serial_seconds': serial_seconds,
+        'parallel': rows,
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark parallel lexing and parsing.")
+    source_group = arg_parser.add_mutually_exclusive_group()
+    source_group.add_argument('--file', help="program to parse")
+    source_group.add_argument('--bytes', type=int, default=10000000,
+                              help="size of the generated program (default 10000000)")
+    arg_parser.add_argument('--seed', type=int, default=1, help="generator seed (default 1)")
+    arg_parser.add_argument('--workers', default=f"2,{os.cpu_count()}",
+                            help="comma-separated pool sizes (default: 2 and the CPU count)")
+    arg_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help=f"minimum characters per chunk (default {DEFAULT_CHUNK_SIZE})")
+    arg_parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = arg_parser.parse_args(argv)
+
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            source = f.read()
+    else:
+        source = generate_program(seed=args.seed, target_bytes=args.bytes)
+    workers_list = [int(value) for value in args.workers.split(',')]
+    results = bench_parallel_parse(source, workers_list, args.chunk_size)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{results['bytes']} bytes in {results['chunks']} chunks "
+          f"(boundaries found in {results['split_seconds']:.3f}s)")
+    print(f"serial: {results['serial_seconds']:.3f}s")
+    for row in results['parallel']:
+        print(f"{row['workers']:>3} workers: {row['seconds']:.3f}s  {row['speedup']:.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
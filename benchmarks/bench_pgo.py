@@ -0,0 +1,86 @@
+# bench_pgo.py
+# Profile-guided optimisation (src/profile_guided.py): run time of a script
+# whose hot operators type inference cannot prove (their operands come from
+# host variables), compiled with and without a recorded profile, on the
+# recursive and stack engines. Compile time with a large cold block is also
+# compared for the stack engine, which flattens cold blocks lazily.
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_pgo --repeat 5
+
+import argparse
+import io
+import json
+import sys
+import timeit
+
+from src.program import Program
+from src.profile_guided import record_profile
+
+COLD_STATEMENTS = 2000
+
+def workload(cold_statements=COLD_STATEMENTS):
+    cold = "".join(f"        total = total - {k} * scale + offset;\n" for k in range(cold_statements))
+    return f"""
+total = 0;
+i = 0;
+while (i < n) {{
+    x = i * scale + offset;
+    if (x > limit) {{
+        total = total - x / 3;
+    }} else {{
+        total = total + x * scale;
+    }}
+    if (total < 0 - 1000000000) {{
+{cold}    }}
+    i = i + 1;
+}}
+print total;
+"""
+
+VARIABLES = {'n': 5000, 'scale': 3, 'offset': 7, 'limit': 6000}
+
+
+def bench_pgo(repeat, optimize=1):
+    """
+    Best-of-repeat seconds per engine for a run of the workload with and
+    without its profile.
+    """
+    source = workload()
+    profile = record_profile(source, variables=VARIABLES, output=io.StringIO())
+    plain = Program(source, optimize=optimize)
+    guided = Program(source, optimize=optimize, profile=profile)
+    rows = []
+    for engine in ('recursive', 'stack'):
+        row = {'engine': engine}
+        for name, program in (('plain', plain), ('profiled', guided)):
+            run = lambda: program.run(variables=VARIABLES, output=io.StringIO(), engine=engine)
+            row[name] = min(timeit.repeat(run, number=1, repeat=repeat))
+        row['speedup'] = row['plain'] / row['profiled']
+        rows.append(row)
+    return {
+        'report': repr(guided.report['profile']),
+        'runs': rows,
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark profile-guided optimisation.")
+    arg_parser.add_argument('--repeat', type=int, default=5, help="measurements per timing (default 5)")
+    arg_parser.add_argument('-O', '--optimize', type=int, default=1, help="optimisation level (default 1)")
+    arg_parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = arg_parser.parse_args(argv)
+
+    results = bench_pgo(args.repeat, args.optimize)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(results['report'])
+    print(f"{'engine':<10} {'plain':>10} {'profiled':>10} {'speedup':>8}")
+    for row in results['runs']:
+        print(f"{row['engine']:<10} {row['plain']:>9.4f}s {row['profiled']:>9.4f}s {row['speedup']:>7.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# bench_positions.py
+# Overhead of source position tracking (see src/positions.py):
+#   - lexing with a position stamped on every token, against the same lexer
+#     without it (scan_token() called directly)
+#   - one-off cost of building the line index, and cost per offset lookup
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_positions --bytes 1000000 --repeat 3
+
+import argparse
+import json
+import random
+import sys
+import timeit
+
+from src.lexer import Lexer
+from src.my_token import TT_EOF
+from src.positions import LineIndex
+from benchmarks.generate import generate_program
+
+
+def lex_without_positions(source):
+    # The lexer as it was before tokens carried offsets
+    lexer = Lexer(source)
+    count = 0
+    while lexer.scan_token().type != TT_EOF:
+        count += 1
+    return count
+
+def lex_with_positions(source):
+    lexer = Lexer(source)
+    count = 0
+    while lexer.get_next_token().type != TT_EOF:
+        count += 1
+    return count
+
+def bench_positions(source, repeat, lookups=10000):
+    """
+    Return timings (seconds) for lexing with and without positions and for
+    the line index.
+    """
+    plain = min(timeit.repeat(lambda: lex_without_positions(source), number=1, repeat=repeat))
+    stamped = min(timeit.repeat(lambda: lex_with_positions(source), number=1, repeat=repeat))
+    build = min(timeit.repeat(lambda: LineIndex(source).line_col(0), number=1, repeat=repeat))
+
+    index = LineIndex(source)
+    index.line_col(0)
+    offsets = [random.Random(0).randrange(len(source)) for _ in range(lookups)]
+    lookup = min(timeit.repeat(lambda: [index.line_col(offset) for offset in offsets],
+                               number=1, repeat=repeat)) / lookups
+    return {
+        'source_bytes': len(source),
+        'tokens': lex_with_positions(source),
+        'lex_without_positions': plain,
+        'lex_with_positions': stamped,
+        'overhead_percent': (stamped - plain) / plain * 100,
+        'line_index_build': build,
+        'per_lookup': lookup,
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark source position tracking.")
+    arg_parser.add_argument('--bytes', type=int, default=1000000, help="generated source size (default 1000000)")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="measurements per timing (default 3)")
+    arg_parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = arg_parser.parse_args(argv)
+
+    results = bench_positions(generate_program(0, target_bytes=args.bytes), args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"source: {results['source_bytes']} bytes, {results['tokens']} tokens")
+    print(f"lex without positions: {results['lex_without_positions']:.4f}s")
+    print(f"lex with positions:    {results['lex_with_positions']:.4f}s "
+          f"({results['overhead_percent']:+.1f}%)")
+    print(f"line index build:      {results['line_index_build'] * 1000:.2f}ms")
+    print(f"offset lookup:         {results['per_lookup'] * 1e6:.2f}us")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+# bench_server.py
+# Load-test client for the server mode (src/server.py). Several connections
+# send run requests for one cached program as fast as the server answers,
+# and requests per second and latency percentiles are reported. With
+# --cold the same script is also run the old way, one fresh Python process
+# per run, for comparison.
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_server --spawn --workers 4 --connections 8 --requests 2000
+#   python -m benchmarks.bench_server --unix /tmp/interp.sock --connections 4
+#   python -m benchmarks.bench_server --spawn --cold 20
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from src.server import Client
+
+SCRIPT = """
+total = 0;
+i = 0;
+while (i < n) {
+    total = total + i * 3 - (i / 7);
+    i = i + 1;
+}
+print total;
+"""
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an ascending list
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def load_test(connect, connections, requests, source=SCRIPT, variables=None):
+    """
+    Send `requests` runs of source spread over `connections` connections,
+    each made by connect(). Returns a dict with throughput and latencies
+    (milliseconds).
+    """
+    variables = {'n': 200} if variables is None else variables
+    with connect() as client:
+        key = client.compile(source)['program']
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    counts = [requests // connections + (index < requests % connections) for index in range(connections)]
+
+    def worker(count):
+        local = []
+        failed = []
+        with connect() as client:
+            for _ in range(count):
+                start = time.perf_counter()
+                response = client.run(program=key, variables=variables)
+                local.append((time.perf_counter() - start) * 1000)
+                if not response['ok']:
+                    failed.append(response['error'])
+        with lock:
+            latencies.extend(local)
+            errors.extend(failed)
+
+    threads = [threading.Thread(target=worker, args=(count,)) for count in counts if count]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'connections': connections,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed if elapsed else 0.0,
+        'latency_ms': {
+            'p50': percentile(latencies, 0.50),
+            'p90': percentile(latencies, 0.90),
+            'p99': percentile(latencies, 0.99),
+            'max': latencies[-1] if latencies else None,
+        },
+    }
+
+def cold_runs(runs, source=SCRIPT, variables=None):
+    """
+    Requests per second when every run starts a new Python process that
+    imports the interpreter, compiles and runs source.
+    """
+    variables = {'n': 200} if variables is None else variables
+    code = ("import io, sys; from src.program import Program; "
+            "Program(sys.stdin.read()).run(variables=%r, output=io.StringIO())" % (variables,))
+    start = time.perf_counter()
+    for _ in range(runs):
+        subprocess.run([sys.executable, '-c', code], input=source, text=True, check=True)
+    elapsed = time.perf_counter() - start
+    return {'runs': runs, 'seconds': elapsed, 'requests_per_second': runs / elapsed}
+
+def spawn_server(path, workers):
+    # Start `python -m src.server` on a Unix socket and wait until it listens
+    process = subprocess.Popen([sys.executable, '-m', 'src.server', '--unix', path,
+                                '--workers', str(workers)],
+                               stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("Listening"):
+        process.kill()
+        raise Exception(f"Server failed to start: {line!r}")
+    return process
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Load-test the interpreter server.")
+    where = arg_parser.add_mutually_exclusive_group(required=True)
+    where.add_argument('--unix', metavar='PATH', help="server Unix socket")
+    where.add_argument('--port', type=int, help="server TCP port on --host")
+    where.add_argument('--spawn', action='store_true', help="start a server for the test and stop it after")
+    arg_parser.add_argument('--host', default='127.0.0.1', help="TCP host (default 127.0.0.1)")
+    arg_parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help="workers of a --spawn server (default: CPU count)")
+    arg_parser.add_argument('-c', '--connections', type=int, default=4, help="concurrent connections (default 4)")
+    arg_parser.add_argument('-n', '--requests', type=int, default=1000, help="total requests (default 1000)")
+    arg_parser.add_argument('--cold', type=int, default=0, metavar='RUNS',
+                            help="also time RUNS runs in fresh processes")
+    arg_parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = arg_parser.parse_args(argv)
+
+    process = None
+    with tempfile.TemporaryDirectory() as directory:
+        if args.spawn:
+            path = os.path.join(directory, 'server.sock')
+            process = spawn_server(path, args.workers)
+            connect = lambda: Client(path=path)
+        elif args.unix:
+            connect = lambda: Client(path=args.unix)
+        else:
+            connect = lambda: Client(host=args.host, port=args.port)
+        try:
+            results = {'server': load_test(connect, args.connections, args.requests)}
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+    if args.cold:
+        results['cold'] = cold_runs(args.cold)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    server = results['server']
+    latency = server['latency_ms']
+    print(f"server: {server['requests']} requests over {server['connections']} connections "
+          f"in {server['seconds']:.3f}s, {server['errors']} errors")
+    print(f"  {server['requests_per_second']:.1f} requests/s")
+    print(f"  latency p50 {latency['p50']:.2f}ms  p90 {latency['p90']:.2f}ms  "
+          f"p99 {latency['p99']:.2f}ms  max {latency['max']:.2f}ms")
+    if args.cold:
+        cold = results['cold']
+        print(f"cold processes: {cold['runs']} runs in {cold['seconds']:.3f}s, "
+              f"{cold['requests_per_second']:.1f} requests/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# bench_stack.py
+# Throughput of the explicit-stack evaluator (src/stack_interpreter.py)
+# against the recursive visitor, on
+#   - a loop-heavy workload
+#   - a generated program using the whole language (benchmarks/generate.py)
+#   - long operator chains `1 + 1 + ... + 1`, which the recursive visitor
+#     cannot evaluate once they are deeper than the recursion limit
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_stack --chains 100,1000,100000 --repeat 3
+
+import argparse
+import io
+import json
+import sys
+import timeit
+
+from src.program import Program
+from benchmarks.generate import generate_program
+
+LOOP = """
+total = 0;
+i = 0;
+while (i < 20000) {
+    total = total + i * 3 - (i / 7);
+    if (total > 100000) { total = total - 100000; }
+    i = i + 1;
+}
+print total;
+"""
+
+ENGINES = ('recursive', 'stack')
+
+
+def time_run(program, engine, repeat):
+    # Best-of-repeat seconds for one run, or None if it overflows the stack
+    run = lambda: program.run(output=io.StringIO(), engine=engine)
+    try:
+        return min(timeit.repeat(run, number=1, repeat=repeat))
+    except RecursionError:
+        return None
+
+def bench_workload(name, source, repeat):
+    """
+    Time one source on every engine; the optimiser is off so every engine
+    walks the same tree.
+    """
+    program = Program(source)
+    row = {'workload': name}
+    for engine in ENGINES:
+        row[engine] = time_run(program, engine, repeat)
+    if row['recursive'] and row['stack']:
+        row['speedup'] = row['recursive'] / row['stack']
+    else:
+        row['speedup'] = None
+    return row
+
+def bench_stack(chains, repeat, generated_bytes=200000):
+    rows = [
+        bench_workload('loop', LOOP, repeat),
+        bench_workload(f'generated {generated_bytes}B', generate_program(0, target_bytes=generated_bytes), repeat),
+    ]
+    for terms in chains:
+        rows.append(bench_workload(f'chain {terms}', "x = " + " + ".join(["1"] * terms) + ";", repeat))
+    return rows
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark the explicit-stack evaluator.")
+    arg_parser.add_argument('--chains', default='100,1000,100000',
+                            help="comma-separated operator chain lengths (default 100,1000,100000)")
+    arg_parser.add_argument('--bytes', type=int, default=200000, help="generated program size (default 200000)")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="measurements per timing (default 3)")
+    arg_parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = arg_parser.parse_args(argv)
+
+    rows = bench_stack([int(n) for n in args.chains.split(',')], args.repeat, args.bytes)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    show = lambda seconds: f"{seconds:.4f}s" if seconds is not None else "RecursionError"
+    print(f"{'workload':<20} {'recursive':>15} {'stack':>15} {'speedup':>8}")
+    for row in rows:
+        speedup = f"{row['speedup']:.2f}x" if row['speedup'] is not None else "-"
+        print(f"{row['workload']:<20} {show(row['recursive']):>15} {show(row['stack']):>15} {speedup:>8}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
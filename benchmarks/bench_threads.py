@@ -0,0 +1,79 @@
+# bench_threads.py
+# Scaling of one shared Program run concurrently from a thread pool
+# (see run_in_threads() in src/program.py). A fixed number of runs is
+# spread over 1, 2, 4, ... threads; throughput should grow with the thread
+# count on free-threaded CPython and stay roughly flat when the GIL is on.
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_threads --threads 1,2,4,8 --runs 32
+
+import argparse
+import io
+import json
+import sys
+import time
+
+from src.program import Program, run_in_threads
+
+WORKLOAD = """
+total = 0;
+i = 0;
+while (i < 2000) {
+    total = total + i * 3 - (i / 7);
+    if (total > 100000) { total = total - 100000; }
+    i = i + 1;
+}
+print total;
+"""
+
+
+def gil_enabled():
+    # True/False on builds that can report it, None on older versions
+    check = getattr(sys, '_is_gil_enabled', None)
+    return check() if check is not None else None
+
+def bench_scaling(thread_counts, runs, repeat, optimize=1):
+    """
+    Best-of-repeat wall time for `runs` executions at each thread count.
+    """
+    program = Program(WORKLOAD, optimize=optimize)
+    rows = []
+    for threads in thread_counts:
+        best = None
+        for _ in range(repeat):
+            jobs = [{'output': io.StringIO()} for _ in range(runs)]
+            start = time.perf_counter()
+            run_in_threads(program, jobs, workers=threads)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        rows.append({'threads': threads, 'seconds': best, 'runs_per_second': runs / best})
+    base = rows[0]['runs_per_second']
+    for row in rows:
+        row['speedup'] = row['runs_per_second'] / base
+    return rows
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark shared-Program thread scaling.")
+    arg_parser.add_argument('--threads', default='1,2,4,8',
+                            help="comma-separated thread counts (default 1,2,4,8)")
+    arg_parser.add_argument('--runs', type=int, default=32, help="runs per measurement (default 32)")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="measurements per thread count (default 3)")
+    arg_parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = arg_parser.parse_args(argv)
+
+    thread_counts = [int(n) for n in args.threads.split(',')]
+    rows = bench_scaling(thread_counts, args.runs, args.repeat)
+    if args.json:
+        print(json.dumps({'gil_enabled': gil_enabled(), 'results': rows}, indent=2))
+        return 0
+    print(f"GIL enabled: {gil_enabled()}")
+    print(f"{'threads':>8} {'seconds':>10} {'runs/s':>10} {'speedup':>8}")
+    for row in rows:
+        print(f"{row['threads']:>8} {row['seconds']:>10.4f} {row['runs_per_second']:>10.1f} "
+              f"{row['speedup']:>7.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
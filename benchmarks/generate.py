@@ -0,0 +1,295 @@
+# generate.py
+# Seeded random program generator for scaling and stress workloads.
+# Programs use the whole language: nested arithmetic, boolean and string
+# expressions, if/else, bounded while and for loops, functions (plain and
+# memo), arrays with indexing, len() and append(), and print. Every
+# generated program runs without errors: variables keep one type for their
+# lifetime, loops are bounded by dedicated counters or literal ranges,
+# divisors are always >= 1 and every reassigned value is clamped so it
+# cannot grow without bound.
+#
+# Usage (from the project root):
+#   python -m benchmarks.generate --seed 1 --bytes 2000000 --depth 4 -o big.txt
+#   python -m benchmarks.generate --statements 500 --expected expected.txt
+
+import argparse
+import io
+import random
+import sys
+
+from src.program import Program
+
+TYPES = ('int', 'float', 'bool', 'str', 'array')
+WORDS = ('alpha', 'beta', 'gamma', 'delta', 'eps', 'zeta', 'eta', 'theta')
+CLAMP = 1000000
+MAX_STR = 200
+MAX_TRIPS = 4
+
+
+class ProgramGenerator:
+    """
+    Generates random, always-valid programs.
+    Arguments:
+        seed: Random seed; the same seed and settings give the same program
+        max_depth: Maximum nesting depth of if/while/for blocks
+        expr_depth: Maximum nesting depth of expressions
+    """
+    def __init__(self, seed=0, max_depth=3, expr_depth=3):
+        self.random = random.Random(seed)
+        self.max_depth = max_depth
+        self.expr_depth = expr_depth
+        self.variables = {name: [] for name in TYPES}   # type -> defined names
+        self.functions = []       # (name, number of int parameters)
+        self.counter = 0          # Source of fresh names
+        self.statements = 0       # Statements generated so far (all levels)
+
+    def fresh(self, prefix):
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    # === Expressions ===
+
+    def expr(self, kind, depth=None):
+        """
+        Source of a random expression of the given type. Compound
+        expressions are parenthesised so precedence never changes them.
+        """
+        if depth is None:
+            depth = self.expr_depth
+        rnd = self.random
+        names = self.variables[kind]
+        if depth <= 0 or rnd.random() < 0.25:
+            if names and rnd.random() < 0.6:
+                return rnd.choice(names)
+            return self.literal(kind)
+        return "(" + getattr(self, 'expr_' + kind)(depth - 1) + ")"
+
+    def literal(self, kind):
+        rnd = self.random
+        if kind == 'int':
+            return str(rnd.randint(0, 99))
+        if kind == 'float':
+            return f"{rnd.randint(0, 99)}.{rnd.randint(0, 99)}"
+        if kind == 'bool':
+            return rnd.choice(('true', 'false'))
+        if kind == 'str':
+            return f'"{rnd.choice(WORDS)}"'
+        return "[" + ", ".join(self.literal('int') for _ in range(rnd.randint(1, 4))) + "]"
+
+    def expr_int(self, depth):
+        rnd = self.random
+        choice = rnd.randrange(6)
+        if choice == 0:
+            return f"{self.expr('int', depth)} {rnd.choice('+-')} {self.expr('int', depth)}"
+        if choice == 1:
+            # One small factor keeps products from exploding
+            return f"{self.expr('int', depth)} * {rnd.randint(0, 9)}"
+        if choice == 2:
+            return f"-{self.expr('int', depth)}"
+        if choice == 3:
+            return f"len({self.expr(rnd.choice(('str', 'array')), depth)})"
+        if choice == 4:
+            return f"{self.expr('array', depth)}[0]"
+        if self.functions:
+            name, arity = rnd.choice(self.functions)
+            return f"{name}({', '.join(self.expr('int', depth) for _ in range(arity))})"
+        return f"{self.expr('int', depth)} + 1"
+
+    def expr_float(self, depth):
+        rnd = self.random
+        choice = rnd.randrange(3)
+        if choice == 0:
+            # Divisor is at least 1
+            number = self.expr(rnd.choice(('int', 'float')), depth)
+            divisor = self.expr(rnd.choice(('int', 'float')), depth)
+            return f"{number} / ({divisor} * {divisor} + 1)"
+        if choice == 1:
+            return f"{self.expr('float', depth)} {rnd.choice('+-')} {self.expr('int', depth)}"
+        return f"{self.expr('float', depth)} * {self.literal('float')}"
+
+    def expr_bool(self, depth):
+        rnd = self.random
+        choice = rnd.randrange(4)
+        if choice == 0:
+            op = rnd.choice(('==', '!=', '<', '<=', '>', '>='))
+            return f"{self.expr(rnd.choice(('int', 'float')), depth)} {op} {self.expr('int', depth)}"
+        if choice == 1:
+            return f"{self.expr('str', depth)} {rnd.choice(('==', '!=', '<'))} {self.expr('str', depth)}"
+        if choice == 2:
+            return f"{self.expr('bool', depth)} {rnd.choice(('and', 'or'))} {self.expr('bool', depth)}"
+        return f"not {self.expr('bool', depth)}"
+
+    def expr_str(self, depth):
+        rnd = self.random
+        if rnd.random() < 0.7:
+            return f"{self.expr('str', depth)} + {self.expr('str', depth)}"
+        return f"{self.expr('str', depth)} * {rnd.randint(0, 3)}"
+
+    def expr_array(self, depth):
+        rnd = self.random
+        if rnd.random() < 0.5:
+            return "[" + ", ".join(self.expr('int', depth) for _ in range(rnd.randint(1, 3))) + "]"
+        return f"{self.expr('array', depth)} {rnd.choice('+-')} {rnd.randint(0, 5)}"
+
+    # === Statements ===
+
+    def clamp(self, name, kind, indent):
+        # Keep a reassigned value from growing without bound
+        if kind in ('int', 'float'):
+            return f"{indent}if ({name} > {CLAMP} or {name} < -{CLAMP}) {{ {name} = {self.literal(kind)}; }}\n"
+        if kind in ('str', 'array'):
+            return f"{indent}if (len({name}) > {MAX_STR}) {{ {name} = {self.literal(kind)}; }}\n"
+        return ""
+
+    def statement(self, depth, indent):
+        """
+        Source of one random statement (possibly a block) at nesting depth.
+        """
+        self.statements += 1
+        rnd = self.random
+        choice = rnd.random()
+        if depth < self.max_depth and choice < 0.15:
+            return self.if_statement(depth, indent)
+        if depth < self.max_depth and choice < 0.22:
+            return self.while_statement(depth, indent)
+        if depth < self.max_depth and choice < 0.28:
+            return self.for_statement(depth, indent)
+        kind = rnd.choice(TYPES)
+        names = self.variables[kind]
+        if choice < 0.45:
+            return f"{indent}print {self.expr(kind)};\n"
+        if depth == 0 and (not names or rnd.random() < 0.3):
+            # New variables only at top level, so every use is defined
+            name = self.fresh(kind[0])
+            source = f"{indent}{name} = {self.expr(kind)};\n"
+            names.append(name)
+            return source
+        if not names:
+            return f"{indent}print {self.expr(kind)};\n"
+        name = rnd.choice(names)
+        if kind == 'array' and rnd.random() < 0.5:
+            source = f"{indent}append({name}, {self.expr('int')});\n"
+        else:
+            source = f"{indent}{name} = {self.expr(kind)};\n"
+        return source + self.clamp(name, kind, indent)
+
+    def block(self, depth, indent):
+        inner = indent + "    "
+        return "".join(self.statement(depth + 1, inner)
+                       for _ in range(self.random.randint(1, 4)))
+
+    def if_statement(self, depth, indent):
+        source = f"{indent}if ({self.expr('bool')}) {{\n{self.block(depth, indent)}{indent}}}"
+        if self.random.random() < 0.5:
+            source += f" else {{\n{self.block(depth, indent)}{indent}}}"
+        return source + "\n"
+
+    def while_statement(self, depth, indent):
+        counter = self.fresh('i')
+        trips = self.random.randint(0, MAX_TRIPS)
+        return (f"{indent}{counter} = 0;\n"
+                f"{indent}while ({counter} < {trips}) {{\n"
+                f"{self.block(depth, indent)}"
+                f"{indent}    {counter} = {counter} + 1;\n"
+                f"{indent}}}\n")
+
+    def for_statement(self, depth, indent):
+        # The loop variable is an int the body may read (or reassign); it is
+        # only known to be defined inside the loop
+        name = self.fresh('k')
+        start = self.random.randint(0, 9)
+        stop = start + self.random.randint(-1, MAX_TRIPS)
+        ints = self.variables['int']
+        ints.append(name)
+        body = self.block(depth, indent)
+        ints.remove(name)
+        return (f"{indent}for ({name} = {start}; {stop}) {{\n"
+                f"{body}"
+                f"{indent}}}\n")
+
+    def function(self):
+        # A small pure int function of its parameters (it sees no globals
+        # and calls no other function); about one in three is memoized
+        name = self.fresh('f')
+        arity = self.random.randint(1, 3)
+        params = [f"p{index}" for index in range(arity)]
+        saved = self.variables, self.functions
+        self.variables = {kind: [] for kind in TYPES}
+        self.variables['int'] = params
+        self.functions = []
+        body = f"{self.expr('int', 2)} * {self.random.randint(0, 3)}"
+        self.variables, self.functions = saved
+        prefix = "memo " if self.random.random() < 0.3 else ""
+        self.functions.append((name, arity))
+        return (f"{prefix}func {name}({', '.join(params)}) {{\n"
+                f"    r = {body};\n"
+                f"    if (r > {CLAMP} or r < -{CLAMP}) {{ r = 1; }}\n"
+                f"    return r;\n"
+                f"}}\n")
+
+    def generate(self, target_bytes=None, target_statements=None):
+        """
+        Return program source of about target_bytes characters or
+        target_statements statements (whichever is given; 10000 bytes if
+        neither is).
+        """
+        if target_bytes is None and target_statements is None:
+            target_bytes = 10000
+        parts = [self.function() for _ in range(self.random.randint(1, 3))]
+        size = sum(map(len, parts))
+        while True:
+            if target_bytes is not None and size >= target_bytes:
+                break
+            if target_statements is not None and self.statements >= target_statements:
+                break
+            if self.random.random() < 0.02:
+                part = self.function()
+            else:
+                part = self.statement(0, "")
+            parts.append(part)
+            size += len(part)
+        return "".join(parts)
+
+
+def generate_program(seed=0, target_bytes=None, target_statements=None, max_depth=3, expr_depth=3):
+    """
+    Generate a program; see ProgramGenerator and ProgramGenerator.generate().
+    """
+    generator = ProgramGenerator(seed, max_depth=max_depth, expr_depth=expr_depth)
+    return generator.generate(target_bytes, target_statements)
+
+def expected_output(source):
+    """
+    Output of running source with the reference interpreter.
+    """
+    output = io.StringIO()
+    Program(source).run(output=output)
+    return output.getvalue()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Generate a random program for stress tests.")
+    arg_parser.add_argument('--seed', type=int, default=0, help="random seed (default 0)")
+    size = arg_parser.add_mutually_exclusive_group()
+    size.add_argument('--bytes', type=int, help="target program size in bytes")
+    size.add_argument('--statements', type=int, help="target number of statements")
+    arg_parser.add_argument('--depth', type=int, default=3, help="maximum block nesting depth (default 3)")
+    arg_parser.add_argument('--expr-depth', type=int, default=3, help="maximum expression depth (default 3)")
+    arg_parser.add_argument('-o', '--output', help="write the program here instead of stdout")
+    arg_parser.add_argument('--expected', help="also run the program and write its output here")
+    args = arg_parser.parse_args(argv)
+
+    source = generate_program(args.seed, args.bytes, args.statements, args.depth, args.expr_depth)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(source)
+    else:
+        sys.stdout.write(source)
+    if args.expected:
+        with open(args.expected, 'w') as f:
+            f.write(expected_output(source))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
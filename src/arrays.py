@@ -0,0 +1,243 @@
+# arrays.py
+# Array value type and its bulk operations.
+# Arrays of plain ints or plain floats are stored compactly in the `array`
+# module ('q' / 'd'); anything else (strings, bools, mixed, nested arrays,
+# ints beyond 64 bits) falls back to a Python list. Elementwise arithmetic
+# and comparisons between arrays and scalars run as one bulk operation
+# (map over C-level operator functions, or NumPy for float arrays when it
+# is installed) instead of a script-level loop.
+#
+# Arrays are mutable via append() and have reference semantics: every name
+# bound to an array sees appends made through any other. Values that cross
+# an ownership boundary (a snapshot, a memo cache, a CSE slot, an expression
+# cache, host-provided variables) are copied with copy_value() instead, so
+# no run can observe a change made by another.
+
+import operator
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from src.my_token import (
+    TT_PLUS, TT_MINUS, TT_MUL, TT_DIV,
+    TT_EQ, TT_NE, TT_LT, TT_LTE,
+    TT_GT, TT_GTE
+)
+
+# Operators applied elementwise, with the plain Python operator that matches
+# the interpreter's semantics for numeric operands
+ELEMENTWISE = {
+    TT_PLUS: operator.add,
+    TT_MINUS: operator.sub,
+    TT_MUL: operator.mul,
+    TT_DIV: operator.truediv,
+    TT_EQ: operator.eq,
+    TT_NE: operator.ne,
+    TT_LT: operator.lt,
+    TT_LTE: operator.le,
+    TT_GT: operator.gt,
+    TT_GTE: operator.ge,
+}
+COMPARISONS = {TT_EQ, TT_NE, TT_LT, TT_LTE, TT_GT, TT_GTE}
+
+# Below this length the NumPy round trip costs more than it saves
+NUMPY_MIN_LENGTH = 64
+
+
+def pack(values):
+    """
+    Store values in the most compact container that keeps them exact.
+    """
+    values = list(values)
+    kinds = set(map(type, values))
+    if kinds == {float}:
+        return array('d', values)
+    if kinds == {int}:
+        try:
+            return array('q', values)
+        except OverflowError:
+            pass
+    return values
+
+
+class ArrayValue:
+    """
+    Runtime array value.
+    Attributes:
+        data: array('q'), array('d') or list holding the elements
+    """
+    __slots__ = ('data',)
+    __hash__ = None
+
+    def __init__(self, data):
+        self.data = data
+
+    @property
+    def typecode(self):
+        # 'q' or 'd' for compact numeric storage, None for a list
+        return self.data.typecode if isinstance(self.data, array) else None
+
+    def copy(self):
+        return ArrayValue(self.data[:])
+
+    def append(self, value):
+        data = self.data
+        if not data:
+            # An empty array takes its storage from the first element
+            self.data = pack([value])
+            return
+        if isinstance(data, array):
+            if type(value) is (int if data.typecode == 'q' else float):
+                try:
+                    data.append(value)
+                    return
+                except OverflowError:
+                    pass
+            # The new element does not fit the compact storage
+            self.data = data = data.tolist()
+        data.append(value)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + self.data.__sizeof__()
+
+    def __str__(self):
+        return "[" + ", ".join(repr(item) if isinstance(item, str) else str(item)
+                               for item in self.data) + "]"
+
+    __repr__ = __str__
+
+
+def copy_value(value, copies=None):
+    """
+    Deep copy of an array (any other value is returned unchanged).
+    copies: dict (id -> copy) shared between calls that copy several values
+            together, so arrays aliased between them stay aliased
+    """
+    if type(value) is not ArrayValue:
+        return value
+    if copies is None:
+        copies = {}
+    copy = copies.get(id(value))
+    if copy is None:
+        copy = copies[id(value)] = value.copy()
+        if copy.typecode is None:
+            copy.data = [copy_value(item, copies) for item in copy.data]
+    return copy
+
+
+def to_json_value(value):
+    """
+    A script value as JSON: arrays become lists, unknown types strings.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, ArrayValue):
+        return [to_json_value(item) for item in value]
+    return str(value)
+
+
+def index_value(container, index):
+    """
+    Return container[index] for an array or string.
+    """
+    if not isinstance(container, (ArrayValue, str)):
+        raise Exception(f"TypeError: '{type(container).__name__}' value is not indexable")
+    if type(index) is not int:
+        raise Exception(f"TypeError: index must be an integer, not '{type(index).__name__}'")
+    data = container.data if type(container) is ArrayValue else container
+    if not 0 <= index < len(data):
+        raise Exception(f"Index {index} out of range for length {len(data)}")
+    return data[index]
+
+
+def builtin_len(args):
+    # len(x): number of elements of an array or characters of a string
+    if len(args) != 1:
+        raise Exception(f"Function 'len' expects 1 argument(s), got {len(args)}")
+    value = args[0]
+    if not isinstance(value, (ArrayValue, str)):
+        raise Exception(f"TypeError: object of type '{type(value).__name__}' has no len()")
+    return len(value)
+
+# Built-in functions callable like user-defined ones (append is syntax, see Append)
+BUILTINS = {
+    'len': builtin_len,
+}
+
+
+def _is_number(value):
+    return type(value) in (int, float)
+
+def elementwise(interp, op, left, right):
+    """
+    Apply binary operator token op elementwise where at least one operand
+    is an ArrayValue. Scalars are broadcast. Numeric storage takes the bulk
+    path; other element types go through interp.apply_binop per element so
+    errors match scalar evaluation exactly.
+    """
+    op_type = op.type
+    func = ELEMENTWISE.get(op_type)
+    if func is None:
+        raise Exception(f"TypeError: unsupported operand types for {op.value}: "
+                        f"'{type(left).__name__}' and '{type(right).__name__}'")
+
+    left_is_array = type(left) is ArrayValue
+    right_is_array = type(right) is ArrayValue
+    if left_is_array and right_is_array and len(left) != len(right):
+        raise Exception(f"Array length mismatch: {len(left)} and {len(right)}")
+    length = len(left) if left_is_array else len(right)
+
+    left_code = left.typecode if left_is_array else ('scalar' if _is_number(left) else None)
+    right_code = right.typecode if right_is_array else ('scalar' if _is_number(right) else None)
+
+    if left_code and right_code:
+        # Both sides numeric: one bulk operation
+        left_items = left.data if left_is_array else _repeat(left, length)
+        right_items = right.data if right_is_array else _repeat(right, length)
+        if op_type == TT_DIV and 0 in right_items:
+            raise Exception("Division by zero undefined")
+        if op_type in COMPARISONS:
+            return ArrayValue(list(map(func, left_items, right_items)))
+        floats = 'd' in (left_code, right_code) or op_type == TT_DIV or \
+            (left_code == 'scalar' and type(left) is float) or \
+            (right_code == 'scalar' and type(right) is float)
+        if floats:
+            # int64 storage stays in Python: int / int is exact there, while
+            # NumPy would round both operands to float64 first
+            if numpy is not None and length >= NUMPY_MIN_LENGTH and 'q' not in (left_code, right_code):
+                return ArrayValue(_numpy_float_op(func, left, right))
+            return ArrayValue(array('d', map(func, left_items, right_items)))
+        try:
+            return ArrayValue(array('q', map(func, left_items, right_items)))
+        except OverflowError:
+            return ArrayValue(pack(map(func, left_items, right_items)))
+
+    # Mixed or non-numeric elements: scalar semantics per element
+    left_items = left.data if left_is_array else _repeat(left, length)
+    right_items = right.data if right_is_array else _repeat(right, length)
+    return ArrayValue(pack([interp.apply_binop(op, a, b) for a, b in zip(left_items, right_items)]))
+
+def _repeat(value, length):
+    # Broadcast a scalar to the length of the other operand
+    return [value] * length
+
+def _numpy_float_op(func, left, right):
+    # Float-producing bulk operation on NumPy views of the array buffers.
+    # Every operand is converted to float64 first, exactly as Python does.
+    def as_numpy(value):
+        if type(value) is ArrayValue:
+            return numpy.asarray(value.data, dtype=numpy.float64)
+        return float(value)
+    result = func(as_numpy(left), as_numpy(right))
+    out = array('d')
+    out.frombytes(numpy.ascontiguousarray(result, dtype=numpy.float64).tobytes())
+    return out
@@ -0,0 +1,204 @@
+# async_interpreter.py
+# asyncio-cooperative execution mode.
+# Statements are executed by coroutines that hand control back to the event
+# loop every `yield_every` steps (statement boundaries and loop back-edges),
+# so many scripts can share one loop without starving other work.
+# Function calls run on call_function_async() (src/functions.py), which
+# yields the same way inside function bodies.
+# input() awaits an async input source and print goes to an async-capable sink.
+
+import asyncio
+import inspect
+
+from src.my_parser import (
+    BinOp, UnaryOp,
+    VarAssign, PrintStmt,
+    IfStmt, WhileStmt, ForStmt, InputExpr, Call,
+    Return, LocalAssign,
+    ArrayLiteral, Index, Append
+)
+from src.interpreter import Interpreter
+from src.arrays import ArrayValue, pack, index_value
+from src.functions import call_function_async
+
+
+async def _resolve(value):
+    # Await value if it is awaitable, otherwise return it unchanged
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+class AsyncInterpreter(Interpreter):
+    """
+    Interpreter whose statements run as coroutines.
+    Arguments:
+        input_func: Callable returning the next input line, or an awaitable
+                    of it; None reads the built-in input() in a thread
+        output: Object with a write(text) method that may return an
+                awaitable; None means sys.stdout
+        yield_every: Number of steps between yields to the event loop
+        accountant: Optional MemoryAccountant, as for Interpreter
+    Expressions that neither call input() nor a function are evaluated
+    with the ordinary synchronous visitor, so only statement dispatch pays
+    for the coroutines.
+    """
+    def __init__(self, input_func=None, output=None, yield_every=100, accountant=None):
+        super().__init__(input_func=input_func, output=output, accountant=accountant)
+        self.yield_every = yield_every
+        self.steps = 0            # Steps since the last yield to the event loop
+        self._awaits = {}         # id(node) -> (node, flag) cache for awaits()
+
+    async def tick(self):
+        """
+        Count one step and yield to the event loop every yield_every steps.
+        """
+        self.steps += 1
+        if self.steps >= self.yield_every:
+            self.steps = 0
+            await asyncio.sleep(0)
+
+    def awaits(self, node):
+        """
+        True if evaluating this expression (or function body statement)
+        may await: it calls input() or a function.
+        """
+        cached = self._awaits.get(id(node))
+        if cached is not None:
+            return cached[1]
+        if isinstance(node, (InputExpr, Call)):
+            flag = True
+        elif isinstance(node, BinOp):
+            flag = self.awaits(node.left) or self.awaits(node.right)
+        elif isinstance(node, (UnaryOp, PrintStmt)):
+            flag = self.awaits(node.expr)
+        elif isinstance(node, ArrayLiteral):
+            flag = any(self.awaits(element) for element in node.elements)
+        elif isinstance(node, Index):
+            flag = self.awaits(node.target) or self.awaits(node.index)
+        elif isinstance(node, (Append, LocalAssign)):
+            flag = self.awaits(node.value)
+        elif isinstance(node, Return):
+            flag = node.expr is not None and self.awaits(node.expr)
+        else:
+            flag = False
+        # Keep a reference to node so its id cannot be reused while cached
+        self._awaits[id(node)] = (node, flag)
+        return flag
+
+    async def evaluate(self, node):
+        """
+        Evaluate an expression, awaiting input() and function calls where
+        the expression makes them.
+        """
+        if not self.awaits(node):
+            return self.visit(node)
+        self.node_count += 1
+        if isinstance(node, InputExpr):
+            if self.input_func is None:
+                return await asyncio.get_running_loop().run_in_executor(None, input)
+            return await _resolve(self.input_func())
+        if isinstance(node, Call):
+            args = [await self.evaluate(arg) for arg in node.args]
+            return await call_function_async(self, node.name, args)
+        if isinstance(node, ArrayLiteral):
+            return ArrayValue(pack([await self.evaluate(element) for element in node.elements]))
+        if isinstance(node, Index):
+            target = await self.evaluate(node.target)
+            return index_value(target, await self.evaluate(node.index))
+        if isinstance(node, Append):
+            self.append_value(node, await self.evaluate(node.value))
+            return None
+        if isinstance(node, BinOp):
+            left = await self.evaluate(node.left)
+            right = await self.evaluate(node.right)
+            if node.fast is not None and self.accountant is None:
+                return node.fast(left, right)
+            return self.apply_binop(node.op, left, right)
+        val = await self.evaluate(node.expr)
+        if node.fast is not None:
+            return node.fast(val)
+        return self.apply_unaryop(node.op, val)
+
+    async def execute(self, node):
+        """
+        Execute one statement, yielding to the event loop as configured.
+        Returns the statement's value, like visit().
+        """
+        await self.tick()
+        if isinstance(node, VarAssign):
+            self.node_count += 1
+            value = await self.evaluate(node.value)
+            self.store_global(node.name, value)
+            return value
+        if isinstance(node, PrintStmt):
+            self.node_count += 1
+            await self.write_line(await self.evaluate(node.expr))
+            return None
+        if isinstance(node, IfStmt):
+            self.node_count += 1
+            if await self.evaluate(node.condition):
+                await self.execute_block(node.true_block)
+            elif node.false_block is not None:
+                await self.execute_block(node.false_block)
+            return None
+        if isinstance(node, WhileStmt):
+            self.node_count += 1
+            while await self.evaluate(node.condition):
+                self.loop_iterations += 1
+                await self.execute_block(node.body)
+                # Loop back-edge
+                await self.tick()
+            return None
+        if isinstance(node, ForStmt):
+            self.node_count += 1
+            start = await self.evaluate(node.start)
+            values = self.loop_range(start, await self.evaluate(node.stop))
+            self.store_loop_var(node, start)
+            for value in values:
+                self.store_loop_var(node, value)
+                self.loop_iterations += 1
+                await self.execute_block(node.body)
+                # Loop back-edge
+                await self.tick()
+            if values:
+                self.store_loop_var(node, values.stop)
+            return None
+        # Expression statements and anything else
+        return await self.evaluate(node)
+
+    async def write_line(self, value):
+        # Print value, awaiting the output's write() if it is async
+        if self.output is None:
+            print(value)
+        else:
+            await _resolve(self.output.write(f"{value}\n"))
+        self.print_count += 1
+
+    async def execute_block(self, statements):
+        # Execute a list of statements in order
+        for stmt in statements:
+            await self.execute(stmt)
+
+    async def interpret(self, statements):
+        """
+        Execute statements in order and return the last non-None value.
+        Unlike Interpreter.interpret() the result is not printed.
+        """
+        result = None
+        for stmt in statements:
+            val = await self.execute(stmt)
+            # Keep last evaluated non-None result
+            if val is not None:
+                result = val
+        return result
+
+    def visit_InputExpr(self, node):
+        # Only reached for input() that evaluate() and call_function_async()
+        # could not see; an async input source cannot be awaited from here
+        value = super().visit_InputExpr(node)
+        if inspect.isawaitable(value):
+            if inspect.iscoroutine(value):
+                value.close()
+            raise Exception("input() cannot await an async input source in this context")
+        return value
@@ -0,0 +1,175 @@
+# batch.py
+# Batch runner: executes many independent scripts across a process pool.
+# Each script runs in a worker with its own captured output, its own input
+# lines and an optional timeout; results stream back in completion order.
+#
+# Usage (from the project root):
+#   python -m src.batch script1.txt script2.txt --workers 4 --timeout 5
+#   python -m src.batch --pair script.txt input.txt --json
+
+import argparse
+import io
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from src.program import Program
+from src.arrays import to_json_value
+
+
+class ScriptTimeout(Exception):
+    """
+    Raised inside a worker when a script runs longer than its timeout.
+    """
+
+
+class BatchResult:
+    """
+    Outcome of running one script.
+    Attributes:
+        script: Script path (or name) as given in the job list
+        ok: True if the script ran to completion without an error
+        output: Everything the script printed
+        result: Value of the last statement that produced one, or None
+        error: Error message if the script failed, else None
+        error_type: Name of the exception class if the script failed, else None
+        duration: Wall-clock seconds spent in the worker
+    """
+    def __init__(self, script, ok, output='', result=None, error=None, error_type=None, duration=0.0):
+        self.script = script
+        self.ok = ok
+        self.output = output
+        self.result = result
+        self.error = error
+        self.error_type = error_type
+        self.duration = duration
+
+    def to_dict(self):
+        return {
+            'script': self.script,
+            'ok': self.ok,
+            'output': self.output,
+            'result': to_json_value(self.result),
+            'error': self.error,
+            'error_type': self.error_type,
+            'duration': self.duration,
+        }
+
+    def __repr__(self):
+        if self.ok:
+            return f"BatchResult({self.script!r}, ok, result={self.result!r})"
+        return f"BatchResult({self.script!r}, {self.error_type}: {self.error})"
+
+
+def _raise_timeout(signum, frame):
+    raise ScriptTimeout("Script exceeded its timeout")
+
+
+@contextmanager
+def time_limit(timeout):
+    """
+    Raise ScriptTimeout in the block once it has run for timeout seconds.
+    Uses SIGALRM, so the limit is only enforced on platforms that have it
+    and when called from the main thread (which pool workers are); with
+    timeout=None the block runs unlimited.
+    """
+    use_alarm = (timeout is not None and hasattr(signal, 'SIGALRM')
+                 and threading.current_thread() is threading.main_thread())
+    if not use_alarm:
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def run_source(source, input_text=None, timeout=None, script='<string>'):
+    """
+    Lex, parse and interpret one script with captured output and input.
+    Never raises for script errors; they are reported in the BatchResult.
+    The timeout is enforced as described for time_limit().
+    """
+    output = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with time_limit(timeout):
+            run = Program(source).run(inputs=input_text or '', output=output)
+        return BatchResult(script, True, output.getvalue(), run.result,
+                           duration=time.perf_counter() - start)
+    except ScriptTimeout:
+        return BatchResult(script, False, output.getvalue(),
+                           error=f"Script exceeded timeout of {timeout}s", error_type='ScriptTimeout',
+                           duration=time.perf_counter() - start)
+    except Exception as e:
+        return BatchResult(script, False, output.getvalue(), error=str(e), error_type=type(e).__name__,
+                           duration=time.perf_counter() - start)
+
+
+def _run_job(script, input_text, timeout):
+    # Worker entry point: read the script file and run it
+    try:
+        with open(script) as f:
+            source = f.read()
+    except OSError as e:
+        return BatchResult(script, False, error=str(e), error_type=type(e).__name__)
+    return run_source(source, input_text, timeout, script)
+
+
+def run_batch(jobs, workers=None, timeout=None):
+    """
+    Run script files across a ProcessPoolExecutor.
+    jobs is an iterable of script paths or (script_path, input_text) pairs.
+    workers defaults to the number of CPUs; timeout is per script in seconds.
+    Yields BatchResult objects in completion order.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for job in jobs:
+            script, input_text = (job, None) if isinstance(job, str) else job
+            futures.append(pool.submit(_run_job, script, input_text, timeout))
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Run many scripts in parallel.")
+    arg_parser.add_argument('scripts', nargs='*', help="script files to run (no input)")
+    arg_parser.add_argument('--pair', nargs=2, action='append', default=[], metavar=('SCRIPT', 'INPUT'),
+                            help="run SCRIPT with the lines of INPUT as its input (repeatable)")
+    arg_parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                            help="number of worker processes (default: CPU count)")
+    arg_parser.add_argument('-t', '--timeout', type=float, help="per-script timeout in seconds")
+    arg_parser.add_argument('--json', action='store_true', help="print one JSON result per line")
+    args = arg_parser.parse_args(argv)
+
+    jobs = list(args.scripts)
+    for script, input_path in args.pair:
+        with open(input_path) as f:
+            jobs.append((script, f.read()))
+
+    failures = 0
+    for res in run_batch(jobs, args.workers, args.timeout):
+        failures += not res.ok
+        if args.json:
+            print(json.dumps(res.to_dict()))
+        elif res.ok:
+            print(f"--- {res.script} (ok, {res.duration:.3f}s) ---")
+            sys.stdout.write(res.output)
+        else:
+            print(f"--- {res.script} (failed, {res.duration:.3f}s) ---")
+            sys.stdout.write(res.output)
+            print(f"Error: {res.error}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,287 @@
+# checkpoint.py
+# Saving and restoring interpreter state for warm starts.
+# A checkpoint file holds global variables, user-defined functions and,
+# for pipelined runs (src/streaming.py), the source position to resume
+# from. A worker that restarts loads the checkpoint instead of replaying
+# the setup script that built the state.
+#
+# File layout (all integers little-endian):
+#   header   HEADER: magic, format version, variable count, streaming
+#            position (-1 if none), offsets of the index and of the
+#            functions section, and the SHA-256 of the source (zeros if none)
+#   index    one fixed-size INDEX_RECORD per variable: where its name and
+#            value are stored and the value's kind
+#   data     names (UTF-8) and values, each value aligned to 8 bytes:
+#            ints as two's complement bytes, floats as doubles, strings as
+#            UTF-8, None as nothing, compact arrays as their raw
+#            int64/float64 buffer, and other arrays as nested (kind,
+#            length, payload) records
+#   functions  pickled {name: FuncDef}
+# The file is read through mmap: the index can be searched without
+# decoding any value, load_checkpoint(names=...) decodes only some, and
+# each value is built with a single copy out of the mapped pages.
+# The functions section is a pickle, so only load checkpoints you trust.
+#
+# Usage:
+#   save_checkpoint('state.ckpt', result.variables, result.functions)
+#   program.run(snapshot=load_checkpoint('state.ckpt').snapshot())
+
+import hashlib
+import io
+import mmap
+import os
+import pickle
+import struct
+import sys
+from array import array
+
+from src.arrays import ArrayValue
+from src.environment import Snapshot
+
+MAGIC = b'MYICKPT\n'
+CHECKPOINT_VERSION = 1
+
+HEADER = struct.Struct('<8sHHIqQQQ32s')
+INDEX_RECORD = struct.Struct('<QIB3xQQ')    # name offset, name length, kind, value offset, length
+ELEMENT = struct.Struct('<BQ')              # kind and payload length of an element of a list array
+ALIGNMENT = 8
+
+# Value kinds
+INT = 0
+FLOAT = 1
+BOOL = 2
+STR = 3
+ARRAY_INT = 4       # array('q') storage
+ARRAY_FLOAT = 5     # array('d') storage
+ARRAY_LIST = 6      # list storage: nested ELEMENT records
+NONE = 7            # None (the value of a call without a return value); empty payload
+
+_FLOAT = struct.Struct('<d')
+_TYPECODES = {ARRAY_INT: 'q', ARRAY_FLOAT: 'd'}
+_ARRAY_KINDS = {'q': ARRAY_INT, 'd': ARRAY_FLOAT}
+_NO_HASH = bytes(32)
+
+
+def source_digest(source):
+    return hashlib.sha256(source.encode()).digest()
+
+
+# === Encoding ===
+
+def _array_bytes(data):
+    # Raw little-endian buffer of a compact array, without copying if possible
+    if sys.byteorder == 'little':
+        return memoryview(data).cast('B')
+    swapped = array(data.typecode, data)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+def _encode(name, value):
+    # (kind, payload) of one value; payload is any bytes-like object
+    cls = type(value)
+    if value is None:
+        return NONE, b''
+    if cls is bool:
+        return BOOL, b'\x01' if value else b'\x00'
+    if cls is int:
+        return INT, value.to_bytes(value.bit_length() // 8 + 1, 'little', signed=True)
+    if cls is float:
+        return FLOAT, _FLOAT.pack(value)
+    if cls is str:
+        return STR, value.encode('utf-8', 'surrogatepass')
+    if cls is ArrayValue:
+        typecode = value.typecode
+        if typecode is not None:
+            return _ARRAY_KINDS[typecode], _array_bytes(value.data)
+        parts = bytearray()
+        for item in value.data:
+            kind, payload = _encode(name, item)
+            parts += ELEMENT.pack(kind, len(payload))
+            parts += payload
+        return ARRAY_LIST, parts
+    raise Exception(f"Cannot checkpoint variable '{name}' of type '{cls.__name__}'")
+
+
+class _FunctionPickler(pickle.Pickler):
+    # Guarded fast paths from a profile (src/profile_guided.py) are
+    # closures; they are saved as None, so restored code takes the checked
+    # path. Every other fast path is a module-level function.
+    def reducer_override(self, obj):
+        if callable(obj) and getattr(obj, 'pairs', None) is not None:
+            return type(None), ()
+        return NotImplemented
+
+
+def _pickle_functions(functions):
+    buffer = io.BytesIO()
+    _FunctionPickler(buffer, pickle.HIGHEST_PROTOCOL).dump(functions)
+    return buffer.getvalue()
+
+
+def save_checkpoint(path, variables, functions=None, source=None, position=None):
+    """
+    Write interpreter state to path, replacing an earlier checkpoint
+    atomically: a crash leaves either the old file or the new one.
+    variables: Mapping of global variables (a dict or an interpreter's ChainMap)
+    functions: Optional mapping of user-defined functions (name -> FuncDef)
+    source: Source text the state belongs to; its hash is stored so that a
+            resumed run can check it was given the same program
+    position: Streaming position to resume from (see streaming.iter_steps())
+    """
+    variables = dict(variables)
+    records = []
+    chunks = []
+    offset = HEADER.size + INDEX_RECORD.size * len(variables)
+
+    def place(data):
+        # Queue data at the next aligned offset and return that offset
+        nonlocal offset
+        padding = -offset % ALIGNMENT
+        if padding:
+            chunks.append(bytes(padding))
+            offset += padding
+        start = offset
+        chunks.append(data)
+        offset += len(data)
+        return start
+
+    for name, value in variables.items():
+        kind, payload = _encode(name, value)
+        encoded_name = name.encode('utf-8')
+        name_offset = place(encoded_name)
+        records.append((name_offset, len(encoded_name), kind, place(payload), len(payload)))
+    functions_data = _pickle_functions(dict(functions)) if functions else b''
+    functions_offset = place(functions_data)
+
+    header = HEADER.pack(MAGIC, CHECKPOINT_VERSION, 0, len(records),
+                         -1 if position is None else position,
+                         HEADER.size, functions_offset, len(functions_data),
+                         _NO_HASH if source is None else source_digest(source))
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, 'wb') as f:
+            f.write(header)
+            for record in records:
+                f.write(INDEX_RECORD.pack(*record))
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+# === Decoding ===
+
+class Checkpoint:
+    """
+    State read back by load_checkpoint().
+    Attributes:
+        version: Format version of the file
+        variables: Dict of the decoded global variables
+        functions: Dict of user-defined functions (name -> FuncDef)
+        position: Streaming position to resume from, or None
+        source_hash: SHA-256 digest of the saved source, or None
+    """
+    def __init__(self, version, variables, functions, position=None, source_hash=None):
+        self.version = version
+        self.variables = variables
+        self.functions = functions
+        self.position = position
+        self.source_hash = source_hash
+
+    def matches(self, source):
+        """
+        True if the checkpoint was saved for this source text.
+        """
+        return self.source_hash is not None and self.source_hash == source_digest(source)
+
+    def snapshot(self):
+        """
+        The state as a Snapshot, for Program.run(snapshot=...) or
+        Interpreter.from_snapshot(). Runs started from it work on copies of
+        its arrays, so they never change the checkpoint's values.
+        """
+        return Snapshot([self.variables], dict(self.functions))
+
+    def __repr__(self):
+        return (f"Checkpoint(version={self.version}, variables={len(self.variables)}, "
+                f"functions={len(self.functions)}, position={self.position})")
+
+
+def _decode(view, kind, offset, length):
+    end = offset + length
+    if kind == NONE:
+        return None
+    if kind == INT:
+        return int.from_bytes(view[offset:end], 'little', signed=True)
+    if kind == FLOAT:
+        return _FLOAT.unpack_from(view, offset)[0]
+    if kind == BOOL:
+        return view[offset] != 0
+    if kind == STR:
+        return str(view[offset:end], 'utf-8', 'surrogatepass')
+    if kind in _TYPECODES:
+        data = array(_TYPECODES[kind])
+        data.frombytes(view[offset:end])
+        if sys.byteorder != 'little':
+            data.byteswap()
+        return ArrayValue(data)
+    if kind == ARRAY_LIST:
+        items = []
+        while offset < end:
+            item_kind, item_length = ELEMENT.unpack_from(view, offset)
+            offset += ELEMENT.size
+            items.append(_decode(view, item_kind, offset, item_length))
+            offset += item_length
+        return ArrayValue(items)
+    raise Exception(f"Unknown value kind {kind} in checkpoint")
+
+
+def _read(view, path, names):
+    if len(view) < HEADER.size:
+        raise Exception(f"'{path}' is not a checkpoint file")
+    (magic, version, _, count, position, index_offset,
+     functions_offset, functions_size, digest) = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise Exception(f"'{path}' is not a checkpoint file")
+    if version != CHECKPOINT_VERSION:
+        raise Exception(f"Unsupported checkpoint version {version} in '{path}' "
+                        f"(expected {CHECKPOINT_VERSION})")
+    index_end = index_offset + count * INDEX_RECORD.size
+    if max(index_end, functions_offset + functions_size) > len(view):
+        raise Exception(f"Checkpoint '{path}' is truncated")
+    wanted = None if names is None else set(names)
+    variables = {}
+    for name_offset, name_length, kind, value_offset, length in list(
+            INDEX_RECORD.iter_unpack(view[index_offset:index_end])):
+        name = str(view[name_offset:name_offset + name_length], 'utf-8')
+        if wanted is None or name in wanted:
+            variables[name] = _decode(view, kind, value_offset, length)
+    functions = {}
+    if functions_size:
+        functions = pickle.loads(view[functions_offset:functions_offset + functions_size])
+    return Checkpoint(version, variables, functions,
+                      None if position < 0 else position,
+                      None if digest == _NO_HASH else digest)
+
+
+def load_checkpoint(path, names=None):
+    """
+    Read a checkpoint written by save_checkpoint() and return a Checkpoint.
+    names: Optional iterable of variable names to decode; the others are
+           skipped without reading their data
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise Exception(f"'{path}' is not a checkpoint file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                return _read(view, path, names)
+            finally:
+                # The map cannot close while a view of it is alive
+                view.release()
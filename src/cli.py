@@ -0,0 +1,281 @@
+# cli.py
+# Non-interactive command-line runner.
+# `run` executes a script file (or stdin) as one whole program, unlike the
+# line-at-a-time REPLs under __main__ in interpreter.py, my_parser.py and
+# lexer.py. Program output goes through a block-buffered writer that is
+# flushed before each input() and at exit. Flags choose the engine and
+# optimisation level, apply memory and time limits, and report phase
+# timings and counters on stderr, so one script can be compared across
+# configurations. --save-checkpoint writes the state a script built to a
+# checkpoint file (src/checkpoint.py) and --checkpoint starts a script from
+# such a file, so setup work is done once and reused by later runs.
+#
+# Usage (from the project root):
+#   python -m src.cli run script.txt
+#   python -m src.cli run script.txt --engine stack -O 2 --stats
+#   python -m src.cli run - --input input.txt --max-memory 50000000 --timeout 10 < script.txt
+#   python -m src.cli run script.txt -O 3 --stats-json stats.json
+#   python -m src.cli run setup.txt --save-checkpoint state.ckpt
+#   python -m src.cli run job.txt --checkpoint state.ckpt
+
+import argparse
+import asyncio
+import io
+import json
+import sys
+import time
+import tracemalloc
+
+from src.lexer import Lexer, TokenStream
+from src.my_parser import Parser
+from src.parallel_parse import parse_parallel
+from src.program import Program, ENGINES
+from src.limits import MemoryAccountant
+from src.batch import time_limit
+from src.profile_guided import load_profile
+from src.checkpoint import load_checkpoint, save_checkpoint
+
+DEFAULT_BUFFER_SIZE = 1 << 16
+
+
+def open_output(path=None, buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    Return (writer, owned): a block-buffered text writer on path, or on
+    standard output when path is None, and whether the caller must close it.
+    Falls back to sys.stdout itself when it has no file descriptor.
+    """
+    if path is not None:
+        return open(path, 'w', buffering=buffer_size), True
+    try:
+        fileno = sys.stdout.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        return sys.stdout, False
+    sys.stdout.flush()
+    return open(fileno, 'w', buffering=buffer_size, encoding=sys.stdout.encoding,
+                errors=sys.stdout.errors, closefd=False), True
+
+
+def flushing_input(output, inputs=None):
+    """
+    Input function for a run writing to a buffered output: the output is
+    flushed before every read, so prompts appear before the script waits.
+    inputs: Text whose lines are the inputs, or None for the built-in input()
+    """
+    lines = iter(inputs.splitlines()) if inputs is not None else None
+    def read():
+        output.flush()
+        if lines is None:
+            return input()
+        try:
+            return next(lines)
+        except StopIteration:
+            raise EOFError("EOF when reading a line") from None
+    return read
+
+
+def run_program(source, output, inputs=None, engine='recursive', optimize=0, strict=False,
+                profile=None, parse_workers=None, accountant=None, timeout=None,
+                trace_memory=False, liveness=False, restore=None, checkpoint=None):
+    """
+    Lex, parse, optimise and run source, timing each phase separately.
+    Returns a stats dict (JSON-serialisable); errors propagate.
+    inputs: Text whose lines are the inputs, or None for the built-in input()
+    engine: A name in ENGINES, or 'async' for Program.run_async()
+    parse_workers: Parse in a process pool (lexing is then timed as part
+                   of parsing and reported as None)
+    accountant: Optional MemoryAccountant enforcing memory limits
+    timeout: Seconds the whole run may take, or None
+    liveness: Free variables after their last use (see Program)
+    restore: Path of a checkpoint whose state the run starts from
+    checkpoint: Path to save the state to after the run
+    """
+    stats = {
+        'engine': engine,
+        'optimize': optimize,
+        'phases': {'lex': None, 'parse': 0.0, 'optimize': 0.0, 'exec': 0.0, 'total': 0.0},
+        'tokens': None,
+        'statements': 0,
+        'counters': {},
+        'memory': {},
+        'expr_cache': None,
+        'checkpoint': None,
+    }
+    phases = stats['phases']
+    started_tracing = False
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        tracemalloc.reset_peak()
+    try:
+        with time_limit(timeout):
+            if parse_workers is None:
+                start = time.perf_counter()
+                lexer = Lexer(source)
+                tokens = lexer.tokenize()
+                phases['lex'] = time.perf_counter() - start
+                stats['tokens'] = len(tokens)
+                start = time.perf_counter()
+                statements = Parser(TokenStream(tokens, lexer.lines)).parse()
+                phases['parse'] = time.perf_counter() - start
+                del tokens
+            else:
+                start = time.perf_counter()
+                statements = parse_parallel(source, workers=parse_workers)
+                phases['parse'] = time.perf_counter() - start
+            stats['statements'] = len(statements)
+
+            start = time.perf_counter()
+            program = Program(source, optimize=optimize, strict=strict, profile=profile,
+                              statements=statements, liveness=liveness)
+            phases['optimize'] = time.perf_counter() - start
+            del statements
+
+            snapshot = None
+            if restore is not None or checkpoint is not None:
+                stats['checkpoint'] = {'restore': None, 'save': None}
+            if restore is not None:
+                start = time.perf_counter()
+                snapshot = load_checkpoint(restore).snapshot()
+                stats['checkpoint']['restore'] = time.perf_counter() - start
+            input_func = flushing_input(output, inputs)
+            start = time.perf_counter()
+            try:
+                if engine == 'async':
+                    result = asyncio.run(program.run_async(inputs=input_func, output=output,
+                                                           accountant=accountant, snapshot=snapshot))
+                else:
+                    result = program.run(inputs=input_func, output=output, accountant=accountant,
+                                         engine=engine, snapshot=snapshot)
+            finally:
+                phases['exec'] = time.perf_counter() - start
+            if checkpoint is not None:
+                start = time.perf_counter()
+                save_checkpoint(checkpoint, result.variables, result.functions, source)
+                stats['checkpoint']['save'] = time.perf_counter() - start
+        stats['counters'] = result.counters
+        if result.expr_cache is not None:
+            stats['expr_cache'] = result.expr_cache.stats()
+    finally:
+        phases['total'] = sum(value for name, value in phases.items()
+                              if name != 'total' and value is not None)
+        if accountant is not None:
+            stats['memory']['accounted_peak'] = accountant.peak
+            stats['memory']['largest_value'] = accountant.largest_value
+        if trace_memory:
+            stats['memory']['traced_peak'] = tracemalloc.get_traced_memory()[1]
+            if started_tracing:
+                tracemalloc.stop()
+    return stats
+
+
+def format_stats(stats):
+    """
+    Human-readable summary of a run_program() stats dict.
+    """
+    phases = stats['phases']
+    def seconds(value):
+        return "-" if value is None else f"{value:.6f}s"
+    lines = [
+        f"engine {stats['engine']}, optimize {stats['optimize']}",
+        "phases: " + "  ".join(f"{name} {seconds(value)}" for name, value in phases.items()),
+        f"tokens {'-' if stats['tokens'] is None else stats['tokens']}, "
+        f"statements {stats['statements']}",
+    ]
+    if stats['counters']:
+        lines.append("counters: " + "  ".join(f"{name} {value}" for name, value in stats['counters'].items()))
+    if stats['memory']:
+        lines.append("memory: " + "  ".join(f"{name} {value}" for name, value in stats['memory'].items()))
+    cache = stats['expr_cache']
+    if cache is not None:
+        lines.append(f"expr cache: hits {cache['hits']}  misses {cache['misses']}  "
+                     f"hit rate {cache['hit_rate']:.1%}")
+    if stats['checkpoint'] is not None:
+        lines.append("checkpoint: " + "  ".join(f"{name} {seconds(value)}"
+                                                for name, value in stats['checkpoint'].items()))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Run programs non-interactively.")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help="run a script file (or - for stdin) as one program")
+    run.add_argument('script', help="script file, or - to read the program from stdin")
+    run.add_argument('--input', help="file whose lines are the script's input (default: stdin, "
+                                     "or no input when the script itself is read from stdin)")
+    run.add_argument('-o', '--output', help="write the script's output to this file instead of stdout")
+    run.add_argument('--buffer-size', type=int, default=DEFAULT_BUFFER_SIZE,
+                     help=f"output buffer size in bytes (default {DEFAULT_BUFFER_SIZE})")
+    run.add_argument('--engine', choices=list(ENGINES) + ['async'], default='recursive',
+                     help="execution engine (default recursive)")
+    run.add_argument('-O', '--optimize', type=int, choices=range(4), default=0,
+                     help="optimisation level 0-3 (default 0, see Program)")
+    run.add_argument('--strict', action='store_true', help="fail the compile on certain type errors")
+    run.add_argument('--profile', action='store_true',
+                     help="optimise with the script's recorded profile (SCRIPT.profile.json)")
+    run.add_argument('--parse-workers', type=int, help="lex and parse in this many processes")
+    run.add_argument('--checkpoint', metavar='PATH', help="start from the state saved in this checkpoint")
+    run.add_argument('--save-checkpoint', metavar='PATH',
+                     help="save the variables and functions to this checkpoint after the run")
+    run.add_argument('--liveness', action='store_true',
+                     help="delete each variable after its last use and skip dead assignments")
+    run.add_argument('--max-value-bytes', type=int, help="largest single value allowed")
+    run.add_argument('--max-memory', type=int, help="most bytes the run's globals may hold")
+    run.add_argument('--timeout', type=float, help="seconds the run may take")
+    run.add_argument('--trace-memory', action='store_true', help="record peak memory with tracemalloc")
+    run.add_argument('--stats', action='store_true', help="print phase timings and counters to stderr")
+    run.add_argument('--stats-json', metavar='PATH', help="write the stats as JSON to PATH (- for stderr)")
+    args = arg_parser.parse_args(argv)
+
+    if args.script == '-':
+        source = sys.stdin.read()
+        inputs = ""
+    else:
+        with open(args.script) as f:
+            source = f.read()
+        inputs = None
+    if args.input:
+        with open(args.input) as f:
+            inputs = f.read()
+    profile = None
+    if args.profile:
+        if args.script == '-':
+            print("Error: --profile needs a script file", file=sys.stderr)
+            return 2
+        profile = load_profile(args.script, source)
+        if profile is None:
+            print(f"Warning: no profile for the current source of {args.script}", file=sys.stderr)
+    accountant = None
+    if args.max_value_bytes is not None or args.max_memory is not None:
+        accountant = MemoryAccountant(args.max_value_bytes, args.max_memory)
+
+    output, owned = open_output(args.output, args.buffer_size)
+    error = None
+    try:
+        stats = run_program(source, output, inputs, engine=args.engine, optimize=args.optimize,
+                            strict=args.strict, profile=profile, parse_workers=args.parse_workers,
+                            accountant=accountant, timeout=args.timeout,
+                            trace_memory=args.trace_memory, liveness=args.liveness,
+                            restore=args.checkpoint, checkpoint=args.save_checkpoint)
+    except Exception as e:
+        error = e
+    finally:
+        # Output printed before an error is still written
+        output.flush()
+        if owned:
+            output.close()
+    if error is not None:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    if args.stats:
+        print(format_stats(stats), file=sys.stderr)
+    if args.stats_json == '-':
+        print(json.dumps(stats, indent=2), file=sys.stderr)
+    elif args.stats_json:
+        with open(args.stats_json, 'w') as f:
+            json.dump(stats, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+# environment.py
+# Copy-on-write layering for interpreter globals.
+# A snapshot freezes the current variable dicts as read-only layers; every
+# interpreter forked from it gets its own top layer in a ChainMap, so
+# forking costs O(layers) and writes never reach the parent or siblings.
+# Arrays are mutable in place, so the top layer starts with copies of the
+# arrays visible in the snapshot (aliases between them are kept).
+
+from collections import ChainMap
+
+from src.arrays import ArrayValue, copy_value
+
+# Chains deeper than this are flattened into one layer when snapshotted,
+# bounding lookup cost at the price of an occasional copy.
+MAX_LAYERS = 16
+
+
+class Snapshot:
+    """
+    Frozen view of interpreter globals at one point in time.
+    Attributes:
+        layers: Tuple of dicts, most recent first; none of them is written again
+        functions: User-defined functions (name -> FuncDef) at snapshot time
+    """
+    __slots__ = ('layers', 'functions')
+
+    def __init__(self, layers, functions=None):
+        self.layers = tuple(layers)
+        self.functions = functions or {}
+
+    @property
+    def depth(self):
+        # Number of layers a lookup may have to search
+        return len(self.layers)
+
+    def new_environment(self):
+        """
+        Return a fresh writable mapping layered on top of this snapshot.
+        """
+        env = ChainMap({}, *self.layers)
+        copies = {}
+        top = env.maps[0]
+        for name, value in env.items():
+            if type(value) is ArrayValue:
+                top[name] = copy_value(value, copies)
+        return env
+
+    def to_dict(self):
+        """
+        Flatten the snapshot into a plain dict.
+        """
+        return dict(ChainMap(*self.layers))
+
+    def __contains__(self, name):
+        return any(name in layer for layer in self.layers)
+
+    def __getitem__(self, name):
+        for layer in self.layers:
+            if name in layer:
+                return layer[name]
+        raise KeyError(name)
+
+    def __len__(self):
+        return len(self.to_dict())
+
+    def __repr__(self):
+        return f"Snapshot({self.to_dict()!r}, depth={self.depth})"
+
+
+def freeze(env, max_layers=MAX_LAYERS):
+    """
+    Turn a globals mapping (dict or ChainMap) into a Snapshot.
+    The caller must stop writing to env afterwards and switch to
+    snapshot.new_environment() instead.
+    """
+    maps = env.maps if isinstance(env, ChainMap) else [env]
+    # Empty layers add lookup cost without holding anything
+    layers = [layer for layer in maps if layer]
+    if len(layers) > max_layers:
+        merged = {}
+        for layer in reversed(layers):
+            merged.update(layer)
+        layers = [merged]
+    return Snapshot(layers)
@@ -0,0 +1,143 @@
+# expr_cache.py
+# Runtime cache of pure expression values, validated by variable versions.
+# The optimize=3 pass (cache_pure_expressions() in src/optimizer.py) wraps
+# pure expressions inside loops in CachedExpr nodes. Every assignment to a
+# global (and every append() to one) bumps that variable's version number;
+# a cache entry remembers the versions of the variables its expression read
+# and is reused only while all of them are unchanged. An array can also be
+# changed through another name (an alias or a function parameter), so an
+# entry also remembers the append counts of the arrays it read, counted per
+# array whatever name the append went through (an array holding other arrays
+# falls back to a count of all appends, as a nested array may be changed too).
+# Cached arrays are copied on store and on every hit, as re-evaluating the
+# expression would have built a new array each time.
+# Memory is bounded by an entry count and a byte budget, evicting least
+# recently used entries.
+
+from collections import OrderedDict
+
+from src.arrays import ArrayValue, copy_value
+from src.limits import value_size
+
+DEFAULT_EXPR_CACHE_SIZE = 1024
+DEFAULT_EXPR_CACHE_BYTES = 8 * 1024 * 1024
+
+MISS = object()     # Returned by lookup() when there is no valid entry
+
+
+class ExprCache:
+    """
+    Bounded cache of CachedExpr values with hit-rate counters.
+    Arguments:
+        maxsize: Maximum number of cached expressions
+        max_bytes: Maximum total size of cached values; larger values are
+                   not cached at all
+    """
+    def __init__(self, maxsize=DEFAULT_EXPR_CACHE_SIZE, max_bytes=DEFAULT_EXPR_CACHE_BYTES):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.versions = {}        # variable name -> version, bumped on every write
+        self.appends = 0          # Appends to any array, through any name
+        self.watched = {}         # id(array) -> appends to it, for arrays entries read
+        self.entries = OrderedDict()  # id(node) -> (node, versions, value, size, watch)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0    # Misses because a variable read had changed
+        self.evictions = 0
+        self.skipped = 0          # Values too large to cache
+
+    def bump(self, name):
+        # A global variable was written
+        versions = self.versions
+        versions[name] = versions.get(name, 0) + 1
+
+    def appended(self, array, name):
+        # array was appended to through global name (None for a local)
+        self.appends += 1
+        if id(array) in self.watched:
+            self.watched[id(array)] += 1
+        if name is not None:
+            self.bump(name)
+
+    def current(self, node, watch):
+        # Present versions of the variables node reads and of the arrays in
+        # watch (ids, or None for "any array")
+        get = self.versions.get
+        versions = [get(name, 0) for name in node.reads]
+        for key in watch:
+            versions.append(self.appends if key is None else self.watched[key])
+        return tuple(versions)
+
+    def watch(self, node, variables):
+        # What to watch for appends: each flat array node reads by identity,
+        # and all appends if one of them holds other arrays
+        watch = []
+        for name in node.reads:
+            read = variables.get(name)
+            if type(read) is ArrayValue:
+                if read.typecode is None and any(type(item) is ArrayValue for item in read.data):
+                    return (None,)
+                watch.append(id(read))
+        watched = self.watched
+        if len(watched) > 4 * self.maxsize:
+            # Forget arrays no entry watches any more; id reuse after that
+            # can only cost a spurious miss
+            live = {key for entry in self.entries.values() for key in entry[4]}
+            self.watched = watched = {key: count for key, count in watched.items() if key in live}
+        for key in watch:
+            watched.setdefault(key, 0)
+        return tuple(watch)
+
+    def lookup(self, node):
+        """
+        Cached value of node, or MISS if there is none or it is stale.
+        """
+        entry = self.entries.get(id(node))
+        if entry is not None:
+            if entry[1] == self.current(node, entry[4]):
+                self.hits += 1
+                self.entries.move_to_end(id(node))
+                return copy_value(entry[2])
+            self.invalidations += 1
+        self.misses += 1
+        return MISS
+
+    def store(self, node, value, variables):
+        """
+        Cache the value just computed for node.
+        variables: The globals node was evaluated with
+        """
+        size = value_size(value)
+        if size > self.max_bytes:
+            self.skipped += 1
+            return
+        old = self.entries.pop(id(node), None)
+        if old is not None:
+            self.bytes -= old[3]
+        # Keep a reference to node so its id cannot be reused while cached
+        watch = self.watch(node, variables)
+        self.entries[id(node)] = (node, self.current(node, watch), copy_value(value),
+                                  size, watch)
+        self.bytes += size
+        while len(self.entries) > self.maxsize or self.bytes > self.max_bytes:
+            dropped = self.entries.popitem(last=False)[1][3]
+            self.bytes -= dropped
+            self.evictions += 1
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'evictions': self.evictions,
+            'skipped': self.skipped,
+            'size': len(self.entries),
+            'bytes': self.bytes,
+            'hit_rate': self.hit_rate,
+        }
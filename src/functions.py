@@ -0,0 +1,365 @@
+# functions.py
+# Runtime support for user-defined functions.
+# Calls run on an explicit stack of generators instead of the Python call
+# stack, so recursion depth is limited by memory (MAX_CALL_DEPTH), not by
+# Python's recursion limit. Parts of a function body that contain no call
+# or return (node.suspends is False) are still evaluated by the ordinary
+# recursive visitor for speed. call_function_async() drives the same
+# generators for AsyncInterpreter, stepping into loops, prints and input()
+# too, so function bodies yield to the event loop like top-level code.
+
+from collections import OrderedDict
+
+from src.my_parser import (
+    BinOp, UnaryOp, PrintStmt,
+    IfStmt, WhileStmt, ForStmt, InputExpr,
+    Call, Return, LocalAssign,
+    ArrayLiteral, Index, Append
+)
+from src.arrays import ArrayValue, BUILTINS, pack, index_value, copy_value
+
+MAX_CALL_DEPTH = 100000
+DEFAULT_MEMO_SIZE = 1024
+
+UNSET = object()    # Marks a frame slot that has not been assigned yet
+_MISS = object()    # Cache miss marker
+_BACK_EDGE = object()   # Yielded by a loop generator after each iteration
+
+
+class LRUCache:
+    """
+    Bounded least-recently-used cache with hit-rate statistics, used for
+    the results of memo functions.
+    """
+    def __init__(self, maxsize=DEFAULT_MEMO_SIZE):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return _MISS
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.data),
+            'hit_rate': self.hit_rate,
+        }
+
+
+def memo_key(args):
+    """
+    Cache key for a list of argument values, or None if they are unhashable.
+    Types are part of the key so 1, 1.0 and true stay distinct.
+    """
+    key = tuple((type(arg), arg) for arg in args)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class _Return:
+    # Carries a return value up through the enclosing block generators
+    __slots__ = ('value',)
+    def __init__(self, value):
+        self.value = value
+
+
+class _CallRequest:
+    # Yielded by a Call generator to ask the driver to start a new call
+    __slots__ = ('name', 'args')
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+
+class _Print:
+    # Yielded by a PrintStmt generator to hand its value to the driver
+    __slots__ = ('value',)
+    def __init__(self, value):
+        self.value = value
+
+
+def new_frame(func, args):
+    """
+    Build the slot list for a call of func with evaluated args.
+    """
+    if len(args) != len(func.params):
+        raise Exception(f"Function '{func.name}' expects {len(func.params)} "
+                        f"argument(s), got {len(args)}")
+    frame = list(args)
+    frame.extend([UNSET] * (len(func.local_names) - len(args)))
+    return frame
+
+
+# === Generators ===
+# Each generator steps through one suspending node. It yields child nodes
+# (or _CallRequests) and receives their values back from the driver.
+
+def _run_block(statements):
+    for stmt in statements:
+        value = yield stmt
+        if type(value) is _Return:
+            return value
+    return None
+
+def _gen_function(interp, func, key):
+    value = yield from _run_block(func.body)
+    value = value.value if type(value) is _Return else None
+    if key is not None:
+        # The cache keeps its own copy of an array and hands out a new copy
+        # on every hit, as a call would have built a new array each time
+        interp.memo_cache(func).put(key, copy_value(value))
+    return value
+
+def _gen_node(interp, node, frame):
+    if isinstance(node, Call):
+        args = []
+        for arg in node.args:
+            args.append((yield arg))
+        return (yield _CallRequest(node.name, args))
+    if isinstance(node, Return):
+        value = (yield node.expr) if node.expr is not None else None
+        return _Return(value)
+    if isinstance(node, BinOp):
+        left = yield node.left
+        right = yield node.right
+        if node.fast is not None and interp.accountant is None:
+            return node.fast(left, right)
+        return interp.apply_binop(node.op, left, right)
+    if isinstance(node, UnaryOp):
+        value = yield node.expr
+        if node.fast is not None:
+            return node.fast(value)
+        return interp.apply_unaryop(node.op, value)
+    if isinstance(node, LocalAssign):
+        value = yield node.value
+        frame[node.slot] = value
+        interp.var_writes += 1
+        return value
+    if isinstance(node, ArrayLiteral):
+        elements = []
+        for element in node.elements:
+            elements.append((yield element))
+        return ArrayValue(pack(elements))
+    if isinstance(node, Index):
+        target = yield node.target
+        index = yield node.index
+        return index_value(target, index)
+    if isinstance(node, Append):
+        value = yield node.value
+        interp.append_value(node, value)
+        return None
+    if isinstance(node, PrintStmt):
+        yield _Print((yield node.expr))
+        return None
+    if isinstance(node, IfStmt):
+        if (yield node.condition):
+            return (yield from _run_block(node.true_block))
+        if node.false_block is not None:
+            return (yield from _run_block(node.false_block))
+        return None
+    if isinstance(node, WhileStmt):
+        while (yield node.condition):
+            interp.loop_iterations += 1
+            value = yield from _run_block(node.body)
+            if type(value) is _Return:
+                return value
+            yield _BACK_EDGE
+        return None
+    if isinstance(node, ForStmt):
+        start = yield node.start
+        values = interp.loop_range(start, (yield node.stop))
+        interp.store_loop_var(node, start)
+        for loop_value in values:
+            frame[node.slot] = loop_value
+            interp.var_writes += 1
+            interp.loop_iterations += 1
+            value = yield from _run_block(node.body)
+            if type(value) is _Return:
+                return value
+            yield _BACK_EDGE
+        if values:
+            interp.store_loop_var(node, values.stop)
+        return None
+    raise Exception(f"No visit method for node type: {type(node).__name__}")
+
+
+# === Driver ===
+
+class _CallStack:
+    # State of one driver run: entries are (generator, frame, func) tuples;
+    # func is the FuncDef for the generator running a whole call, None for
+    # one of its statements
+    def __init__(self, interp):
+        self.interp = interp
+        self.entries = []
+        self.callers = []
+        self.depth = 0
+
+    def start(self, name, args):
+        # Begin a call: returns its value on a memo hit or for a built-in,
+        # else pushes it and returns _MISS
+        interp = self.interp
+        callers = self.callers
+        func = interp.functions.get(name)
+        if func is None:
+            builtin = BUILTINS.get(name)
+            if builtin is not None:
+                return builtin(args)
+            raise Exception(f"Function '{name}' is not defined")
+        if callers and callers[-1].memo and not func.memo:
+            # Its result would be cached without the callee's effects
+            raise Exception(f"memo function '{callers[-1].name}' must not call "
+                            f"non-memo function '{name}'")
+        key = None
+        if func.memo:
+            key = memo_key(args)
+            if key is not None:
+                cached = interp.memo_cache(func).get(key)
+                if cached is not _MISS:
+                    return copy_value(cached)
+        self.depth += 1
+        if self.depth > MAX_CALL_DEPTH:
+            raise Exception(f"Maximum call depth ({MAX_CALL_DEPTH}) exceeded in '{name}'")
+        self.entries.append((_gen_function(interp, func, key), new_frame(func, args), func))
+        callers.append(func)
+        return _MISS
+
+    def finish(self):
+        # The generator of a whole call has returned and been popped
+        self.callers.pop()
+        self.depth -= 1
+
+
+def call_function(interp, name, args):
+    """
+    Call the function called name with evaluated args and return its result.
+    Nested calls made by the function body are run by the same loop.
+    """
+    outer_frame = interp.frame
+    calls = _CallStack(interp)
+    stack = calls.entries
+    start = calls.start
+    try:
+        value = start(name, args)
+        if value is not _MISS:
+            return value
+        value = None
+        while stack:
+            gen, frame, func = stack[-1]
+            interp.frame = frame
+            try:
+                request = gen.send(value)
+            except StopIteration as stop:
+                stack.pop()
+                if func is not None:
+                    calls.finish()
+                value = stop.value
+                continue
+            kind = type(request)
+            if kind is _CallRequest:
+                value = start(request.name, request.args)
+                if value is _MISS:
+                    value = None
+            elif request is _BACK_EDGE:
+                value = None
+            elif kind is _Print:
+                print(request.value, file=interp.output)
+                interp.print_count += 1
+                value = None
+            elif request.suspends:
+                interp.node_count += 1
+                stack.append((_gen_node(interp, request, frame), frame, None))
+                value = None
+            else:
+                value = interp.visit(request)
+        return value
+    finally:
+        interp.frame = outer_frame
+
+
+# Statements the async driver counts as steps; loops and prints are always
+# stepped through so their iterations yield and their output is awaited
+_STEPS = (LocalAssign, PrintStmt, IfStmt, WhileStmt, ForStmt, Return, Append)
+_STEPPED = (IfStmt, WhileStmt, ForStmt, PrintStmt)
+
+async def call_function_async(interp, name, args):
+    """
+    Coroutine version of call_function() for an AsyncInterpreter: awaits
+    interp.tick() at every statement, loop back-edge and call, awaits
+    input() through interp.evaluate() and prints through interp.write_line().
+    """
+    outer_frame = interp.frame
+    calls = _CallStack(interp)
+    stack = calls.entries
+    try:
+        await interp.tick()
+        value = calls.start(name, args)
+        if value is not _MISS:
+            return value
+        value = None
+        while stack:
+            gen, frame, func = stack[-1]
+            interp.frame = frame
+            try:
+                request = gen.send(value)
+            except StopIteration as stop:
+                stack.pop()
+                if func is not None:
+                    calls.finish()
+                value = stop.value
+                continue
+            kind = type(request)
+            if kind is _CallRequest:
+                await interp.tick()
+                value = calls.start(request.name, request.args)
+                if value is _MISS:
+                    value = None
+                continue
+            if kind is _Print:
+                await interp.write_line(request.value)
+                value = None
+                continue
+            if request is _BACK_EDGE:
+                await interp.tick()
+                value = None
+                continue
+            if kind in _STEPS:
+                await interp.tick()
+            if kind is InputExpr:
+                value = await interp.evaluate(request)
+            elif request.suspends or kind in _STEPPED or interp.awaits(request):
+                interp.node_count += 1
+                stack.append((_gen_node(interp, request, frame), frame, None))
+                value = None
+            else:
+                value = interp.visit(request)
+        return value
+    finally:
+        interp.frame = outer_frame
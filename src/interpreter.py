@@ -3,20 +3,104 @@ from src.my_parser import Parser
 from src.my_parser import (
     Num, Bool, BinOp, UnaryOp, String,
     VarAssign, VarAccess, PrintStmt,
-    IfStmt, WhileStmt, InputExpr
+    IfStmt, WhileStmt, ForStmt, InputExpr,
+    FuncDef, Call, Return, LocalAccess, LocalAssign,
+    ArrayLiteral, Index, Append,
+    CSEStore, CSELoad, CachedExpr, Release, DeadStore
 )
+from src.expr_cache import MISS
+from src.arrays import ArrayValue, pack, index_value, elementwise, copy_value
+from src.environment import freeze
+from src.functions import call_function, LRUCache, UNSET, DEFAULT_MEMO_SIZE
 from src.my_token import (
     TT_PLUS, TT_MINUS, TT_MUL, TT_DIV,
     TT_EQ, TT_NE, TT_LT, TT_LTE,
     TT_GT, TT_GTE, TT_AND, TT_OR, TT_NOT
 )
 
+def line_reader(text):
+    """
+    Return an input function that hands out the lines of text one by one,
+    raising EOFError when they run out, like the built-in input() does.
+    """
+    lines = iter(text.splitlines() if text else [])
+    def read():
+        try:
+            return next(lines)
+        except StopIteration:
+            raise EOFError("EOF when reading a line") from None
+    return read
+
 class Interpreter:
-    def __init__(self):
+    def __init__(self, input_func=None, output=None, accountant=None):
         # Store global variables and their values here
         self.global_vars = {}
+        # Callable returning the next input line; None uses the built-in input()
+        self.input_func = input_func
+        # File-like object that print writes to; None means sys.stdout
+        self.output = output
+        # Runtime counters, cheap enough to leave on (see src/stats.py)
+        self.node_count = 0
+        self.loop_iterations = 0
+        self.var_reads = 0
+        self.var_writes = 0
+        self.print_count = 0
+        self.evaluations_avoided = 0
+        # Values of common subexpressions cached by CSEStore nodes
+        self.cse_values = {}
+        # User-defined functions by name, the active call frame (a list of
+        # local slots, None at top level) and memo result caches by name
+        self.functions = {}
+        self.frame = None
+        self.memo_size = DEFAULT_MEMO_SIZE
+        self.memo_caches = {}
+        # Optional MemoryAccountant (src/limits.py) checking value sizes and
+        # the memory held in globals; None disables accounting
+        self.accountant = accountant
+        # Optional ExprCache (src/expr_cache.py) for CachedExpr nodes; every
+        # global write bumps its variable version. None evaluates them plainly
+        self.expr_cache = None
+
+    def counters(self):
+        # Snapshot of the runtime counters as a plain dict
+        return {
+            'nodes': self.node_count,
+            'loop_iterations': self.loop_iterations,
+            'var_reads': self.var_reads,
+            'var_writes': self.var_writes,
+            'prints': self.print_count,
+            'evaluations_avoided': self.evaluations_avoided,
+        }
+
+    def snapshot(self):
+        """
+        Freeze the current globals into a Snapshot and continue on a fresh
+        copy-on-write layer, so later writes do not change the snapshot.
+        """
+        snap = freeze(self.global_vars)
+        snap.functions = dict(self.functions)
+        self.global_vars = snap.new_environment()
+        return snap
+
+    @classmethod
+    def from_snapshot(cls, snap, input_func=None, output=None):
+        """
+        Create an interpreter whose globals start as a copy-on-write view of snap.
+        """
+        interpreter = cls(input_func=input_func, output=output)
+        interpreter.global_vars = snap.new_environment()
+        interpreter.functions = dict(snap.functions)
+        return interpreter
+
+    def fork(self):
+        """
+        Return a new interpreter sharing the current globals copy-on-write.
+        Writes in either interpreter are never visible to the other.
+        """
+        return type(self).from_snapshot(self.snapshot(), self.input_func, self.output)
 
     def visit(self, node):
+        self.node_count += 1
         # Build method name like 'visit_Num' or 'visit_VarAssign'
         method_name = 'visit_' + type(node).__name__
         # Get the method by name; if not found, raise exception
@@ -39,24 +123,150 @@ class Interpreter:
         return node.value
 
     def visit_VarAccess(self, node):
-        # Access the value of a variable from globals dictionary
-        name = node.name
-        if name not in self.global_vars:
-            raise Exception(f"Variable '{name}' is not defined")
-        return self.global_vars[name]
+        # Access the value of a variable from globals (one lookup, which
+        # matters when globals are a layered ChainMap after a fork)
+        self.var_reads += 1
+        try:
+            return self.global_vars[node.name]
+        except KeyError:
+            raise Exception(f"Variable '{node.name}' is not defined") from None
 
     def visit_VarAssign(self, node):
         # Evaluate the right-hand side expression
         value = self.visit(node.value)
         # Store value in the variable name in globals
-        self.global_vars[node.name] = value
+        self.store_global(node.name, value)
+        return value
+
+    def store_global(self, name, value):
+        # Assign a global variable, accounting for the memory it holds
+        if self.accountant is not None:
+            global_vars = self.global_vars
+            had_old = name in global_vars
+            self.accountant.replace(global_vars[name] if had_old else None, value, had_old)
+        if self.expr_cache is not None:
+            self.expr_cache.bump(name)
+        self.global_vars[name] = value
+        self.var_writes += 1
+
+    def visit_FuncDef(self, node):
+        # Define (or redefine) a function. A redefinition drops every memo
+        # cache: other memo functions may have cached results that called it
+        if node.name in self.functions:
+            self.memo_caches.clear()
+        self.functions[node.name] = node
+
+    def visit_Call(self, node):
+        # Evaluate arguments, then run the call on the iterative call driver
+        args = [self.visit(arg) for arg in node.args]
+        return self.call_function(node.name, args)
+
+    def call_function(self, name, args):
+        # Call a user-defined function with already evaluated arguments
+        return call_function(self, name, args)
+
+    def visit_Return(self, node):
+        # Returns are handled by the call driver; reaching here is a bug
+        raise Exception("'return' outside function")
+
+    def visit_LocalAccess(self, node):
+        # Read a local variable from the current call frame
+        self.var_reads += 1
+        value = self.frame[node.slot]
+        if value is UNSET:
+            raise Exception(f"Variable '{node.name}' is not defined")
+        return value
+
+    def visit_LocalAssign(self, node):
+        # Store a local variable in the current call frame
+        value = self.visit(node.value)
+        self.frame[node.slot] = value
+        self.var_writes += 1
+        return value
+
+    def visit_ArrayLiteral(self, node):
+        # Build a new array from the element values
+        return ArrayValue(pack([self.visit(element) for element in node.elements]))
+
+    def visit_Index(self, node):
+        # Read one element of an array (or character of a string)
+        return index_value(self.visit(node.target), self.visit(node.index))
+
+    def visit_Append(self, node):
+        # Append a value to the array held by a variable
+        self.append_value(node, self.visit(node.value))
+
+    def append_value(self, node, value):
+        # Append an already evaluated value for an Append node, in place:
+        # every name bound to the array sees the change
+        target = node.target
+        array = self.visit(target)
+        if type(array) is not ArrayValue:
+            raise Exception(f"TypeError: append() expects an array, got '{type(array).__name__}'")
+        is_local = isinstance(target, LocalAccess)
+        if self.accountant is not None:
+            self.accountant.append(array, value, not is_local)
+        if self.expr_cache is not None:
+            self.expr_cache.appended(array, None if is_local else target.name)
+        array.append(value)
+        self.var_writes += 1
+
+    def memo_cache(self, func):
+        # The LRU result cache of a memo function, created on first use
+        cache = self.memo_caches.get(func.name)
+        if cache is None:
+            cache = self.memo_caches[func.name] = LRUCache(self.memo_size)
+        return cache
+
+    def memo_stats(self):
+        # Hit-rate statistics of every memo function called so far
+        return {name: cache.stats() for name, cache in self.memo_caches.items()}
+
+    def visit_CSEStore(self, node):
+        # Evaluate a common subexpression and cache it for later CSELoads
+        value = self.visit(node.expr)
+        self.cse_values[node.slot] = value
         return value
 
+    def visit_CSELoad(self, node):
+        # Reuse a common subexpression computed earlier in the same region
+        # An array gets a copy, as re-evaluating it would have built a new one
+        self.evaluations_avoided += node.size
+        return copy_value(self.cse_values[node.slot])
+
+    def visit_CachedExpr(self, node):
+        # Reuse the expression's value while the variables it reads are unchanged
+        cache = self.expr_cache
+        if cache is None:
+            return self.visit(node.expr)
+        value = cache.lookup(node)
+        if value is not MISS:
+            self.evaluations_avoided += node.size
+            return value
+        value = self.visit(node.expr)
+        cache.store(node, value, self.global_vars)
+        return value
+
+    def visit_Release(self, node):
+        # Delete globals the program never reads again (see release_dead_values())
+        global_vars = self.global_vars
+        for name in node.names:
+            value = global_vars.pop(name, UNSET)
+            if value is not UNSET and self.accountant is not None:
+                self.accountant.release(value)
+
+    def visit_DeadStore(self, node):
+        # An assignment whose value is never read (see release_dead_values()).
+        # It only runs when an accountant may refuse it; a Release follows
+        if self.accountant is not None:
+            self.visit(node.assign)
+
     def visit_PrintStmt(self, node):
         # Evaluate expression to print
         value = self.visit(node.expr)
-        # Print the value to console
-        print(value)
+        # Print the value to the output stream (console by default)
+        print(value, file=self.output)
+        self.print_count += 1
 
     def visit_IfStmt(self, node):
         # Evaluate the if condition
@@ -73,19 +283,96 @@ class Interpreter:
     def visit_WhileStmt(self, node):
         # Loop while condition is true
         while self.visit(node.condition):
+            self.loop_iterations += 1
             # Execute all statements inside the loop body
             for stmt in node.body:
                 self.visit(stmt)
 
+    def visit_ForStmt(self, node):
+        # Counted loop: the counter and bound are plain Python ints, and the
+        # variable is only written for the body to read
+        start = self.visit(node.start)
+        values = self.loop_range(start, self.visit(node.stop))
+        body = node.body
+        visit = self.visit
+        iterations = 0
+        self.store_loop_var(node, start)
+        # Writes that need no accounting or cache versioning go straight
+        # into the frame or globals and are counted in bulk
+        if node.slot is not None:
+            target, key = self.frame, node.slot
+        elif self.accountant is None and self.expr_cache is None:
+            target, key = self.global_vars, node.name
+        else:
+            target = None
+        try:
+            if target is not None:
+                for value in values:
+                    target[key] = value
+                    iterations += 1
+                    for stmt in body:
+                        visit(stmt)
+            else:
+                for value in values:
+                    self.store_global(node.name, value)
+                    iterations += 1
+                    for stmt in body:
+                        visit(stmt)
+        finally:
+            self.loop_iterations += iterations
+            if target is not None:
+                self.var_writes += iterations
+        if values:
+            self.store_loop_var(node, values.stop)
+
+    def loop_range(self, start, stop):
+        """
+        Check the bounds of a for loop and return the range it counts over.
+        """
+        if type(start) is not int or type(stop) is not int:
+            raise Exception(f"TypeError: for loop bounds must be integers, got "
+                            f"'{type(start).__name__}' and '{type(stop).__name__}'")
+        return range(start, stop)
+
+    def store_loop_var(self, node, value):
+        # Assign a for loop's variable outside the counting loop itself.
+        # Like the equivalent while loop, it holds the first value before
+        # the body runs and the bound after a loop that ran at all
+        if node.slot is not None:
+            self.frame[node.slot] = value
+            self.var_writes += 1
+        else:
+            self.store_global(node.name, value)
+
     def visit_InputExpr(self, node):
-        # Read input from user and return as string
+        # Read input from the configured source, or from the user
+        if self.input_func is not None:
+            return self.input_func()
         return input()
 
     def visit_BinOp(self, node):
-        # Visit left and right subexpressions
+        # Visit left and right subexpressions, then apply the operator
         left = self.visit(node.left)
         right = self.visit(node.right)
-        op_type = node.op.type
+        # Operand types proven at compile time: skip the runtime checks
+        # (unless sizes must be checked first)
+        fast = node.fast
+        if fast is not None and self.accountant is None:
+            return fast(left, right)
+        return self.apply_binop(node.op, left, right)
+
+    def apply_binop(self, op, left, right):
+        # Apply binary operator token op to already evaluated operands
+        op_type = op.type
+
+        # Refuse results that would exceed the memory limits before creating them
+        if self.accountant is not None:
+            self.accountant.check_binop(op_type, left, right)
+
+        # Arrays: the operator applies elementwise as one bulk operation
+        if type(left) is ArrayValue or type(right) is ArrayValue:
+            if op_type not in (TT_AND, TT_OR):
+                return elementwise(self, op, left, right)
 
         # Handle addition operator
         if op_type == TT_PLUS:
@@ -113,7 +400,7 @@ class Interpreter:
         # Ensure numeric operands for subtraction and division
         if op_type in {TT_MINUS, TT_DIV}:
             if not (isinstance(left, (int, float)) and isinstance(right, (int, float))):
-                raise Exception(f"TypeError: unsupported operand types for {node.op.value}: '{type(left).__name__}' and '{type(right).__name__}'")
+                raise Exception(f"TypeError: unsupported operand types for {op.value}: '{type(left).__name__}' and '{type(right).__name__}'")
 
         # Handle subtraction
         if op_type == TT_MINUS:
@@ -152,9 +439,18 @@ class Interpreter:
             raise Exception(f"Unknown binary operator {op_type}")
 
     def visit_UnaryOp(self, node):
-        # Visit the operand expression
+        # Visit the operand expression, then apply the operator
         val = self.visit(node.expr)
-        op_type = node.op.type
+        fast = node.fast
+        if fast is not None:
+            return fast(val)
+        return self.apply_unaryop(node.op, val)
+
+    def apply_unaryop(self, op, val):
+        # Apply unary operator token op to an already evaluated operand
+        op_type = op.type
+        if type(val) is ArrayValue and op_type != TT_NOT:
+            raise Exception(f"TypeError: bad operand type for unary {op.value}: 'array'")
         # Unary plus returns the value unchanged
         if op_type == TT_PLUS:
             return +val
@@ -177,7 +473,7 @@ class Interpreter:
                 result = val
         # Print last evaluated result if exists
         if result is not None:
-            print(result)
+            print(result, file=self.output)
         return result
 
 if __name__ == '__main__':
@@ -10,11 +10,13 @@ from src.my_token import (
     TT_EQ, TT_NE, TT_LT, TT_LTE, TT_GT, TT_GTE,
     TT_IDENTIFIER, TT_ASSIGN, TT_SEMI,
     TT_PRINT, TT_IF, TT_ELSE, TT_WHILE, TT_INPUT,
-    TT_LBRACE, TT_RBRACE,
+    TT_LBRACE, TT_RBRACE, TT_COMMA,
+    TT_LBRACKET, TT_RBRACKET,
     TT_EOF,
     KEYWORDS,
     DIGITS,
 )
+from src.positions import LineIndex, SourceError
 
 class Token:
     """
@@ -22,10 +24,20 @@ class Token:
     Attributes:
         type: The token's type (one of the TT_* constants)
         value: The literal value of the token (if any), e.g., 42 for INT tokens
+        pos: Character offset of the token's first character in the source
+             (see src/positions.py for turning it into a line and column)
     """
-    def __init__(self, type_, value=None):
+    __slots__ = ('type', 'value', 'pos')
+
+    def __init__(self, type_, value=None, pos=None):
         self.type = type_
         self.value = value
+        self.pos = pos
+
+    def __reduce__(self):
+        # Pickle as a constructor call; much cheaper than the generic
+        # __slots__ state for the many tokens in a parsed program
+        return (Token, (self.type, self.value, self.pos))
 
     def __repr__(self):
         # Format token for debugging, e.g. Token(INT, 42)
@@ -38,10 +50,21 @@ class Lexer:
     The Lexer class reads the input source code character by character,
     producing tokens that the parser will consume.
     """
-    def __init__(self, text):
+    def __init__(self, text, offset=0, lines=None):
         self.text = text          # Input string to tokenize
         self.pos = 0              # Current position index in text
         self.current_char = self.text[self.pos] if self.text else None  # Current character or None if done
+        self.token_start = 0      # Offset where the token being lexed starts
+        # When text is a piece of a larger source: where it starts in that
+        # source (added to every token position) and the source's LineIndex
+        self.offset = offset
+        self.lines = lines if lines is not None else LineIndex(text)  # Built only on demand
+
+    def error(self, msg):
+        """
+        Raise a SourceError located at the start of the current token.
+        """
+        raise SourceError(msg, self.token_start + self.offset, self.lines)
 
     def advance(self):
         """
@@ -82,7 +105,7 @@ class Lexer:
 
         # Malformed numbers with leading/trailing dot are invalid
         if result.startswith('.') or result.endswith('.'):
-            raise Exception(f"Malformed number '{result}'")
+            self.error(f"Malformed number '{result}'")
 
         if dot_count == 0:
             return Token(TT_INT, int(result))
@@ -138,12 +161,20 @@ class Lexer:
             self.advance()
 
         if self.current_char != '"':
-            raise Exception("Unterminated string literal")
+            self.error("Unterminated string literal")
 
         self.advance()  # Skip closing quote
         return Token(TT_STRING, string_value)
 
     def get_next_token(self):
+        """
+        Return the next token, stamped with the offset where it starts.
+        """
+        token = self.scan_token()
+        token.pos = self.token_start + self.offset
+        return token
+
+    def scan_token(self):
         """
         Core method of the lexer.
         Returns the next token found in input.
@@ -159,6 +190,7 @@ class Lexer:
             if self.current_char.isspace():
                 self.skip_whitespace()
                 continue
+            self.token_start = self.pos
 
             # Number literal
             if self.current_char.isdigit():
@@ -205,6 +237,18 @@ class Lexer:
                 self.advance()
                 return Token(TT_RBRACE, '}')
 
+            if self.current_char == ',':
+                self.advance()
+                return Token(TT_COMMA, ',')
+
+            if self.current_char == '[':
+                self.advance()
+                return Token(TT_LBRACKET, '[')
+
+            if self.current_char == ']':
+                self.advance()
+                return Token(TT_RBRACKET, ']')
+
             # Two-character operators or assignment
             if self.current_char == '=':
                 self.advance()
@@ -224,7 +268,7 @@ class Lexer:
                     self.advance()
                     return Token(TT_NE, '!=')
                 else:
-                    raise Exception("Expected '=' after '!'")
+                    self.error("Expected '=' after '!'")
 
             if self.current_char == '<':
                 self.advance()
@@ -243,11 +287,46 @@ class Lexer:
                     return Token(TT_GT, '>')
 
             # Unknown/unexpected character
-            raise Exception(f'Invalid character: {self.current_char}')
+            self.error(f'Invalid character: {self.current_char}')
 
         # If reached end of input
+        self.token_start = self.pos
         return Token(TT_EOF, None)
 
+    def tokenize(self):
+        """
+        Lex the whole input up front.
+        Returns a list of tokens ending with the EOF token.
+        """
+        tokens = []
+        token = self.get_next_token()
+        while token.type != TT_EOF:
+            tokens.append(token)
+            token = self.get_next_token()
+        tokens.append(token)
+        return tokens
+
+
+class TokenStream:
+    """
+    Replays an already lexed token list through the same get_next_token()
+    interface as Lexer, so a Parser can consume pre-lexed input.
+    Pass the lexer's LineIndex as lines to keep line/column error positions.
+    """
+    def __init__(self, tokens, lines=None):
+        self.tokens = tokens      # Token list ending with an EOF token
+        self.index = 0            # Index of the next token to hand out
+        self.lines = lines        # LineIndex of the source, or None
+
+    def get_next_token(self):
+        """
+        Return the next token, repeating the final EOF token once exhausted.
+        """
+        token = self.tokens[self.index]
+        if self.index < len(self.tokens) - 1:
+            self.index += 1
+        return token
+
 
 # Run lexer in interactive mode if executed directly
 if __name__ == '__main__':
@@ -0,0 +1,158 @@
+# limits.py
+# Memory accounting for runtime values.
+# A MemoryAccountant attached to an interpreter (Interpreter.accountant)
+# estimates the size of every string, integer and array result that can
+# grow without bound *before* it is created, and tracks the bytes held in
+# global variables. Exceeding the per-value or per-run limit raises
+# MemoryLimitError instead of letting the allocation happen.
+# Sizes are estimates from sys.getsizeof(); strings that are not pure ASCII
+# are assumed to use 4 bytes per character, so estimates err on the high side.
+
+import sys
+
+from src.arrays import ArrayValue
+from src.my_token import TT_PLUS, TT_MINUS, TT_MUL
+
+_STR_HEADER = sys.getsizeof('')
+_INT_HEADER = sys.getsizeof(0)
+_INT_DIGIT_BITS = 30
+_INT_DIGIT_BYTES = 4
+_POINTER_BYTES = 8
+
+
+class MemoryLimitError(Exception):
+    """
+    Raised when a value, or the run as a whole, would exceed its memory limit.
+    """
+    pass
+
+
+def value_size(value):
+    # Estimated bytes held by one runtime value. For an array this is its
+    # storage only; string elements were checked when they were created.
+    return sys.getsizeof(value)
+
+def str_size(length, wide=False):
+    # Estimated size of a str of length characters
+    return _STR_HEADER + length * (4 if wide else 1)
+
+def int_size(bits):
+    # Estimated size of an int of the given bit length
+    return _INT_HEADER + -(-bits // _INT_DIGIT_BITS) * _INT_DIGIT_BYTES
+
+def estimate_binop(op_type, left, right):
+    """
+    Estimated size of the result of a binary operator that may allocate a
+    large value, or None if the result is small (or an error).
+    """
+    left_type = type(left)
+    right_type = type(right)
+    if op_type == TT_PLUS and left_type is str and right_type is str:
+        return str_size(len(left) + len(right), not (left.isascii() and right.isascii()))
+    if op_type == TT_MUL:
+        if left_type is str and isinstance(right, int):
+            return str_size(len(left) * max(right, 0), not left.isascii())
+        if right_type is str and isinstance(left, int):
+            return str_size(len(right) * max(left, 0), not right.isascii())
+        if left_type is int and right_type is int:
+            return int_size(left.bit_length() + right.bit_length())
+    if op_type in (TT_PLUS, TT_MINUS) and left_type is int and right_type is int:
+        return int_size(max(left.bit_length(), right.bit_length()) + 1)
+    if left_type is ArrayValue or right_type is ArrayValue:
+        # An elementwise result is about as large as the larger operand
+        return max(value_size(left) if left_type is ArrayValue else 0,
+                   value_size(right) if right_type is ArrayValue else 0)
+    return None
+
+
+class MemoryAccountant:
+    """
+    Tracks memory held by one run and enforces limits on it.
+    Arguments:
+        max_value_bytes: Largest single value allowed, or None for no limit
+        max_total_bytes: Largest total held in global variables (plus the
+                         value being created), or None for no limit
+    Attributes:
+        total: Estimated bytes currently held in global variables
+        peak: Highest total seen, including the value being created
+        largest_value: Size of the largest value created so far
+    """
+    def __init__(self, max_value_bytes=None, max_total_bytes=None):
+        self.max_value_bytes = max_value_bytes
+        self.max_total_bytes = max_total_bytes
+        self.total = 0
+        self.peak = 0
+        self.largest_value = 0
+
+    def check(self, size):
+        """
+        Account for a value of size bytes about to be created; raises
+        MemoryLimitError if it would exceed a limit.
+        """
+        self._check_value(size)
+        self._check_total(size)
+
+    def _check_value(self, size):
+        if self.max_value_bytes is not None and size > self.max_value_bytes:
+            raise MemoryLimitError(f"Value of about {size} bytes exceeds the per-value "
+                                   f"limit of {self.max_value_bytes} bytes")
+        if size > self.largest_value:
+            self.largest_value = size
+
+    def _check_total(self, extra):
+        total = self.total + extra
+        if self.max_total_bytes is not None and total > self.max_total_bytes:
+            raise MemoryLimitError(f"Run would hold about {total} bytes, over "
+                                   f"the per-run limit of {self.max_total_bytes} bytes")
+        if total > self.peak:
+            self.peak = total
+
+    def check_binop(self, op_type, left, right):
+        # Called by Interpreter.apply_binop before computing the result
+        size = estimate_binop(op_type, left, right)
+        if size is not None:
+            self.check(size)
+
+    def replace(self, old, new, had_old=True):
+        """
+        Account for a global variable changing from old to new (had_old is
+        False for a new variable). Raises MemoryLimitError without changing
+        the total if the new value does not fit.
+        """
+        new_size = value_size(new)
+        delta = new_size - (value_size(old) if had_old else 0)
+        self._check_value(new_size)
+        self._check_total(delta)
+        self.total += delta
+
+    def release(self, value):
+        """
+        Account for a global variable holding value being deleted.
+        """
+        self.total -= value_size(value)
+
+    def append(self, array, value, tracked):
+        """
+        Account for append(array, value) before it happens; tracked is True
+        if the array is held in a global variable.
+        """
+        if array.typecode is not None:
+            extra = array.data.itemsize
+        else:
+            extra = _POINTER_BYTES + value_size(value)
+        self._check_value(value_size(array) + extra)
+        self._check_total(extra)
+        if tracked:
+            self.total += extra
+
+    def stats(self):
+        return {
+            'total': self.total,
+            'peak': self.peak,
+            'largest_value': self.largest_value,
+            'max_value_bytes': self.max_value_bytes,
+            'max_total_bytes': self.max_total_bytes,
+        }
+
+    def __repr__(self):
+        return f"MemoryAccountant(total={self.total}, peak={self.peak})"
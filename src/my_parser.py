@@ -2,6 +2,8 @@
 # Recursive descent parser: converts tokens into AST nodes representing the program structure.
 
 from src.lexer import Lexer
+from src.arrays import BUILTINS
+from src.positions import SourceError
 
 # === AST Node Classes ===
 # Each class represents a different type of syntax node in the language.
@@ -26,6 +28,7 @@ class String:
         return f"String({repr(self.value)})"
 
 class BinOp:
+    fast = None                   # Unchecked operator function set by type inference
     def __init__(self, left, op, right):
         self.left = left          # Left operand (AST node)
         self.op = op              # Operator token
@@ -34,6 +37,7 @@ class BinOp:
         return f"BinOp({self.left}, {self.op.value}, {self.right})"
 
 class UnaryOp:
+    fast = None                   # Unchecked operator function set by type inference
     def __init__(self, op, expr):
         self.op = op              # Unary operator token
         self.expr = expr          # Expression it applies to
@@ -60,10 +64,12 @@ class PrintStmt:
         return f"PrintStmt({self.expr})"
 
 class IfStmt:
-    def __init__(self, condition, true_block, false_block=None):
+    cold = None                   # Block a profile never saw run: 'true', 'false' or None
+    def __init__(self, condition, true_block, false_block=None, pos=None):
         self.condition = condition      # Condition expression node
         self.true_block = true_block    # List of statements if condition is True
         self.false_block = false_block  # List of statements if False (optional)
+        self.pos = pos                  # Source offset of the 'if' keyword
     def __repr__(self):
         if self.false_block:
             return f"IfStmt({self.condition}, {self.true_block}, {self.false_block})"
@@ -71,33 +77,146 @@ class IfStmt:
             return f"IfStmt({self.condition}, {self.true_block})"
 
 class WhileStmt:
-    def __init__(self, condition, body):
+    cold = False                  # True if a profile never saw the body run
+    def __init__(self, condition, body, pos=None):
         self.condition = condition  # Condition expression node for loop
         self.body = body            # List of statements inside the while loop
+        self.pos = pos              # Source offset of the 'while' keyword
     def __repr__(self):
         return f"WhileStmt({self.condition}, {self.body})"
 
+class ForStmt:
+    cold = False                  # True if a profile never saw the body run
+    slot = None                   # Frame slot of the variable inside a function
+    def __init__(self, name, start, stop, body, pos=None):
+        self.name = name            # Loop variable name
+        self.start = start          # Expression for the first value
+        self.stop = stop            # Expression for the (excluded) bound
+        self.body = body            # List of statements inside the loop
+        self.pos = pos              # Source offset of the 'for' keyword
+    def __repr__(self):
+        return f"ForStmt({self.name}, {self.start}, {self.stop}, {self.body})"
+
 class InputExpr:
     def __init__(self):
         pass                      # Represents a call to input() with no arguments
     def __repr__(self):
         return "InputExpr()"
 
+class FuncDef:
+    def __init__(self, name, params, body, memo=False, local_names=None):
+        self.name = name                # Function name
+        self.params = params            # Parameter names, in order
+        self.body = body                # List of statements in the function body
+        self.memo = memo                # True if results are cached (pure function)
+        self.local_names = local_names or list(params)  # Name of each frame slot
+    def __repr__(self):
+        prefix = "memo " if self.memo else ""
+        return f"FuncDef({prefix}{self.name}({', '.join(self.params)}), {self.body})"
+
+class Call:
+    def __init__(self, name, args):
+        self.name = name          # Name of the function being called
+        self.args = args          # Argument expression nodes
+    def __repr__(self):
+        return f"Call({self.name}, {self.args})"
+
+class Return:
+    def __init__(self, expr=None):
+        self.expr = expr          # Returned expression (None for a bare return)
+    def __repr__(self):
+        return f"Return({self.expr})"
+
+class LocalAccess:
+    def __init__(self, name, slot):
+        self.name = name          # Variable name (for error messages)
+        self.slot = slot          # Index into the current call frame
+    def __repr__(self):
+        return f"LocalAccess({self.name})"
+
+class LocalAssign:
+    def __init__(self, name, slot, value):
+        self.name = name          # Variable name (for display)
+        self.slot = slot          # Index into the current call frame
+        self.value = value        # Expression node assigned to the local
+    def __repr__(self):
+        return f"LocalAssign({self.name}, {self.value})"
+
+class ArrayLiteral:
+    def __init__(self, elements):
+        self.elements = elements  # Element expression nodes, in order
+    def __repr__(self):
+        return f"ArrayLiteral({self.elements})"
+
+class Index:
+    def __init__(self, target, index):
+        self.target = target      # Expression producing the array or string
+        self.index = index        # Index expression
+    def __repr__(self):
+        return f"Index({self.target}, {self.index})"
+
+class Append:
+    def __init__(self, target, value):
+        self.target = target      # VarAccess / LocalAccess naming the array
+        self.value = value        # Expression appended to it
+    def __repr__(self):
+        return f"Append({self.target}, {self.value})"
+
+class CSEStore:
+    def __init__(self, slot, expr):
+        self.slot = slot          # Cache slot the value is stored in
+        self.expr = expr          # Pure expression evaluated and cached
+    def __repr__(self):
+        return f"CSEStore({self.slot}, {self.expr})"
+
+class CSELoad:
+    def __init__(self, slot, expr, size):
+        self.slot = slot          # Cache slot written by an earlier CSEStore
+        self.expr = expr          # The expression this load replaces (for display)
+        self.size = size          # Number of nodes whose evaluation is skipped
+    def __repr__(self):
+        return f"CSELoad({self.slot}, {self.expr})"
+
+class CachedExpr:
+    def __init__(self, expr, reads, size):
+        self.expr = expr          # Pure expression whose value is cached at run time
+        self.reads = reads        # Tuple of the variable names it reads
+        self.size = size          # Number of nodes whose evaluation a cache hit skips
+    def __repr__(self):
+        return f"CachedExpr({self.expr})"
+
+class Release:
+    def __init__(self, names):
+        self.names = names        # Tuple of global variable names never read again
+    def __repr__(self):
+        return f"Release({', '.join(self.names)})"
+
+class DeadStore:
+    def __init__(self, assign):
+        self.assign = assign      # VarAssign whose value is never read; only runs under an accountant
+    def __repr__(self):
+        return f"DeadStore({self.assign})"
+
 # === Parser Class ===
 # Implements recursive descent parsing for the language grammar.
 
 class Parser:
     def __init__(self, lexer: Lexer):
         self.lexer = lexer
+        # LineIndex used to report error lines and columns (None if unknown)
+        self.lines = getattr(lexer, 'lines', None)
         self.current_token = self.lexer.get_next_token()  # Get first token
+        self.in_function = False  # True while parsing a function body
 
-    def error(self, msg='Invalid syntax'):
+    def error(self, msg='Invalid syntax', token=None):
         """
-        Raise an exception with a descriptive error message including
-        the current token type and value.
+        Raise a SourceError with a descriptive error message including
+        the token type and value (the current token by default) and,
+        when the source is known, its line and column.
         """
-        token = self.current_token
-        raise Exception(f"{msg} at token {token.type} with value '{token.value}'")
+        token = token or self.current_token
+        raise SourceError(f"{msg} at token {token.type} with value '{token.value}'",
+                          token.pos, self.lines)
 
     def eat(self, token_type: str):
         """
@@ -114,11 +233,15 @@ class Parser:
         Parse a sequence of statements until EOF.
         Returns a list of AST nodes representing the statements.
         """
-        statements = []
+        return list(self.iter_statements())
+
+    def iter_statements(self):
+        """
+        Generator version of parse(): yields each top-level statement as
+        soon as it has been parsed, without keeping earlier ones alive.
+        """
         while self.current_token.type != 'EOF':
-            stmt = self.parse_statement()
-            statements.append(stmt)
-        return statements
+            yield self.parse_statement()
 
     def parse_block(self):
         """
@@ -138,10 +261,24 @@ class Parser:
     def parse_statement(self):
         """
         Parse a single statement.
-        Supports print, if, while, input, variable assignment/access,
+        Supports print, if, while, for, input, variable assignment/access,
         or falls back to parsing an expression.
         """
-        if self.current_token.type == 'PRINT':
+        if self.current_token.type in ('FUNC', 'MEMO'):
+            return self.parse_function_def()
+
+        elif self.current_token.type == 'RETURN':
+            if not self.in_function:
+                self.error("'return' outside function")
+            self.eat('RETURN')
+            expr = None
+            if self.current_token.type not in ('SEMI', 'RBRACE'):
+                expr = self.parse_or()
+            if self.current_token.type == 'SEMI':
+                self.eat('SEMI')
+            return Return(expr)
+
+        elif self.current_token.type == 'PRINT':
             self.eat('PRINT')
             expr = self.parse_or()
             if self.current_token.type == 'SEMI':
@@ -149,6 +286,7 @@ class Parser:
             return PrintStmt(expr)
 
         elif self.current_token.type == 'IF':
+            start = self.current_token
             self.eat('IF')
             self.eat('LPAREN')
             condition = self.parse_or()
@@ -158,15 +296,32 @@ class Parser:
             if self.current_token.type == 'ELSE':
                 self.eat('ELSE')
                 false_block = self.parse_block()
-            return IfStmt(condition, true_block, false_block)
+            return IfStmt(condition, true_block, false_block, start.pos)
 
         elif self.current_token.type == 'WHILE':
+            start = self.current_token
             self.eat('WHILE')
             self.eat('LPAREN')
             condition = self.parse_or()
             self.eat('RPAREN')
             body = self.parse_block()
-            return WhileStmt(condition, body)
+            return WhileStmt(condition, body, start.pos)
+
+        elif self.current_token.type == 'FOR':
+            # for (name = start; stop) { body }: name runs from start up to,
+            # not including, stop
+            start = self.current_token
+            self.eat('FOR')
+            self.eat('LPAREN')
+            name = self.current_token.value
+            self.eat('IDENTIFIER')
+            self.eat('ASSIGN')
+            first = self.parse_or()
+            self.eat('SEMI')
+            stop = self.parse_or()
+            self.eat('RPAREN')
+            body = self.parse_block()
+            return ForStmt(name, first, stop, body, start.pos)
 
         elif self.current_token.type == 'INPUT':
             self.eat('INPUT')
@@ -183,6 +338,14 @@ class Parser:
                 if self.current_token.type == 'SEMI':
                     self.eat('SEMI')
                 return VarAssign(var_name, expr)
+            elif self.current_token.type == 'LPAREN':
+                if var_name == 'append':
+                    call = self.parse_append()
+                else:
+                    call = Call(var_name, self.parse_call_args())
+                if self.current_token.type == 'SEMI':
+                    self.eat('SEMI')
+                return call
             else:
                 return VarAccess(var_name)
 
@@ -270,9 +433,7 @@ class Parser:
         Parse unary operators and primary expressions.
         Grammar:
             factor -> ('PLUS' | 'MINUS') factor
-                    | 'INT' | 'FLOAT' | 'BOOLEAN' | 'STRING' | 'INPUT'
-                    | 'IDENTIFIER'
-                    | '(' or_expr ')'
+                    | primary ('[' or_expr ']')*
         """
         token = self.current_token
 
@@ -280,6 +441,24 @@ class Parser:
             self.eat(token.type)
             return UnaryOp(token, self.parse_factor())
 
+        node = self.parse_primary()
+        while self.current_token.type == 'LBRACKET':
+            self.eat('LBRACKET')
+            node = Index(node, self.parse_or())
+            self.eat('RBRACKET')
+        return node
+
+    def parse_primary(self):
+        """
+        Parse literals, variables, calls and parenthesised expressions.
+        Grammar:
+            primary -> 'INT' | 'FLOAT' | 'BOOLEAN' | 'STRING' | 'INPUT'
+                     | 'IDENTIFIER' | call
+                     | '[' (or_expr (',' or_expr)*)? ']'
+                     | '(' or_expr ')'
+        """
+        token = self.current_token
+
         if token.type in ('INT', 'FLOAT'):
             self.eat(token.type)
             return Num(token)
@@ -301,8 +480,23 @@ class Parser:
         if token.type == 'IDENTIFIER':
             var_name = token.value
             self.eat('IDENTIFIER')
+            if self.current_token.type == 'LPAREN':
+                if var_name == 'append':
+                    self.error('append() can only be used as a statement')
+                return Call(var_name, self.parse_call_args())
             return VarAccess(var_name)
 
+        if token.type == 'LBRACKET':
+            self.eat('LBRACKET')
+            elements = []
+            if self.current_token.type != 'RBRACKET':
+                elements.append(self.parse_or())
+                while self.current_token.type == 'COMMA':
+                    self.eat('COMMA')
+                    elements.append(self.parse_or())
+            self.eat('RBRACKET')
+            return ArrayLiteral(elements)
+
         if token.type == 'LPAREN':
             self.eat('LPAREN')
             node = self.parse_or()
@@ -311,6 +505,220 @@ class Parser:
 
         self.error('Unexpected token')
 
+    # === Functions ===
+
+    def parse_call_args(self):
+        """
+        Parse a parenthesised, comma-separated argument list.
+        Grammar: args -> '(' (or_expr (',' or_expr)*)? ')'
+        """
+        self.eat('LPAREN')
+        args = []
+        if self.current_token.type != 'RPAREN':
+            args.append(self.parse_or())
+            while self.current_token.type == 'COMMA':
+                self.eat('COMMA')
+                args.append(self.parse_or())
+        self.eat('RPAREN')
+        return args
+
+    def parse_append(self):
+        """
+        Parse the append statement, which modifies the array held by a variable.
+        Grammar: append -> 'append' '(' IDENTIFIER ',' or_expr ')'
+        """
+        start = self.current_token
+        args = self.parse_call_args()
+        if len(args) != 2 or not isinstance(args[0], VarAccess):
+            self.error("append() expects a variable and a value: append(name, value)", start)
+        return Append(args[0], args[1])
+
+    def parse_function_def(self):
+        """
+        Parse a function definition.
+        Grammar: func_def -> 'MEMO'? 'FUNC' IDENTIFIER '(' (IDENTIFIER (',' IDENTIFIER)*)? ')' block
+        """
+        start = self.current_token
+        memo = False
+        if self.current_token.type == 'MEMO':
+            self.eat('MEMO')
+            memo = True
+        if self.in_function:
+            self.error('Nested function definitions are not supported')
+        self.eat('FUNC')
+        name = self.current_token.value
+        if name == 'append' or name in BUILTINS:
+            self.error(f"'{name}' is a built-in function")
+        self.eat('IDENTIFIER')
+
+        self.eat('LPAREN')
+        params = []
+        if self.current_token.type != 'RPAREN':
+            params.append(self.current_token.value)
+            self.eat('IDENTIFIER')
+            while self.current_token.type == 'COMMA':
+                self.eat('COMMA')
+                if self.current_token.value in params:
+                    self.error(f"Duplicate parameter '{self.current_token.value}'")
+                params.append(self.current_token.value)
+                self.eat('IDENTIFIER')
+        self.eat('RPAREN')
+
+        self.in_function = True
+        try:
+            body = self.parse_block()
+        finally:
+            self.in_function = False
+
+        if memo and contains_effects(body):
+            self.error(f"memo function '{name}' must not print, read input or append", start)
+        func = resolve_function(FuncDef(name, params, body, memo))
+        if memo:
+            # Cached results may only depend on the arguments
+            global_name = _global_read(func.body)
+            if global_name is not None:
+                self.error(f"memo function '{name}' must not read global variable '{global_name}'", start)
+        return func
+
+
+# === Function resolution ===
+# Locals are the parameters plus every name assigned in the body; they live
+# in numbered slots of a per-call frame. Every node in the body is also
+# marked with `suspends`: whether it contains a Call or Return, which the
+# iterative call driver in src/functions.py must step through itself.
+
+def _children(node):
+    # Child nodes of any statement or expression node
+    if isinstance(node, BinOp):
+        return [node.left, node.right]
+    if isinstance(node, UnaryOp):
+        return [node.expr]
+    if isinstance(node, (VarAssign, LocalAssign)):
+        return [node.value]
+    if isinstance(node, PrintStmt):
+        return [node.expr]
+    if isinstance(node, IfStmt):
+        return [node.condition] + node.true_block + (node.false_block or [])
+    if isinstance(node, WhileStmt):
+        return [node.condition] + node.body
+    if isinstance(node, ForStmt):
+        return [node.start, node.stop] + node.body
+    if isinstance(node, Call):
+        return list(node.args)
+    if isinstance(node, Return):
+        return [node.expr] if node.expr is not None else []
+    if isinstance(node, ArrayLiteral):
+        return list(node.elements)
+    if isinstance(node, Index):
+        return [node.target, node.index]
+    if isinstance(node, Append):
+        return [node.target, node.value]
+    return []
+
+def contains_effects(statements):
+    """
+    True if any statement prints, reads input or appends to an array
+    (directly, not through calls).
+    """
+    pending = list(statements)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, (PrintStmt, InputExpr, Append)):
+            return True
+        pending.extend(_children(node))
+    return False
+
+def _global_read(statements):
+    # Name of a global variable a resolved function body reads, or None
+    pending = list(statements)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, VarAccess):
+            return node.name
+        pending.extend(_children(node))
+    return None
+
+def _assigned(statements, names):
+    # Collect assigned variable names in first-assignment order
+    for stmt in statements:
+        if isinstance(stmt, VarAssign) and stmt.name not in names:
+            names.append(stmt.name)
+        elif isinstance(stmt, IfStmt):
+            _assigned(stmt.true_block, names)
+            _assigned(stmt.false_block or [], names)
+        elif isinstance(stmt, WhileStmt):
+            _assigned(stmt.body, names)
+        elif isinstance(stmt, ForStmt):
+            if stmt.name not in names:
+                names.append(stmt.name)
+            _assigned(stmt.body, names)
+    return names
+
+def _replace_children(node, replace):
+    # Set every child of node to replace(child)
+    if isinstance(node, BinOp):
+        node.left, node.right = replace(node.left), replace(node.right)
+    elif isinstance(node, (UnaryOp, PrintStmt)):
+        node.expr = replace(node.expr)
+    elif isinstance(node, (VarAssign, LocalAssign)):
+        node.value = replace(node.value)
+    elif isinstance(node, IfStmt):
+        node.condition = replace(node.condition)
+        node.true_block = [replace(stmt) for stmt in node.true_block]
+        if node.false_block is not None:
+            node.false_block = [replace(stmt) for stmt in node.false_block]
+    elif isinstance(node, WhileStmt):
+        node.condition = replace(node.condition)
+        node.body = [replace(stmt) for stmt in node.body]
+    elif isinstance(node, ForStmt):
+        node.start, node.stop = replace(node.start), replace(node.stop)
+        node.body = [replace(stmt) for stmt in node.body]
+    elif isinstance(node, Call):
+        node.args = [replace(arg) for arg in node.args]
+    elif isinstance(node, Return) and node.expr is not None:
+        node.expr = replace(node.expr)
+    elif isinstance(node, ArrayLiteral):
+        node.elements = [replace(element) for element in node.elements]
+    elif isinstance(node, Index):
+        node.target, node.index = replace(node.target), replace(node.index)
+    elif isinstance(node, Append):
+        node.target, node.value = replace(node.target), replace(node.value)
+
+def resolve_function(func):
+    """
+    Rewrite a function body to use frame slots for its locals and mark
+    every body node with `suspends`. Returns func.
+    The walk uses an explicit stack, so bodies with arbitrarily deep
+    expressions do not hit Python's recursion limit.
+    """
+    func.local_names = _assigned(func.body, list(func.params))
+    slots = {name: index for index, name in enumerate(func.local_names)}
+
+    def localize(node):
+        # The node itself with global variable nodes swapped for local ones
+        if isinstance(node, VarAccess) and node.name in slots:
+            return LocalAccess(node.name, slots[node.name])
+        if isinstance(node, VarAssign):
+            return LocalAssign(node.name, slots[node.name], node.value)
+        if isinstance(node, ForStmt):
+            node.slot = slots[node.name]
+        return node
+
+    func.body = [localize(stmt) for stmt in func.body]
+    # Pre-order walk: every node comes after its parent in order
+    order = []
+    pending = list(func.body)
+    while pending:
+        node = pending.pop()
+        _replace_children(node, localize)
+        order.append(node)
+        pending.extend(_children(node))
+    # Children before parents
+    for node in reversed(order):
+        node.suspends = isinstance(node, (Call, Return)) or any(
+            child.suspends for child in _children(node))
+    return func
+
 # Quick interactive test when running this file directly
 if __name__ == '__main__':
     from src.lexer import Lexer
@@ -27,9 +27,16 @@ TT_PRINT   = 'PRINT'       # 'print' keyword
 TT_IF      = 'IF'          # 'if' keyword
 TT_ELSE    = 'ELSE'        # 'else' keyword
 TT_WHILE   = 'WHILE'       # 'while' keyword
+TT_FOR     = 'FOR'         # 'for' keyword (counted range loop)
 TT_INPUT   = 'INPUT'       # 'input' keyword
 TT_LBRACE  = 'LBRACE'      # Left curly brace '{' block start
 TT_RBRACE  = 'RBRACE'      # Right curly brace '}' block end
+TT_COMMA   = 'COMMA'       # Comma ',' separating parameters and arguments
+TT_LBRACKET = 'LBRACKET'   # Left square bracket '[' array literal / index start
+TT_RBRACKET = 'RBRACKET'   # Right square bracket ']' array literal / index end
+TT_FUNC    = 'FUNC'        # 'func' keyword (function definition)
+TT_RETURN  = 'RETURN'      # 'return' keyword
+TT_MEMO    = 'MEMO'        # 'memo' keyword marking a pure, cached function
 TT_EOF     = 'EOF'         # End-of-file/input token
 
 # Mapping reserved words to their token types
@@ -43,7 +50,11 @@ KEYWORDS = {
     'if': TT_IF,
     'else': TT_ELSE,
     'while': TT_WHILE,
+    'for': TT_FOR,
     'input': TT_INPUT,
+    'func': TT_FUNC,
+    'return': TT_RETURN,
+    'memo': TT_MEMO,
 }
 
 DIGITS = '0123456789'  # Allowed digits for numbers
@@ -0,0 +1,822 @@
+# optimizer.py
+# AST optimisation passes run once at compile time (see Program(optimize=...)).
+#   - intern_subtrees(): hash-consing; structurally identical pure expression
+#     subtrees are replaced by one shared node to cut AST memory.
+#   - eliminate_common_subexpressions(): a repeated pure expression is
+#     computed once per region and reused (CSEStore / CSELoad nodes) as long
+#     as none of the variables it reads has been reassigned in between (a
+#     call or an append counts as changing every variable, since it can
+#     change an array through a parameter or an alias).
+#   - cache_pure_expressions(): pure expressions inside loops are wrapped in
+#     CachedExpr nodes whose values are reused at run time while the
+#     variables they read keep their versions (see src/expr_cache.py).
+#   - release_dead_values(): liveness analysis; each global variable is
+#     deleted (Release nodes) after its last use, and assignments whose
+#     value is never read are skipped (DeadStore nodes) when evaluating it
+#     cannot fail; they still run when a MemoryAccountant checks the run.
+# An expression is pure when it cannot reach input(); every other operator
+# in the language is side-effect free. Expression walks use explicit stacks
+# rather than recursion, so arbitrarily deep expressions can be optimised.
+
+import sys
+
+from src.my_parser import (
+    Num, Bool, String, BinOp, UnaryOp,
+    VarAssign, VarAccess, PrintStmt,
+    IfStmt, WhileStmt, ForStmt, InputExpr, Append,
+    FuncDef, Call, Return, LocalAssign, ArrayLiteral, Index,
+    CSEStore, CSELoad, CachedExpr, Release, DeadStore
+)
+from src.arrays import BUILTINS
+from src.my_token import TT_EQ, TT_NE, TT_AND, TT_OR, TT_NOT
+
+LEAVES = (Num, Bool, String, VarAccess)
+
+
+class ExprKeys:
+    """
+    Computes structural keys for expression nodes, memoised per node.
+    The key of a pure expression is a number that is equal for structurally
+    identical expressions (value numbering: a node's key is built from its
+    operator and the numbers of its operands, so keys stay flat however deep
+    the expression is); impure expressions get None. Each pure expression
+    also records the variables it reads and its size in nodes.
+    The walk uses an explicit stack, so arbitrarily deep expressions do not
+    hit Python's recursion limit.
+    """
+    def __init__(self):
+        self._keys = {}      # id(node) -> (node, key, reads, size)
+        self._numbers = {}   # flat structural key -> number
+
+    def key(self, node):
+        return self._lookup(node)[1]
+
+    def reads(self, node):
+        # Variable names read by a pure expression
+        return self._lookup(node)[2]
+
+    def size(self, node):
+        # count_nodes() of a pure expression
+        return self._lookup(node)[3]
+
+    def _lookup(self, node):
+        keys = self._keys
+        entry = keys.get(id(node))
+        if entry is not None:
+            return entry
+        # Children before parents
+        pending = [node]
+        while pending:
+            top = pending[-1]
+            if id(top) in keys:
+                pending.pop()
+                continue
+            missing = [child for child in _operands(top) if id(child) not in keys]
+            if missing:
+                pending.extend(missing)
+                continue
+            pending.pop()
+            # Keep a reference to the node so its id cannot be reused
+            keys[id(top)] = (top,) + self._compute(top)
+        return keys[id(node)]
+
+    def _compute(self, node):
+        # (key, reads, size) of a node whose operands are already computed
+        if isinstance(node, (Num, Bool, String)):
+            return self._number((type(node).__name__, type(node.value).__name__, node.value)), frozenset(), 1
+        if isinstance(node, VarAccess):
+            return self._number(('Var', node.name)), frozenset([node.name]), 1
+        if isinstance(node, BinOp):
+            _, left, left_reads, left_size = self._keys[id(node.left)]
+            _, right, right_reads, right_size = self._keys[id(node.right)]
+            if left is None or right is None:
+                return None, None, None
+            return (self._number(('BinOp', node.op.type, left, right)),
+                    left_reads | right_reads, 1 + left_size + right_size)
+        if isinstance(node, UnaryOp):
+            _, expr, reads, size = self._keys[id(node.expr)]
+            if expr is None:
+                return None, None, None
+            return self._number(('UnaryOp', node.op.type, expr)), reads, 1 + size
+        return None, None, None
+
+    def _number(self, key):
+        # The number of a flat structural key, assigned on first sight
+        number = self._numbers.get(key)
+        if number is None:
+            number = self._numbers[key] = len(self._numbers)
+        return number
+
+
+def _operands(node):
+    # Operand nodes of an operator; everything else has none
+    if isinstance(node, BinOp):
+        return (node.left, node.right)
+    if isinstance(node, UnaryOp):
+        return (node.expr,)
+    return ()
+
+def _children_of(node):
+    # Expression children the optimizer passes rewrite
+    if isinstance(node, (CSEStore, CSELoad)):
+        return (node.expr,)
+    return _operands(node)
+
+def count_nodes(node):
+    """
+    Number of expression nodes in the subtree rooted at node.
+    """
+    count = 0
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, CSEStore):
+            pending.append(node.expr)
+            continue
+        count += 1
+        pending.extend(_operands(node))
+    return count
+
+def assigned_names(statements):
+    """
+    Set of variable names assigned anywhere in a statement list, including
+    nested blocks. append(name, ...) counts as an assignment to name.
+    """
+    names = set()
+    for stmt in statements:
+        if isinstance(stmt, VarAssign):
+            names.add(stmt.name)
+        elif isinstance(stmt, Append):
+            names.add(stmt.target.name)
+        elif isinstance(stmt, IfStmt):
+            names |= assigned_names(stmt.true_block)
+            names |= assigned_names(stmt.false_block or [])
+        elif isinstance(stmt, WhileStmt):
+            names |= assigned_names(stmt.body)
+        elif isinstance(stmt, ForStmt):
+            names.add(stmt.name)
+            names |= assigned_names(stmt.body)
+    return names
+
+def _mutates(nodes):
+    # True if evaluating nodes may change an array in place
+    return any(isinstance(node, (Call, Append)) for node in _walk(nodes))
+
+def _node_bytes(node):
+    # Approximate memory held by one AST node object
+    return sys.getsizeof(node) + sys.getsizeof(node.__dict__)
+
+
+# === Hash-consing ===
+
+class InternStats:
+    """
+    Result of intern_subtrees().
+    Attributes:
+        nodes_before: Expression nodes reachable before interning
+        nodes_after: Distinct expression nodes after interning
+        bytes_saved: Approximate memory released by the dropped duplicates
+    """
+    def __init__(self, nodes_before=0, nodes_after=0, bytes_saved=0):
+        self.nodes_before = nodes_before
+        self.nodes_after = nodes_after
+        self.bytes_saved = bytes_saved
+
+    def __repr__(self):
+        return (f"InternStats(nodes_before={self.nodes_before}, nodes_after={self.nodes_after}, "
+                f"bytes_saved={self.bytes_saved})")
+
+
+class _Interner:
+    def __init__(self):
+        self.keys = ExprKeys()
+        self.table = {}           # key -> canonical node
+        self.seen = set()         # ids of nodes already counted
+        self.stats = InternStats()
+
+    def expr(self, node):
+        # Intern the operands of every node before the node itself, with an
+        # explicit stack so deep expressions do not hit the recursion limit
+        done = {}                 # id(node) -> node it is replaced by
+        pending = [(node, False)]
+        while pending:
+            top, ready = pending.pop()
+            if not ready:
+                if id(top) not in done:
+                    pending.append((top, True))
+                    pending.extend((child, False) for child in _children_of(top))
+                continue
+            if isinstance(top, BinOp):
+                top.left = done[id(top.left)]
+                top.right = done[id(top.right)]
+            elif isinstance(top, UnaryOp):
+                top.expr = done[id(top.expr)]
+            elif isinstance(top, (CSEStore, CSELoad)):
+                top.expr = done[id(top.expr)]
+                done[id(top)] = top
+                continue
+            done[id(top)] = self.canonical(top)
+        return done[id(node)]
+
+    def canonical(self, node):
+        # The node to use in place of node, whose operands are interned
+        if id(node) not in self.seen:
+            self.seen.add(id(node))
+            self.stats.nodes_before += 1
+        key = self.keys.key(node)
+        if key is None:
+            self.stats.nodes_after += 1
+            return node
+        canonical = self.table.get(key)
+        if canonical is None:
+            self.table[key] = node
+            self.stats.nodes_after += 1
+            return node
+        if canonical is not node:
+            self.stats.bytes_saved += _node_bytes(node)
+        return canonical
+
+    def block(self, statements):
+        for index, stmt in enumerate(statements):
+            statements[index] = self.stmt(stmt)
+
+    def stmt(self, node):
+        if isinstance(node, VarAssign):
+            node.value = self.expr(node.value)
+        elif isinstance(node, PrintStmt):
+            node.expr = self.expr(node.expr)
+        elif isinstance(node, IfStmt):
+            node.condition = self.expr(node.condition)
+            self.block(node.true_block)
+            if node.false_block is not None:
+                self.block(node.false_block)
+        elif isinstance(node, WhileStmt):
+            node.condition = self.expr(node.condition)
+            self.block(node.body)
+        elif isinstance(node, ForStmt):
+            node.start = self.expr(node.start)
+            node.stop = self.expr(node.stop)
+            self.block(node.body)
+        elif isinstance(node, (BinOp, UnaryOp, CSEStore, CSELoad)) or isinstance(node, LEAVES):
+            # Expression statement
+            return self.expr(node)
+        return node
+
+
+def intern_subtrees(statements):
+    """
+    Share structurally identical pure expression subtrees, in place.
+    Returns (statements, InternStats).
+    """
+    interner = _Interner()
+    interner.block(statements)
+    return statements, interner.stats
+
+
+# === Common subexpression elimination ===
+
+class CSEStats:
+    """
+    Result of eliminate_common_subexpressions().
+    Attributes:
+        stores: Number of CSEStore nodes inserted
+        loads: Number of repeated expressions replaced by a CSELoad
+        nodes_saved: Expression node evaluations skipped per execution of
+                     every load once (the runtime total is counted by
+                     Interpreter.evaluations_avoided)
+    """
+    def __init__(self, stores=0, loads=0, nodes_saved=0):
+        self.stores = stores
+        self.loads = loads
+        self.nodes_saved = nodes_saved
+
+    def __repr__(self):
+        return f"CSEStats(stores={self.stores}, loads={self.loads}, nodes_saved={self.nodes_saved})"
+
+
+class _CSE:
+    """
+    One rewriting pass. Expressions are visited in evaluation order while
+    tracking `avail`: keys of pure expressions definitely computed on every
+    path to the current point, mapped to the variables they read.
+    The pass runs twice: the first run (hot=None) only records which keys
+    are ever reused, the second inserts stores for exactly those keys.
+    """
+    def __init__(self, keys, hot=None):
+        self.keys = keys
+        self.hot = hot
+        self.reused = set()
+        self.slots = {}
+        self.stats = CSEStats()
+
+    def slot(self, key):
+        if key not in self.slots:
+            self.slots[key] = len(self.slots)
+        return self.slots[key]
+
+    def expr(self, node, avail):
+        # Rewrite an expression in evaluation order. The walk uses an
+        # explicit stack (operands are rebuilt into `values`), so deep
+        # expressions do not hit the recursion limit
+        keys = self.keys
+        values = []
+        pending = [(node, False)]
+        while pending:
+            node, ready = pending.pop()
+            if ready:
+                # Copy the node with rewritten operands; nodes are never mutated here
+                if isinstance(node, BinOp):
+                    right = values.pop()
+                    new = BinOp(values.pop(), node.op, right)
+                else:
+                    new = UnaryOp(node.op, values.pop())
+                key = keys.key(node)
+                if key is not None:
+                    if self.hot is not None and key in self.hot:
+                        new = CSEStore(self.slot(key), new)
+                        self.stats.stores += 1
+                    avail[key] = keys.reads(node)
+                values.append(new)
+                continue
+            key = keys.key(node)
+            if key is not None and not isinstance(node, LEAVES) and key in avail:
+                self.reused.add(key)
+                size = keys.size(node)
+                self.stats.loads += 1
+                self.stats.nodes_saved += size
+                values.append(CSELoad(self.slot(key), node, size))
+            elif isinstance(node, (BinOp, UnaryOp)):
+                # The left operand is evaluated (and rewritten) first
+                pending.append((node, True))
+                pending.extend((child, False) for child in reversed(_operands(node)))
+            else:
+                if key is None and _mutates([node]):
+                    self.invalidate_reads(avail)
+                values.append(node)
+        return values[0]
+
+    @staticmethod
+    def invalidate(names, avail):
+        # Drop every available expression that reads one of names
+        for key in [key for key, reads in avail.items() if reads & names]:
+            del avail[key]
+
+    @staticmethod
+    def invalidate_reads(avail):
+        # Drop every available expression that reads any variable: a call or
+        # an append may have changed an array through a parameter or alias
+        for key in [key for key, reads in avail.items() if reads]:
+            del avail[key]
+
+    def block(self, statements, avail):
+        return [self.stmt(stmt, avail) for stmt in statements]
+
+    def stmt(self, node, avail):
+        if isinstance(node, VarAssign):
+            value = self.expr(node.value, avail)
+            self.invalidate({node.name}, avail)
+            return VarAssign(node.name, value)
+        if isinstance(node, PrintStmt):
+            return PrintStmt(self.expr(node.expr, avail))
+        if isinstance(node, IfStmt):
+            condition = self.expr(node.condition, avail)
+            true_avail = dict(avail)
+            true_block = self.block(node.true_block, true_avail)
+            false_avail = dict(avail)
+            false_block = None
+            if node.false_block is not None:
+                false_block = self.block(node.false_block, false_avail)
+            # Only what both branches leave available survives the if
+            merged = {key: reads for key, reads in true_avail.items() if key in false_avail}
+            avail.clear()
+            avail.update(merged)
+            return IfStmt(condition, true_block, false_block, node.pos)
+        if isinstance(node, WhileStmt):
+            # The condition runs again after every iteration of the body
+            self.invalidate(assigned_names(node.body), avail)
+            if _mutates([node]):
+                self.invalidate_reads(avail)
+            condition = self.expr(node.condition, avail)
+            body = self.block(node.body, dict(avail))
+            # After the loop the last thing evaluated was the condition
+            return WhileStmt(condition, body, node.pos)
+        if isinstance(node, ForStmt):
+            # The bounds run once, before the variable is first assigned
+            start = self.expr(node.start, avail)
+            stop = self.expr(node.stop, avail)
+            self.invalidate(assigned_names([node]), avail)
+            if _mutates(node.body):
+                self.invalidate_reads(avail)
+            body = self.block(node.body, dict(avail))
+            return ForStmt(node.name, start, stop, body, node.pos)
+        if isinstance(node, (BinOp, UnaryOp, InputExpr)) or isinstance(node, LEAVES):
+            return self.expr(node, avail)
+        # Unknown statement: assume it may change anything
+        avail.clear()
+        return node
+
+
+def eliminate_common_subexpressions(statements):
+    """
+    Return (new_statements, CSEStats). The input statements are not modified.
+    """
+    keys = ExprKeys()
+    counting = _CSE(keys)
+    counting.block(statements, {})
+    rewriting = _CSE(keys, hot=counting.reused)
+    new_statements = rewriting.block(statements, {})
+    return new_statements, rewriting.stats
+
+
+# === Runtime expression caching ===
+
+# Smaller expressions are cheaper to evaluate than to look up
+MIN_CACHED_NODES = 5
+
+class ExprCacheStats:
+    """
+    Result of cache_pure_expressions().
+    Attributes:
+        cached: Distinct expressions given a cache entry
+        sites: Places in the program that use one of them
+        nodes_covered: Expression nodes under those sites
+    """
+    def __init__(self, cached=0, sites=0, nodes_covered=0):
+        self.cached = cached
+        self.sites = sites
+        self.nodes_covered = nodes_covered
+
+    def __repr__(self):
+        return (f"ExprCacheStats(cached={self.cached}, sites={self.sites}, "
+                f"nodes_covered={self.nodes_covered})")
+
+
+def _written_every_iteration(body):
+    # Names a loop body writes outside any nested block
+    names = set()
+    for stmt in body:
+        if isinstance(stmt, (VarAssign, ForStmt)):
+            names.add(stmt.name)
+        elif isinstance(stmt, Append):
+            names.add(stmt.target.name)
+    return names
+
+
+class _Cacher:
+    """
+    Wraps pure expressions inside loops. An expression reading a variable
+    the innermost loop writes on every iteration would only ever miss, so
+    such an expression is left alone and its largest pure parts that avoid
+    those variables are wrapped instead. Identical expressions share one
+    CachedExpr and therefore one cache entry.
+    """
+    def __init__(self):
+        self.keys = ExprKeys()
+        self.wrappers = {}        # key -> CachedExpr
+        self.stats = ExprCacheStats()
+
+    def expr(self, node, variant):
+        # Top-down with an explicit stack (rebuilt operands collect in
+        # `values`), so deep expressions do not hit the recursion limit
+        keys = self.keys
+        values = []
+        pending = [(node, False)]
+        while pending:
+            node, ready = pending.pop()
+            if ready:
+                # Rebuild rather than mutate: interned nodes may be shared
+                if isinstance(node, BinOp):
+                    right = values.pop()
+                    new = BinOp(values.pop(), node.op, right)
+                else:
+                    new = UnaryOp(node.op, values.pop())
+                new.fast = node.fast
+                values.append(new)
+                continue
+            key = keys.key(node)
+            if key is not None and not isinstance(node, LEAVES):
+                size = keys.size(node)
+                if size < MIN_CACHED_NODES:
+                    values.append(node)
+                    continue
+                reads = keys.reads(node)
+                if not reads & variant:
+                    wrapper = self.wrappers.get(key)
+                    if wrapper is None:
+                        wrapper = self.wrappers[key] = CachedExpr(node, tuple(sorted(reads)), size)
+                        self.stats.cached += 1
+                    self.stats.sites += 1
+                    self.stats.nodes_covered += size
+                    values.append(wrapper)
+                    continue
+            if isinstance(node, (BinOp, UnaryOp)):
+                pending.append((node, True))
+                pending.extend((child, False) for child in reversed(_operands(node)))
+            else:
+                values.append(node)
+        return values[0]
+
+    def block(self, statements, variant):
+        for index, stmt in enumerate(statements):
+            statements[index] = self.stmt(stmt, variant)
+
+    def stmt(self, node, variant):
+        # variant is None outside loops, where every expression runs once
+        if isinstance(node, WhileStmt):
+            inner = _written_every_iteration(node.body)
+            node.condition = self.expr(node.condition, inner)
+            self.block(node.body, inner)
+        elif isinstance(node, ForStmt):
+            # The bounds run once per entry; the variable changes every iteration
+            if variant is not None:
+                node.start = self.expr(node.start, variant)
+                node.stop = self.expr(node.stop, variant)
+            self.block(node.body, _written_every_iteration(node.body) | {node.name})
+        elif isinstance(node, IfStmt):
+            if variant is not None:
+                node.condition = self.expr(node.condition, variant)
+            self.block(node.true_block, variant)
+            if node.false_block is not None:
+                self.block(node.false_block, variant)
+        elif variant is None:
+            pass
+        elif isinstance(node, VarAssign):
+            node.value = self.expr(node.value, variant)
+        elif isinstance(node, PrintStmt):
+            node.expr = self.expr(node.expr, variant)
+        elif isinstance(node, Append):
+            node.value = self.expr(node.value, variant)
+        elif isinstance(node, (BinOp, UnaryOp)):
+            # Expression statement
+            return self.expr(node, variant)
+        return node
+
+
+def cache_pure_expressions(statements):
+    """
+    Wrap pure expressions inside top-level loops in CachedExpr nodes, in
+    place. Function bodies are left alone. Returns (statements, ExprCacheStats).
+    """
+    cacher = _Cacher()
+    cacher.block(statements, None)
+    return statements, cacher.stats
+
+
+# === Liveness ===
+
+class LivenessStats:
+    """
+    Result of release_dead_values().
+    Attributes:
+        releases: Release nodes inserted
+        names_released: Variable names across those nodes
+        dead_stores: Assignments skipped because their value is never read
+        pinned: Variables never released because a function body (or a
+                call to a function defined elsewhere) may read them
+    """
+    def __init__(self, releases=0, names_released=0, dead_stores=0, pinned=0):
+        self.releases = releases
+        self.names_released = names_released
+        self.dead_stores = dead_stores
+        self.pinned = pinned
+
+    def __repr__(self):
+        return (f"LivenessStats(releases={self.releases}, names_released={self.names_released}, "
+                f"dead_stores={self.dead_stores}, pinned={self.pinned})")
+
+
+def _subnodes(node):
+    # Child nodes of any node, function bodies included
+    if isinstance(node, BinOp):
+        return [node.left, node.right]
+    if isinstance(node, (UnaryOp, CSEStore)):
+        return [node.expr]
+    if isinstance(node, (VarAssign, LocalAssign)):
+        return [node.value]
+    if isinstance(node, PrintStmt):
+        return [node.expr]
+    if isinstance(node, IfStmt):
+        return [node.condition] + node.true_block + (node.false_block or [])
+    if isinstance(node, WhileStmt):
+        return [node.condition] + node.body
+    if isinstance(node, ForStmt):
+        return [node.start, node.stop] + node.body
+    if isinstance(node, FuncDef):
+        return list(node.body)
+    if isinstance(node, Call):
+        return list(node.args)
+    if isinstance(node, Return):
+        return [node.expr] if node.expr is not None else []
+    if isinstance(node, ArrayLiteral):
+        return list(node.elements)
+    if isinstance(node, Index):
+        return [node.target, node.index]
+    if isinstance(node, Append):
+        return [node.target, node.value]
+    if isinstance(node, DeadStore):
+        return [node.assign]
+    return []
+
+def _walk(nodes):
+    # Every node under nodes, each shared node once
+    seen = set()
+    pending = list(nodes)
+    while pending:
+        node = pending.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        yield node
+        pending.extend(_subnodes(node))
+
+
+class _Liveness:
+    """
+    Backward liveness over the top-level statement list. A variable is live
+    at a point if some path from there reads it before assigning it; loops
+    are iterated to a fixed point, so a variable read by a later iteration
+    stays live through the whole body. After each statement the variables it
+    reads or writes that are no longer live are released. Function bodies
+    are not rewritten: every global any of them reads is pinned (never
+    released or dropped), since a call may read it at any time.
+    """
+    def __init__(self, statements, keep):
+        self.stats = LivenessStats()
+        self._reads = {}          # id(expr) -> (expr, names it reads)
+        nodes = list(_walk(statements))
+        defined = {node.name for node in nodes if isinstance(node, FuncDef)}
+        names = set()
+        pinned = set(keep)
+        opaque = False
+        for node in nodes:
+            if isinstance(node, (VarAccess, VarAssign, ForStmt)):
+                names.add(node.name)
+            elif isinstance(node, FuncDef):
+                pinned |= {inner.name for inner in _walk(node.body) if isinstance(inner, VarAccess)}
+            elif isinstance(node, Call) and node.name not in defined and node.name not in BUILTINS:
+                opaque = True
+        self.pinned = names if opaque else pinned
+        self.stats.pinned = len(self.pinned - set(keep))
+
+    # --- Analysis ---
+
+    def uses(self, node):
+        # Global names an expression (or simple statement) reads. A CSELoad
+        # reuses a stored value and reads nothing, so _walk skips its expr
+        entry = self._reads.get(id(node))
+        if entry is None:
+            names = frozenset(inner.name for inner in _walk([node]) if isinstance(inner, VarAccess))
+            entry = self._reads[id(node)] = (node, names)
+        return entry[1]
+
+    def live_in(self, node, out):
+        # Variables live before node, given those live after it
+        if isinstance(node, VarAssign):
+            return (out - {node.name}) | self.uses(node.value)
+        if isinstance(node, IfStmt):
+            false_in = self.block_in(node.false_block, out) if node.false_block is not None else out
+            return self.uses(node.condition) | self.block_in(node.true_block, out) | false_in
+        if isinstance(node, WhileStmt):
+            return self.while_head(node, out)
+        if isinstance(node, ForStmt):
+            return self.uses(node.start) | self.uses(node.stop) | self.for_head(node, out)
+        if isinstance(node, (FuncDef, Release)):
+            return out
+        return out | self.uses(node)
+
+    def block_in(self, statements, out):
+        for stmt in reversed(statements):
+            out = self.live_in(stmt, out)
+        return out
+
+    def while_head(self, node, out):
+        # Live before each test of the condition
+        base = self.uses(node.condition) | out
+        head = base
+        while True:
+            new = base | self.block_in(node.body, head)
+            if new == head:
+                return head
+            head = new
+
+    def for_head(self, node, out):
+        # Live before each step of the counter, which assigns the variable
+        # (its next value, or its final value on exit)
+        base = out - {node.name}
+        head = base
+        while True:
+            new = base | (self.block_in(node.body, head) - {node.name})
+            if new == head:
+                return head
+            head = new
+
+    # --- Rewriting ---
+
+    def block(self, statements, out, defined, last_assign=None):
+        # Rewrite a block whose live-out set is out; defined holds the names
+        # certainly assigned before it. Returns the new statement list.
+        before = []
+        defined = set(defined)
+        for stmt in statements:
+            before.append(frozenset(defined))
+            if isinstance(stmt, (VarAssign, ForStmt)):
+                defined.add(stmt.name)
+        result = []
+        live = out
+        overwritten = set()       # assigned by the next statement anyway
+        for stmt, defined in zip(reversed(statements), reversed(before)):
+            if (isinstance(stmt, VarAssign) and stmt is not last_assign
+                    and stmt.name not in live and stmt.name not in self.pinned
+                    and self.cannot_fail(stmt.value, defined)):
+                # Still analysed as an assignment: with an accountant it runs,
+                # so what it reads stays live up to it and is released after
+                self.stats.dead_stores += 1
+                live_in = self.live_in(stmt, live)
+                dead = self.touched(stmt) - live - self.pinned - overwritten
+                overwritten = {stmt.name}
+                stmt = DeadStore(stmt)
+            else:
+                live_in = self.stmt(stmt, live, defined)
+                dead = self.touched(stmt) - live - self.pinned - overwritten
+                overwritten = {stmt.name} if isinstance(stmt, VarAssign) else set()
+            if dead:
+                result.append(Release(tuple(sorted(dead))))
+                self.stats.releases += 1
+                self.stats.names_released += len(dead)
+            result.append(stmt)
+            live = live_in
+        result.reverse()
+        return result
+
+    def stmt(self, node, out, defined):
+        # Rewrite the blocks inside node; returns the variables live before it
+        if isinstance(node, IfStmt):
+            node.true_block = self.block(node.true_block, out, defined)
+            if node.false_block is not None:
+                node.false_block = self.block(node.false_block, out, defined)
+        elif isinstance(node, WhileStmt):
+            head = self.while_head(node, out)
+            node.body = self.block(node.body, head, defined)
+        elif isinstance(node, ForStmt):
+            head = self.for_head(node, out)
+            node.body = self.block(node.body, head, defined | {node.name})
+        return self.live_in(node, out)
+
+    def touched(self, node):
+        # Every global name node reads or assigns, nested blocks included
+        if isinstance(node, (FuncDef, Release)):
+            return set()
+        return {inner.name for inner in _walk([node])
+                if isinstance(inner, (VarAccess, VarAssign, ForStmt))}
+
+    def cannot_fail(self, node, defined):
+        # True if evaluating node has no effect and cannot raise: literals,
+        # variables certainly assigned, and operators that never raise or
+        # allocate. Arithmetic can overflow or build a huge string or array,
+        # and ordering comparisons raise on mixed types, so only and/or and
+        # ==/!= on operands proven not to be arrays (fast) qualify.
+        # Every node under node must qualify; the walk uses an explicit stack
+        pending = [node]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, (Num, Bool, String, CSELoad)):
+                continue
+            if isinstance(node, VarAccess):
+                if node.name not in defined:
+                    return False
+            elif isinstance(node, BinOp):
+                op_type = node.op.type
+                if op_type not in (TT_AND, TT_OR) and (op_type not in (TT_EQ, TT_NE) or node.fast is None):
+                    return False
+                pending.append(node.right)
+                pending.append(node.left)
+            elif isinstance(node, UnaryOp):
+                if node.op.type != TT_NOT and node.fast is None:
+                    return False
+                pending.append(node.expr)
+            elif isinstance(node, ArrayLiteral):
+                pending.extend(node.elements)
+            else:
+                return False
+        return True
+
+
+def release_dead_values(statements, keep=()):
+    """
+    Insert Release nodes after the last use of each global variable and
+    turn dead assignments whose value cannot fail into DeadStore nodes, in
+    place; the engines skip those unless the run has a MemoryAccountant,
+    whose limits the assignment might exceed. Run it after
+    infer_types() (proven operators let more dead assignments go) and before
+    apply_profile(). Variables are released even at the end of the program,
+    so a run's variables only keep the names in keep.
+    Returns (statements, LivenessStats).
+    """
+    liveness = _Liveness(statements, keep)
+    last_assign = None
+    for stmt in statements:
+        if isinstance(stmt, VarAssign):
+            last_assign = stmt
+    # The last top-level assignment may be the value of the whole run
+    statements[:] = liveness.block(statements, frozenset(), (), last_assign)
+    return statements, liveness.stats
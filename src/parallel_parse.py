@@ -0,0 +1,122 @@
+# parallel_parse.py
+# Parallel front end for large sources.
+# The source is cut into chunks at top-level statement boundaries - a ';' or
+# a '}' at brace and parenthesis depth zero (the header of a for loop holds
+# a ';'), outside string literals, and (for '}') not followed by 'else' - so
+# every chunk holds whole statements. Chunks are
+# lexed and parsed in a process pool and the statement lists are joined in
+# source order. Token positions are offset by the chunk's start, so nodes
+# carry the same positions as after a serial parse.
+#
+# Parsing, pickling and unpickling a chunk create millions of objects and no
+# garbage cycles, so the cyclic garbage collector is paused meanwhile; left
+# on, its repeated full scans cost more than the unpickling itself.
+#
+# When a chunk fails to parse, the source from that chunk's start to the end
+# is parsed serially in this process instead: everything before it parsed
+# cleanly, so this raises exactly the error (message and position) a
+# serial parse of the whole source does.
+
+import gc
+import pickle
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from src.lexer import Lexer
+from src.my_parser import Parser
+from src.positions import LineIndex
+
+DEFAULT_CHUNK_SIZE = 1 << 20     # Minimum characters per chunk
+
+# A string literal (escapes skipped, possibly unterminated), a brace, a
+# parenthesis or a semicolon; everything else is jumped over by finditer
+_SCAN = re.compile(r'"(?:[^"\\]|\\.)*"?|[{}();]', re.DOTALL)
+_ELSE = re.compile(r'\s*else(?!\w)', re.IGNORECASE)
+
+
+def split_source(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Return the offsets at which source can be cut into chunks of at least
+    chunk_size characters (the last may be shorter), starting with 0.
+    """
+    cuts = [0]
+    if len(source) <= chunk_size:
+        return cuts
+    depth = parens = 0
+    next_cut = chunk_size
+    for match in _SCAN.finditer(source):
+        char = match.group()
+        if char == '(':
+            parens += 1
+        elif char == ')':
+            parens -= 1
+            if parens < 0:
+                break
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth < 0:
+                # Unbalanced: the parse fails here, leave the rest in one chunk
+                break
+            if (depth == 0 and parens == 0 and match.end() >= next_cut
+                    and not _ELSE.match(source, match.end())):
+                cuts.append(match.end())
+                next_cut = match.end() + chunk_size
+        elif char == ';':
+            if depth == 0 and parens == 0 and match.end() >= next_cut:
+                cuts.append(match.end())
+                next_cut = match.end() + chunk_size
+    if cuts[-1] >= len(source):
+        cuts.pop()
+    return cuts
+
+
+def _parse_chunk(text, offset):
+    # Worker: parse one chunk and return its pickled statement list, or None
+    # if it has an error. Pickling here keeps the collector paused for it too
+    gc.disable()
+    try:
+        statements = Parser(Lexer(text, offset)).parse()
+        return pickle.dumps(statements, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return None
+    finally:
+        gc.enable()
+
+
+def parse_parallel(source, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Parse source into the same statement list as Parser(Lexer(source)).parse(),
+    lexing and parsing chunks of it in parallel.
+    workers: Number of worker processes; None uses the CPU count
+    chunk_size: Minimum characters per chunk; a source no longer than this
+                is parsed serially
+    Raises the same SourceError as a serial parse on invalid input.
+    """
+    cuts = split_source(source, chunk_size)
+    if len(cuts) == 1 or workers == 1:
+        return Parser(Lexer(source)).parse()
+    bounds = cuts + [len(source)]
+    chunks = [source[bounds[index]:bounds[index + 1]] for index in range(len(cuts))]
+    statements = []
+    pool = ProcessPoolExecutor(max_workers=workers)
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        # Chunks are large, so each is its own task
+        for offset, data in zip(cuts, pool.map(_parse_chunk, chunks, cuts)):
+            if data is None:
+                statements.extend(_parse_rest(source, offset))
+                break
+            statements.extend(pickle.loads(data))
+    finally:
+        pool.shutdown(cancel_futures=True)
+        if collecting:
+            gc.enable()
+    return statements
+
+
+def _parse_rest(source, offset):
+    # Serially parse source[offset:] with global positions, raising its error
+    return Parser(Lexer(source[offset:], offset, LineIndex(source))).parse()
@@ -0,0 +1,66 @@
+# positions.py
+# Source positions for tokens and errors.
+# Tokens carry a single character offset (Token.pos). Converting an offset
+# to a line and column needs the start offset of every line; LineIndex only
+# builds that list the first time a conversion is asked for (an error or a
+# profiler report), then answers each lookup with a binary search.
+
+from bisect import bisect_right
+
+
+class LineIndex:
+    """
+    Maps character offsets in text to 1-based (line, column) pairs.
+    """
+    __slots__ = ('text', '_starts')
+
+    def __init__(self, text):
+        self.text = text
+        self._starts = None       # Offset of the first character of each line
+
+    def _line_starts(self):
+        if self._starts is None:
+            starts = [0]
+            find = self.text.find
+            index = find('\n')
+            while index != -1:
+                starts.append(index + 1)
+                index = find('\n', index + 1)
+            self._starts = starts
+        return self._starts
+
+    def line_col(self, offset):
+        """
+        Return the 1-based (line, column) of offset.
+        """
+        starts = self._line_starts()
+        line = bisect_right(starts, offset)
+        return line, offset - starts[line - 1] + 1
+
+    def line_text(self, line):
+        # Text of a 1-based line number, without its newline
+        starts = self._line_starts()
+        end = starts[line] - 1 if line < len(starts) else len(self.text)
+        return self.text[starts[line - 1]:end]
+
+
+class SourceError(Exception):
+    """
+    Lexing or parsing error at a position in the source.
+    Attributes:
+        message: The error message without the position
+        pos: Character offset of the error, or None if unknown
+        line, column: 1-based position, or None if unknown
+    """
+    def __init__(self, message, pos=None, lines=None):
+        self.message = message
+        self.pos = pos
+        self.line = self.column = None
+        if pos is not None and lines is not None:
+            self.line, self.column = lines.line_col(pos)
+        super().__init__(str(self))
+
+    def __str__(self):
+        if self.line is not None:
+            return f"{self.message} (line {self.line}, column {self.column})"
+        return self.message
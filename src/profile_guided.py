@@ -0,0 +1,423 @@
+# profile_guided.py
+# Profile-guided optimisation from recorded runs.
+# A ProfilingInterpreter records, per source position, how often each
+# IfStmt took each branch, how many times each loop ran its body, and
+# which operand type pairs each BinOp saw. The profile is saved beside the
+# script (script.txt -> script.txt.profile.json) and merged with earlier runs,
+# so it accumulates the script's history. Program(source, profile=...) then:
+#   - gives hot BinOps that type inference could not prove a guarded fast
+#     path: one type check per observed operand type pair, most frequent
+#     first, falling back to the fully checked apply_binop on a guard miss
+#   - marks blocks the profile never saw run as cold; the stack engine
+#     (src/stack_interpreter.py) flattens cold blocks only when first reached
+# A profile can only make code faster or slower, never change what it does:
+# every speculative path is guarded. Profiles of other source text are
+# ignored (load_profile() checks a hash of the source).
+# Nodes are recorded when the visitor evaluates them; code inside function
+# bodies that contains calls runs on the call driver and is not recorded.
+#
+# Usage (from the project root):
+#   python -m src.profile_guided record script.txt --input input.txt
+#   python -m src.profile_guided report script.txt
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+from src.lexer import Lexer
+from src.my_parser import (
+    Parser, BinOp, UnaryOp,
+    VarAssign, PrintStmt, IfStmt, WhileStmt, ForStmt,
+    FuncDef, Call, Return, LocalAssign,
+    ArrayLiteral, Index, Append,
+    CSEStore
+)
+from src.interpreter import Interpreter, line_reader
+from src.arrays import ArrayValue
+from src.positions import LineIndex
+from src.type_infer import FAST_BINOPS, binop_result, ERROR
+
+PROFILE_VERSION = 1
+PROFILE_SUFFIX = '.profile.json'
+# A site must have run this often before its profile changes compilation
+MIN_SAMPLES = 20
+# Most operand type pairs guarded at one BinOp
+MAX_GUARDS = 3
+
+TYPE_NAMES = {int: 'int', float: 'float', bool: 'bool', str: 'str', ArrayValue: 'array'}
+NAME_TYPES = {name: cls for cls, name in TYPE_NAMES.items()}
+
+
+def source_hash(source):
+    return hashlib.sha256(source.encode()).hexdigest()
+
+def profile_path(script_path):
+    """
+    Path of the profile saved beside script_path.
+    """
+    return script_path + PROFILE_SUFFIX
+
+
+class Profile:
+    """
+    Execution counts of one source text, keyed by source offset.
+    Attributes:
+        source_hash: Hash of the profiled source (see source_hash())
+        runs: Number of recorded runs merged into this profile
+        branches: 'if' offset -> [times true, times false]
+        loops: 'while' offset -> [times entered, total body iterations]
+        binops: operator offset -> {'left,right' type names: count}
+    """
+    def __init__(self, source_hash=None):
+        self.source_hash = source_hash
+        self.runs = 0
+        self.branches = {}
+        self.loops = {}
+        self.binops = {}
+
+    def merge(self, other):
+        """
+        Add the counts of other (a profile of the same source) to this one.
+        """
+        if other.source_hash != self.source_hash:
+            raise Exception("Cannot merge profiles of different sources")
+        self.runs += other.runs
+        for mine, theirs in ((self.branches, other.branches), (self.loops, other.loops)):
+            for pos, counts in theirs.items():
+                total = mine.setdefault(pos, [0, 0])
+                total[0] += counts[0]
+                total[1] += counts[1]
+        for pos, pairs in other.binops.items():
+            total = self.binops.setdefault(pos, {})
+            for pair, count in pairs.items():
+                total[pair] = total.get(pair, 0) + count
+        return self
+
+    def to_dict(self):
+        return {
+            'version': PROFILE_VERSION,
+            'source_hash': self.source_hash,
+            'runs': self.runs,
+            'branches': {str(pos): counts for pos, counts in self.branches.items()},
+            'loops': {str(pos): counts for pos, counts in self.loops.items()},
+            'binops': {str(pos): pairs for pos, pairs in self.binops.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != PROFILE_VERSION:
+            raise Exception(f"Unsupported profile version {data.get('version')!r}")
+        profile = cls(data['source_hash'])
+        profile.runs = data['runs']
+        profile.branches = {int(pos): list(counts) for pos, counts in data['branches'].items()}
+        profile.loops = {int(pos): list(counts) for pos, counts in data['loops'].items()}
+        profile.binops = {int(pos): dict(pairs) for pos, pairs in data['binops'].items()}
+        return profile
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def __repr__(self):
+        return (f"Profile(runs={self.runs}, branches={len(self.branches)}, "
+                f"loops={len(self.loops)}, binops={len(self.binops)})")
+
+
+def load_profile(script_path, source):
+    """
+    The saved profile of a script, or None if there is none or it was
+    recorded for different source text.
+    """
+    path = profile_path(script_path)
+    if not os.path.exists(path):
+        return None
+    profile = Profile.load(path)
+    if profile.source_hash != source_hash(source):
+        return None
+    return profile
+
+
+# === Recording ===
+
+class ProfilingInterpreter(Interpreter):
+    """
+    Interpreter that counts branches, loop trips and BinOp operand types
+    into self.profile while it runs.
+    """
+    def __init__(self, profile, input_func=None, output=None):
+        super().__init__(input_func=input_func, output=output)
+        self.profile = profile
+
+    def visit_IfStmt(self, node):
+        condition = self.visit(node.condition)
+        if node.pos is not None:
+            counts = self.profile.branches.setdefault(node.pos, [0, 0])
+            counts[0 if condition else 1] += 1
+        if condition:
+            for stmt in node.true_block:
+                self.visit(stmt)
+        elif node.false_block is not None:
+            for stmt in node.false_block:
+                self.visit(stmt)
+
+    def visit_WhileStmt(self, node):
+        counts = self.profile.loops.setdefault(node.pos, [0, 0]) if node.pos is not None else [0, 0]
+        counts[0] += 1
+        while self.visit(node.condition):
+            self.loop_iterations += 1
+            counts[1] += 1
+            for stmt in node.body:
+                self.visit(stmt)
+
+    def visit_ForStmt(self, node):
+        counts = self.profile.loops.setdefault(node.pos, [0, 0]) if node.pos is not None else [0, 0]
+        start = self.visit(node.start)
+        values = self.loop_range(start, self.visit(node.stop))
+        counts[0] += 1
+        self.store_loop_var(node, start)
+        for value in values:
+            self.store_loop_var(node, value)
+            self.loop_iterations += 1
+            counts[1] += 1
+            for stmt in node.body:
+                self.visit(stmt)
+        if values:
+            self.store_loop_var(node, values.stop)
+
+    def visit_BinOp(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        pos = node.op.pos
+        if pos is not None:
+            pairs = self.profile.binops.get(pos)
+            if pairs is None:
+                pairs = self.profile.binops[pos] = {}
+            pair = f"{TYPE_NAMES.get(type(left), 'other')},{TYPE_NAMES.get(type(right), 'other')}"
+            pairs[pair] = pairs.get(pair, 0) + 1
+        return self.apply_binop(node.op, left, right)
+
+
+def record_profile(source, inputs=None, variables=None, output=None):
+    """
+    Run source once unoptimised under a ProfilingInterpreter and return the
+    recorded Profile. inputs is a string of input lines or None.
+    """
+    profile = Profile(source_hash(source))
+    profile.runs = 1
+    interpreter = ProfilingInterpreter(profile, line_reader(inputs or ''), output)
+    if variables:
+        interpreter.global_vars.update(variables)
+    for stmt in Parser(Lexer(source)).parse():
+        interpreter.visit(stmt)
+    return profile
+
+
+# === Applying ===
+
+class ProfileReport:
+    """
+    What apply_profile() changed.
+    Attributes:
+        specialized: BinOp sites given a guarded fast path
+        guards: Total type guards over those sites
+        cold_blocks: Blocks (if branches and loop bodies) marked cold
+    """
+    def __init__(self):
+        self.specialized = 0
+        self.guards = 0
+        self.cold_blocks = 0
+
+    def __repr__(self):
+        return (f"ProfileReport(specialized={self.specialized}, guards={self.guards}, "
+                f"cold_blocks={self.cold_blocks})")
+
+
+# The checked path every guard falls back to. Fast paths only run when no
+# MemoryAccountant is set, so a stateless interpreter is enough.
+_CHECKED = Interpreter()
+
+def guarded_binop(op, pairs, fast):
+    """
+    Operator function that runs fast(left, right) when the operand types
+    match one of pairs (checked in order), else the checked apply_binop.
+    """
+    apply = _CHECKED.apply_binop
+    if len(pairs) == 1:
+        (left_type, right_type), = pairs
+        def guarded(left, right):
+            if type(left) is left_type and type(right) is right_type:
+                return fast(left, right)
+            return apply(op, left, right)
+    else:
+        def guarded(left, right):
+            types = (type(left), type(right))
+            for pair in pairs:
+                if types == pair:
+                    return fast(left, right)
+            return apply(op, left, right)
+    guarded.pairs = pairs         # For reports and tests
+    return guarded
+
+def _guard_pairs(node, observed):
+    # Observed type pairs the unchecked operator handles, most frequent first
+    pairs = []
+    for pair, count in sorted(observed.items(), key=lambda item: -item[1]):
+        left, _, right = pair.partition(',')
+        if left not in NAME_TYPES or right not in NAME_TYPES or 'array' in (left, right):
+            continue
+        if binop_result(node.op.type, left, right) == ERROR:
+            continue
+        pairs.append((NAME_TYPES[left], NAME_TYPES[right]))
+        if len(pairs) == MAX_GUARDS:
+            break
+    return tuple(pairs)
+
+def _children(node):
+    # Child nodes, including function bodies and CSE expressions
+    if isinstance(node, BinOp):
+        return (node.left, node.right)
+    if isinstance(node, (UnaryOp, PrintStmt, CSEStore)):
+        return (node.expr,)
+    if isinstance(node, (VarAssign, LocalAssign)):
+        return (node.value,)
+    if isinstance(node, IfStmt):
+        return [node.condition] + node.true_block + (node.false_block or [])
+    if isinstance(node, WhileStmt):
+        return [node.condition] + node.body
+    if isinstance(node, ForStmt):
+        return [node.start, node.stop] + node.body
+    if isinstance(node, FuncDef):
+        return node.body
+    if isinstance(node, Call):
+        return node.args
+    if isinstance(node, Return):
+        return (node.expr,) if node.expr is not None else ()
+    if isinstance(node, ArrayLiteral):
+        return node.elements
+    if isinstance(node, Index):
+        return (node.target, node.index)
+    if isinstance(node, Append):
+        return (node.target, node.value)
+    return ()
+
+def apply_profile(statements, profile):
+    """
+    Specialise hot BinOps and mark cold blocks in statements (in place,
+    after the other compile passes) from profile. Returns a ProfileReport.
+    """
+    report = ProfileReport()
+    seen = set()
+    pending = list(statements)
+    while pending:
+        node = pending.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        pending.extend(_children(node))
+        if isinstance(node, BinOp):
+            observed = profile.binops.get(node.op.pos)
+            fast = FAST_BINOPS.get(node.op.type)
+            # Proven sites already have an unchecked path
+            if node.fast is not None or fast is None or not observed:
+                continue
+            if sum(observed.values()) < MIN_SAMPLES:
+                continue
+            pairs = _guard_pairs(node, observed)
+            if pairs:
+                node.fast = guarded_binop(node.op, pairs, fast)
+                report.specialized += 1
+                report.guards += len(pairs)
+        elif isinstance(node, IfStmt):
+            counts = profile.branches.get(node.pos)
+            if counts is None or sum(counts) < MIN_SAMPLES:
+                continue
+            if counts[0] == 0:
+                node.cold = 'true'
+                report.cold_blocks += 1
+            elif counts[1] == 0 and node.false_block is not None:
+                node.cold = 'false'
+                report.cold_blocks += 1
+        elif isinstance(node, (WhileStmt, ForStmt)):
+            counts = profile.loops.get(node.pos)
+            if counts is not None and counts[0] >= MIN_SAMPLES and counts[1] == 0:
+                node.cold = True
+                report.cold_blocks += 1
+    return report
+
+
+# === Reporting ===
+
+def format_profile(profile, source):
+    """
+    Human-readable summary of a profile, one line per site in source order.
+    """
+    lines = LineIndex(source)
+    rows = []
+    for pos, (taken, not_taken) in profile.branches.items():
+        total = taken + not_taken
+        rows.append((pos, f"if: true {taken}/{total} ({taken / total:.0%})" if total else "if: never run"))
+    for pos, (entries, trips) in profile.loops.items():
+        average = trips / entries if entries else 0.0
+        keyword = 'for' if source[pos:pos + 3].lower() == 'for' else 'while'
+        rows.append((pos, f"{keyword}: entered {entries}, {trips} iterations ({average:.1f} per entry)"))
+    for pos, pairs in profile.binops.items():
+        total = sum(pairs.values())
+        mix = ", ".join(f"{pair} {count / total:.0%}"
+                        for pair, count in sorted(pairs.items(), key=lambda item: -item[1]))
+        rows.append((pos, f"'{source[pos]}' x{total}: {mix}"))
+    rows.sort()
+    result = [f"profile of {profile.runs} run(s)"]
+    for pos, text in rows:
+        line, column = lines.line_col(pos)
+        result.append(f"  {line}:{column} {text}")
+    return "\n".join(result)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Record or show a script's execution profile.")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help="run the script and merge its profile into SCRIPT.profile.json")
+    record.add_argument('script')
+    record.add_argument('--input', help="file whose lines are the script's input")
+    record.add_argument('-q', '--quiet', action='store_true', help="discard the script's output")
+    report = commands.add_parser('report', help="print the saved profile")
+    report.add_argument('script')
+    args = arg_parser.parse_args(argv)
+
+    with open(args.script) as f:
+        source = f.read()
+    if args.command == 'report':
+        profile = load_profile(args.script, source)
+        if profile is None:
+            print(f"No profile for the current source of {args.script}")
+            return 1
+        print(format_profile(profile, source))
+        return 0
+
+    inputs = None
+    if args.input:
+        with open(args.input) as f:
+            inputs = f.read()
+    output = open(os.devnull, 'w') if args.quiet else None
+    try:
+        profile = record_profile(source, inputs, output=output)
+    finally:
+        if output is not None:
+            output.close()
+    saved = load_profile(args.script, source)
+    if saved is not None:
+        profile = saved.merge(profile)
+    profile.save(profile_path(args.script))
+    print(f"Saved {profile_path(args.script)} ({profile.runs} run(s))", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
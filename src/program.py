@@ -0,0 +1,242 @@
+# program.py
+# Compile-once, run-many programs.
+# A Program is lexed and parsed once; every call to run() executes the same
+# statements on a brand new Interpreter, so no state leaks between runs.
+#
+# Thread safety: a Program is compiled code only. Its statement tuple and
+# AST nodes are never written after __init__ returns (optimisation passes
+# and type tags are applied before that), and all run state - globals, call
+# frames, memo caches, CSE values, counters - lives in the Interpreter that
+# run() creates. One Program may therefore be run from any number of threads
+# at once, with or without the GIL, as long as each run gets its own output
+# and input objects. Values passed in `variables` are shared with every run
+# they are given to: each run works on its own copies of the arrays among
+# them, other values are immutable. See run_in_threads().
+
+from concurrent.futures import ThreadPoolExecutor
+
+from src.lexer import Lexer
+from src.my_parser import Parser
+from src.interpreter import Interpreter, line_reader
+from src.arrays import copy_value
+from src.async_interpreter import AsyncInterpreter
+from src.stack_interpreter import StackInterpreter
+from src.optimizer import (
+    intern_subtrees, eliminate_common_subexpressions, cache_pure_expressions,
+    release_dead_values
+)
+from src.expr_cache import ExprCache
+from src.type_infer import infer_types
+from src.profile_guided import apply_profile
+from src.parallel_parse import parse_parallel
+
+# Interpreter classes run() can use, by name
+ENGINES = {
+    'recursive': Interpreter,
+    'stack': StackInterpreter,
+}
+
+
+class RunResult:
+    """
+    Outcome of one Program.run().
+    Attributes:
+        result: Value of the last statement that produced one, or None
+        variables: The run's global variables after execution (without
+                   those a Program(liveness=...) released)
+        expr_cache: The ExprCache the run used (hit rate and stats), or None
+        counters: The interpreter's runtime counters (see Interpreter.counters())
+        functions: User-defined functions after execution (name -> FuncDef)
+    """
+    def __init__(self, result, variables, expr_cache=None, counters=None, functions=None):
+        self.result = result
+        self.variables = variables
+        self.expr_cache = expr_cache
+        self.counters = counters
+        self.functions = functions
+
+    def __repr__(self):
+        return f"RunResult({self.result!r}, {self.variables!r})"
+
+
+class Program:
+    """
+    A parsed program that can be executed many times.
+    The statement list is stored as a tuple and the object refuses attribute
+    assignment after construction; each run gets fresh interpreter state.
+    """
+    __slots__ = ('source', 'statements', 'optimize', 'report')
+
+    def __init__(self, source, optimize=0, strict=False, profile=None, parse_workers=None,
+                 statements=None, liveness=False):
+        """
+        Parse source and apply compile-time optimisations:
+            optimize=0: none
+            optimize=1: share identical pure subtrees (hash-consing) and
+                        tag type-proven operators with unchecked fast paths
+            optimize=2: also eliminate common subexpressions
+            optimize=3: also memoize loop-invariant pure expressions at run
+                        time, keyed on the versions of the variables they
+                        read (see src/expr_cache.py)
+        report maps each pass that ran to its stats object. With strict=True
+        (and optimize >= 1) operations that can only raise a TypeError fail
+        the compile instead of the run.
+        profile: Optional Profile of earlier runs of this source (see
+                 src/profile_guided.py); hot operators get guarded fast
+                 paths and never-run blocks are marked cold, at any level
+        parse_workers: Number of processes lexing and parsing chunks of a
+                       large source in parallel (see src/parallel_parse.py);
+                       None parses serially
+        statements: The already parsed statement list of source, used
+                    instead of parsing it again (it is optimised in place)
+        liveness: Delete each global variable after its last use and skip
+                  assignments that are never read when their value cannot
+                  fail and no accountant is set (see release_dead_values()
+                  in src/optimizer.py), at any level. True releases every variable; an iterable of
+                  names keeps those for RunResult.variables. False (the
+                  default) keeps all globals alive until the run ends.
+        """
+        if statements is not None:
+            statements = list(statements)
+        elif parse_workers is None:
+            statements = Parser(Lexer(source)).parse()
+        else:
+            statements = parse_parallel(source, workers=parse_workers)
+        report = {}
+        if optimize >= 2:
+            statements, report['cse'] = eliminate_common_subexpressions(statements)
+        if optimize >= 1:
+            statements, report['intern'] = intern_subtrees(statements)
+            report['types'] = infer_types(statements)
+            if strict and report['types'].errors:
+                raise Exception(report['types'].errors[0])
+        if liveness is not False:
+            keep = () if liveness is True else tuple(liveness)
+            statements, report['liveness'] = release_dead_values(statements, keep)
+        if profile is not None:
+            report['profile'] = apply_profile(statements, profile)
+        if optimize >= 3:
+            statements, report['expr_cache'] = cache_pure_expressions(statements)
+        object.__setattr__(self, 'source', source)
+        object.__setattr__(self, 'statements', tuple(statements))
+        object.__setattr__(self, 'optimize', optimize)
+        object.__setattr__(self, 'report', report)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Program objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Program objects are immutable")
+
+    def __repr__(self):
+        return f"Program({len(self.statements)} statements)"
+
+    def run(self, variables=None, inputs=None, output=None, snapshot=None, accountant=None,
+            engine='recursive', expr_cache=None):
+        """
+        Execute the program on a fresh Interpreter and return a RunResult.
+        variables: Optional mapping of initial global variables (copied)
+        inputs: Source for input(): a string (one input per line), an
+                iterable of lines, a zero-argument callable, or None to read
+                from the built-in input()
+        output: File-like object for print; None means sys.stdout
+        snapshot: Optional Snapshot (see Interpreter.snapshot()) whose
+                  variables the run starts from, copy-on-write
+        accountant: Optional MemoryAccountant (src/limits.py) enforcing
+                    memory limits; its peak is available after the run.
+                    Globals from snapshot and variables count toward it.
+        engine: Name of the interpreter in ENGINES: 'recursive' (the tree
+                visitor) or 'stack' (explicit stack, no recursion limit on
+                expression depth)
+        expr_cache: ExprCache for the run's cached expressions (optimize=3);
+                    None makes a fresh default-sized one when there are any
+        """
+        engine_class = ENGINES.get(engine)
+        if engine_class is None:
+            raise Exception(f"Unknown engine '{engine}' (expected one of: {', '.join(ENGINES)})")
+        if snapshot is None:
+            interpreter = engine_class(input_func=_input_func(inputs), output=output)
+        else:
+            interpreter = engine_class.from_snapshot(snapshot, _input_func(inputs), output)
+        interpreter.accountant = accountant
+        interpreter.expr_cache = self._expr_cache(expr_cache)
+        _load_variables(interpreter, variables)
+        result = None
+        for stmt in self.statements:
+            val = interpreter.visit(stmt)
+            # Keep last evaluated non-None result
+            if val is not None:
+                result = val
+        return RunResult(result, interpreter.global_vars, interpreter.expr_cache,
+                         interpreter.counters(), interpreter.functions)
+
+    async def run_async(self, variables=None, inputs=None, output=None, yield_every=100,
+                        accountant=None, expr_cache=None, snapshot=None):
+        """
+        Coroutine version of run() that yields to the event loop every
+        yield_every steps. inputs may also be an async callable and output
+        may have an async write() method (see AsyncInterpreter).
+        """
+        interpreter = AsyncInterpreter(input_func=_input_func(inputs), output=output,
+                                       yield_every=yield_every, accountant=accountant)
+        if snapshot is not None:
+            interpreter.global_vars = snapshot.new_environment()
+            interpreter.functions = dict(snapshot.functions)
+        interpreter.expr_cache = self._expr_cache(expr_cache)
+        _load_variables(interpreter, variables)
+        result = await interpreter.interpret(self.statements)
+        return RunResult(result, interpreter.global_vars, interpreter.expr_cache,
+                         interpreter.counters(), interpreter.functions)
+
+    def _expr_cache(self, expr_cache):
+        # The cache a run uses: the caller's, or a fresh one if anything is cached
+        if expr_cache is None and self.report.get('expr_cache') and self.report['expr_cache'].cached:
+            return ExprCache()
+        return expr_cache
+
+
+def _load_variables(interpreter, variables):
+    # Copy host variables into the globals. Host arrays are deep copied (keeping
+    # aliases between them) so append() in the script never changes the caller's data.
+    # Globals inherited from a snapshot are counted by the accountant too, so
+    # overwriting or releasing one later credits only what was counted.
+    accountant = interpreter.accountant
+    global_vars = interpreter.global_vars
+    if accountant is not None:
+        for value in global_vars.values():
+            accountant.replace(None, value, had_old=False)
+    if variables:
+        copies = {}
+        for name, value in variables.items():
+            value = copy_value(value, copies)
+            if accountant is not None:
+                accountant.replace(global_vars.get(name), value, had_old=name in global_vars)
+            global_vars[name] = value
+    if interpreter.expr_cache is not None:
+        # A reused cache may hold entries computed from another run's values
+        for name in global_vars:
+            interpreter.expr_cache.bump(name)
+
+
+def _input_func(inputs):
+    # Normalise the supported input sources to an input function (or None)
+    if inputs is None or callable(inputs):
+        return inputs
+    if isinstance(inputs, str):
+        return line_reader(inputs)
+    return line_reader("\n".join(inputs))
+
+
+def run_in_threads(program, jobs, workers=None):
+    """
+    Run program once per job on a pool of worker threads.
+    jobs: Iterable of dicts of Program.run() keyword arguments (variables,
+          inputs, output, snapshot, accountant, engine); use a separate output
+          object per job to keep their prints apart
+    workers: Number of threads; None uses ThreadPoolExecutor's default
+    Returns the RunResults in job order. If a run raises, the first such
+    error (in job order) is re-raised once the pool has shut down.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(program.run, **job) for job in jobs]
+    return [future.result() for future in futures]
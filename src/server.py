@@ -0,0 +1,376 @@
+# server.py
+# Long-running local server with a pool of warm interpreter processes.
+# Starting Python and importing the interpreter for every script costs more
+# than running most scripts, so the server keeps worker processes running
+# with everything imported and compiled programs cached.
+#
+# Protocol: newline-delimited JSON over a Unix domain socket or localhost TCP.
+# Each request line is an object; each gets exactly one response line, in
+# order, on the same connection.
+#   {"op": "run", "source": "...", "inputs": "a\nb", "variables": {"n": 3},
+#    "optimize": 1, "engine": "stack", "timeout": 2.5, "id": 7}
+#       Run a script ("op" defaults to "run"). Instead of "source", a
+#       "program" id returned by an earlier request runs that cached program.
+#   {"op": "compile", "source": "...", "optimize": 1}
+#       Cache a program without running it and return its id.
+#   {"op": "stats"}   Server counters.
+#   {"op": "ping"}
+# Run responses:
+#   {"id": 7, "ok": true, "program": "<id>", "output": "...", "result": 42,
+#    "stats": {"cached": true, "compile_ms": 0.0, "run_ms": 1.2,
+#              "queue_ms": 0.1, "total_ms": 1.4, "worker": 12345}}
+# and on failure "ok": false with "error", "error_type" and the output
+# printed before the error.
+#
+# Usage (from the project root):
+#   python -m src.server --unix /tmp/interp.sock --workers 4
+#   python -m src.server --port 8765 --timeout 5
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import socket
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from src.program import Program
+from src.arrays import ArrayValue, pack, to_json_value
+from src.batch import ScriptTimeout, time_limit
+
+DEFAULT_CACHE_SIZE = 256
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+WARMUP_SOURCE = """
+func f(n) { return n * 2; }
+a = [1, 2, 3];
+append(a, f(len(a)));
+i = 0;
+while (i < 3) { i = i + 1; }
+print a[3] + i;
+"""
+
+
+def program_id(source, optimize=0):
+    """
+    Cache key of a program: a digest of its source and optimisation level.
+    """
+    digest = hashlib.sha256(f"{optimize}:{source}".encode()).hexdigest()
+    return digest[:24]
+
+def from_json_value(value):
+    # A JSON request variable as a script value: lists become arrays
+    if isinstance(value, list):
+        return ArrayValue(pack([from_json_value(item) for item in value]))
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise Exception(f"Unsupported variable value: {value!r}")
+
+
+# === Worker processes ===
+# State below is per worker process: each keeps its own LRU of compiled
+# programs, so a program id compiles at most once per worker.
+
+_programs = OrderedDict()
+_cache_size = DEFAULT_CACHE_SIZE
+
+def _init_worker(cache_size):
+    # Runs once when a worker starts: import and exercise every stage, so
+    # the first real request does not pay for it
+    global _cache_size
+    _cache_size = cache_size
+    for engine in ('recursive', 'stack'):
+        Program(WARMUP_SOURCE, optimize=1).run(output=io.StringIO(), engine=engine)
+
+def _worker_pid():
+    return os.getpid()
+
+def _compiled(key, source, optimize):
+    # Cached Program for key, compiling source on a miss
+    program = _programs.get(key)
+    if program is not None:
+        _programs.move_to_end(key)
+        return program, True
+    program = Program(source, optimize=optimize)
+    _programs[key] = program
+    if len(_programs) > _cache_size:
+        _programs.popitem(last=False)
+    return program, False
+
+def _worker_run(key, source, optimize, inputs, variables, engine, timeout):
+    # Compile (or reuse) and run one program; never raises for script errors
+    output = io.StringIO()
+    response = {'ok': True, 'program': key}
+    stats = {'cached': False, 'compile_ms': 0.0, 'run_ms': 0.0, 'worker': os.getpid()}
+    start = time.perf_counter()
+    try:
+        with time_limit(timeout):
+            program, stats['cached'] = _compiled(key, source, optimize)
+            compiled = time.perf_counter()
+            stats['compile_ms'] = (compiled - start) * 1000
+            run = program.run(variables=variables, inputs=inputs or '', output=output, engine=engine)
+            stats['run_ms'] = (time.perf_counter() - compiled) * 1000
+        response['result'] = to_json_value(run.result)
+    except ScriptTimeout:
+        response.update(ok=False, error=f"Script exceeded timeout of {timeout}s", error_type='ScriptTimeout')
+    except Exception as e:
+        response.update(ok=False, error=str(e), error_type=type(e).__name__)
+    response['output'] = output.getvalue()
+    response['stats'] = stats
+    return response
+
+def _worker_compile(key, source, optimize):
+    program, cached = _compiled(key, source, optimize)
+    return {'ok': True, 'program': key, 'statements': len(program.statements),
+            'stats': {'cached': cached, 'worker': os.getpid()}}
+
+
+# === Server ===
+
+class InterpreterServer:
+    """
+    Serves run requests (see the protocol above) on a pool of warm worker
+    processes.
+    Arguments:
+        workers: Number of worker processes (default: CPU count)
+        cache_size: Compiled programs cached per worker, and program ids
+                    (with their source) remembered by the server
+        timeout: Default and maximum per-request timeout in seconds, or None
+    """
+    def __init__(self, workers=None, cache_size=DEFAULT_CACHE_SIZE, timeout=None):
+        self.workers = workers or os.cpu_count()
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.sources = OrderedDict()   # program id -> (source, optimize)
+        self.pool = None
+        self.server = None
+        self.path = None               # Unix socket path, if any
+        self.worker_pids = set()
+        self.requests = 0
+        self.errors = 0
+
+    async def start(self, path=None, host='127.0.0.1', port=0):
+        """
+        Start the workers, wait until each is warm, then listen on the Unix
+        socket path if given, else on host:port. Returns the address.
+        """
+        loop = asyncio.get_running_loop()
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                        initargs=(self.cache_size,))
+        # Submitting one job per worker before any finishes starts them all
+        pids = await asyncio.gather(*(loop.run_in_executor(self.pool, _worker_pid)
+                                      for _ in range(self.workers)))
+        self.worker_pids = set(pids)
+        if path is not None:
+            if os.path.exists(path):
+                os.unlink(path)
+            self.server = await asyncio.start_unix_server(self.handle, path=path, limit=MAX_REQUEST_BYTES)
+            self.path = path
+            return path
+        self.server = await asyncio.start_server(self.handle, host, port, limit=MAX_REQUEST_BYTES)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.path is not None and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def handle(self, reader, writer):
+        # One connection: answer request lines in order until EOF
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    response = self.error(None, f"Request larger than {MAX_REQUEST_BYTES} bytes")
+                    writer.write(json.dumps(response).encode() + b"\n")
+                    break
+                if not line:
+                    break
+                response = await self.respond(line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def error(self, request_id, message, error_type='RequestError'):
+        self.errors += 1
+        response = {'ok': False, 'error': message, 'error_type': error_type}
+        if request_id is not None:
+            response['id'] = request_id
+        return response
+
+    def remember(self, key, source, optimize):
+        self.sources[key] = (source, optimize)
+        self.sources.move_to_end(key)
+        if len(self.sources) > self.cache_size:
+            self.sources.popitem(last=False)
+
+    async def respond(self, line):
+        """
+        Response object for one raw request line.
+        """
+        start = time.perf_counter()
+        self.requests += 1
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return self.error(None, f"Invalid JSON: {e}")
+        if not isinstance(request, dict):
+            return self.error(None, "Request must be a JSON object")
+        request_id = request.get('id')
+        op = request.get('op', 'run')
+        if op == 'ping':
+            response = {'ok': True}
+        elif op == 'stats':
+            response = {'ok': True, 'stats': self.stats()}
+        elif op in ('run', 'compile'):
+            try:
+                response = await self.run_request(op, request)
+            except Exception as e:
+                return self.error(request_id, str(e), type(e).__name__)
+        else:
+            return self.error(request_id, f"Unknown op '{op}'")
+        if request_id is not None:
+            response['id'] = request_id
+        if not response['ok']:
+            self.errors += 1
+        stats = response.setdefault('stats', {})
+        stats['total_ms'] = (time.perf_counter() - start) * 1000
+        if 'run_ms' in stats:
+            stats['queue_ms'] = max(stats['total_ms'] - stats['compile_ms'] - stats['run_ms'], 0.0)
+        return response
+
+    async def run_request(self, op, request):
+        # Resolve the program, then hand the work to a worker
+        source = request.get('source')
+        optimize = request.get('optimize', 0)
+        if source is not None:
+            key = program_id(source, optimize)
+            self.remember(key, source, optimize)
+        elif request.get('program') is not None:
+            key = request['program']
+            entry = self.sources.get(key)
+            if entry is None:
+                raise Exception(f"Unknown program id '{key}'; send its source again")
+            self.sources.move_to_end(key)
+            source, optimize = entry
+        else:
+            raise Exception("Request needs 'source' or 'program'")
+
+        loop = asyncio.get_running_loop()
+        if op == 'compile':
+            return await loop.run_in_executor(self.pool, _worker_compile, key, source, optimize)
+        variables = {name: from_json_value(value)
+                     for name, value in (request.get('variables') or {}).items()}
+        inputs = request.get('inputs')
+        if isinstance(inputs, list):
+            inputs = "\n".join(inputs)
+        timeout = request.get('timeout')
+        if timeout is None or (self.timeout is not None and timeout > self.timeout):
+            timeout = self.timeout
+        return await loop.run_in_executor(self.pool, _worker_run, key, source, optimize, inputs,
+                                          variables, request.get('engine', 'recursive'), timeout)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'workers': len(self.worker_pids),
+            'programs': len(self.sources),
+        }
+
+
+# === Client ===
+
+class Client:
+    """
+    Blocking client for InterpreterServer: one connection, one request at a
+    time. Connect with path (Unix socket) or port (localhost TCP).
+    """
+    def __init__(self, path=None, host='127.0.0.1', port=None, timeout=None):
+        if path is not None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.file = self.sock.makefile('rwb')
+
+    def request(self, **fields):
+        """
+        Send one request object and return the response object.
+        """
+        self.file.write(json.dumps(fields).encode() + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise Exception("Server closed the connection")
+        return json.loads(line)
+
+    def run(self, source=None, program=None, **fields):
+        # Run by source or by cached program id; see the protocol for fields
+        if source is not None:
+            fields['source'] = source
+        if program is not None:
+            fields['program'] = program
+        return self.request(op='run', **fields)
+
+    def compile(self, source, optimize=0):
+        return self.request(op='compile', source=source, optimize=optimize)
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Serve script runs from warm worker processes.")
+    where = arg_parser.add_mutually_exclusive_group(required=True)
+    where.add_argument('--unix', metavar='PATH', help="listen on this Unix domain socket")
+    where.add_argument('--port', type=int, help="listen on this TCP port (0 picks a free one)")
+    arg_parser.add_argument('--host', default='127.0.0.1', help="TCP host (default 127.0.0.1)")
+    arg_parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                            help="number of worker processes (default: CPU count)")
+    arg_parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                            help=f"compiled programs cached per worker (default {DEFAULT_CACHE_SIZE})")
+    arg_parser.add_argument('-t', '--timeout', type=float, help="maximum seconds per request")
+    args = arg_parser.parse_args(argv)
+
+    async def serve():
+        server = InterpreterServer(args.workers, args.cache_size, args.timeout)
+        address = await server.start(args.unix, args.host, args.port or 0)
+        print(f"Listening on {address} with {len(server.worker_pids)} workers", flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
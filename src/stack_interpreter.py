@@ -0,0 +1,425 @@
+# stack_interpreter.py
+# Explicit-stack execution mode.
+# The recursive visitor calls visit() once per tree level, so a left-nested
+# chain like `1 + 1 + ... + 1` with 100k terms raises RecursionError. This
+# mode first flattens each statement into a list of instructions in postorder
+# (operands before their operator), with jumps for if/else and while, and
+# then runs that list in one loop over a value stack. Both steps use
+# explicit stacks, so the Python stack depth stays the same however deep the
+# tree or long the statement chain. Compiled code is cached per node, so
+# loop bodies and function bodies are flattened once per interpreter.
+# Blocks a profile marked cold (src/profile_guided.py) are left as a single
+# LAZY instruction and only flattened if they are ever reached.
+# The optimisation passes of Program (optimize >= 1) still walk the tree
+# recursively; run very deep expressions with optimize=0.
+
+from src.my_parser import (
+    Num, Bool, String, BinOp, UnaryOp,
+    VarAssign, VarAccess, PrintStmt,
+    IfStmt, WhileStmt, ForStmt, InputExpr,
+    FuncDef, Call, Return, LocalAccess, LocalAssign,
+    ArrayLiteral, Index, Append,
+    CSEStore, CSELoad, CachedExpr, Release, DeadStore
+)
+from src.expr_cache import MISS
+from src.interpreter import Interpreter
+from src.arrays import ArrayValue, pack, index_value, copy_value
+from src.functions import UNSET
+
+# Instruction opcodes. Each instruction is an (opcode, argument) pair; all
+# but LAZY, CACHE_STORE, POP and JUMP stand for one evaluated AST node.
+CONST = 0           # push argument
+GLOBAL = 1          # push global variable (argument: name)
+LOCAL = 2           # push frame slot (argument: LocalAccess node)
+BINOP_FAST = 3      # pop 2, push (argument: BinOp node with a fast path)
+BINOP = 4           # pop 2, push (argument: BinOp node)
+UNARY = 5           # pop 1, push (argument: UnaryOp node)
+STORE = 6           # pop, assign global (argument: name)
+STORE_KEEP = 7      # assign global, leave the value on the stack
+STORE_LOCAL = 8     # assign frame slot, leave the value (argument: slot)
+JUMP_IF_FALSE = 9   # pop, jump to argument if falsy
+WHILE_TEST = 10     # pop, jump to argument if falsy, else count an iteration
+PRINT = 11          # pop and print
+CALL = 12           # pop argument count values, push the call's result
+                    # (argument: Call node)
+ARRAY = 13          # pop n values, push an array of them (argument: n)
+INDEX = 14          # pop index and target, push the element
+APPEND = 15         # pop, append to the node's array (argument: Append node)
+INPUT = 16          # push the next input line
+CSE_STORE = 17      # cache the top value (argument: slot)
+CSE_LOAD = 18       # push a cached value (argument: CSELoad node)
+DEFINE = 19         # define a function (argument: FuncDef node)
+LAZY = 20           # run a cold block, flattening it on first use
+                    # (argument: statement list)
+CACHE_LOAD = 21     # push a valid cached value and jump past the expression
+                    # (argument: (CachedExpr node, jump target))
+CACHE_STORE = 22    # cache the top value (argument: CachedExpr node)
+FOR_START = 23      # pop stop and start, assign the variable, push the loop
+                    # state (argument: ForStmt node)
+FOR_NEXT = 24       # assign the next value, count an iteration and jump back
+                    # to the body, or pop the loop state
+                    # (argument: (ForStmt node, body start))
+POP = 25            # discard the top value
+JUMP = 26           # jump to argument
+RELEASE = 27        # delete dead globals (argument: Release node)
+DEAD_STORE = 28     # assignment run only under an accountant (argument: DeadStore node)
+
+
+CONSTANTS = (Num, Bool, String)
+EXPRESSIONS = frozenset((
+    Num, Bool, String, BinOp, UnaryOp, VarAccess, LocalAccess,
+    Call, ArrayLiteral, Index, InputExpr, CSEStore, CSELoad, CachedExpr,
+))
+
+
+class _Label:
+    # Jump target; position is filled in when the label is placed
+    __slots__ = ('position',)
+    def __init__(self):
+        self.position = None
+
+
+def compile_node(node, keep=True):
+    """
+    Flatten node into a list of instructions.
+    With keep=True the code leaves the node's value (None for statements
+    without one) on the stack, as visit() would return it; with keep=False
+    it leaves nothing.
+    """
+    return _compile([('node', node, keep)])
+
+def compile_block(statements):
+    """
+    Flatten a statement list; the code leaves nothing on the stack.
+    """
+    return _compile([('node', stmt, False) for stmt in reversed(statements)])
+
+def _block(work, statements, cold):
+    # Queue a block's statements, or one LAZY instruction if it is cold
+    if cold:
+        work.append(('emit', LAZY, statements))
+    else:
+        work.extend(('node', stmt, False) for stmt in reversed(statements))
+
+def _compile(work):
+    code = []
+    emit = code.append
+    # Entries are ('node', node, keep), ('emit', opcode, argument) or
+    # ('label', label); popped from the end, so pushed in reverse order
+    push = work.append
+    while work:
+        entry = work.pop()
+        kind = entry[0]
+        if kind == 'emit':
+            emit((entry[1], entry[2]))
+            continue
+        if kind == 'label':
+            entry[1].position = len(code)
+            continue
+        node, keep = entry[1], entry[2]
+        cls = type(node)
+
+        # Expressions: each leaves one value. Leaves are emitted at once;
+        # operators are pushed before their operands, so they come after them.
+        if cls in EXPRESSIONS:
+            if not keep:
+                push(('emit', POP, None))
+            if cls is BinOp:
+                push(('emit', BINOP if node.fast is None else BINOP_FAST, node))
+                push(('node', node.right, True))
+                push(('node', node.left, True))
+            elif cls in CONSTANTS:
+                emit((CONST, node.value))
+            elif cls is VarAccess:
+                emit((GLOBAL, node.name))
+            elif cls is LocalAccess:
+                emit((LOCAL, node))
+            elif cls is UnaryOp:
+                push(('emit', UNARY, node))
+                push(('node', node.expr, True))
+            elif cls is Call:
+                push(('emit', CALL, node))
+                work.extend(('node', arg, True) for arg in reversed(node.args))
+            elif cls is ArrayLiteral:
+                push(('emit', ARRAY, len(node.elements)))
+                work.extend(('node', element, True) for element in reversed(node.elements))
+            elif cls is Index:
+                push(('emit', INDEX, None))
+                push(('node', node.index, True))
+                push(('node', node.target, True))
+            elif cls is InputExpr:
+                emit((INPUT, None))
+            elif cls is CSEStore:
+                push(('emit', CSE_STORE, node.slot))
+                push(('node', node.expr, True))
+            elif cls is CachedExpr:
+                end = _Label()
+                push(('label', end))
+                push(('emit', CACHE_STORE, node))
+                push(('node', node.expr, True))
+                push(('emit', CACHE_LOAD, (node, end)))
+            else:
+                emit((CSE_LOAD, node))
+            continue
+
+        # Statements
+        if cls is VarAssign:
+            push(('emit', STORE_KEEP if keep else STORE, node.name))
+            push(('node', node.value, True))
+        elif cls is LocalAssign:
+            if not keep:
+                push(('emit', POP, None))
+            push(('emit', STORE_LOCAL, node.slot))
+            push(('node', node.value, True))
+        elif cls is IfStmt:
+            end = _Label()
+            if keep:
+                push(('emit', CONST, None))
+            push(('label', end))
+            if node.false_block is not None:
+                otherwise = _Label()
+                _block(work, node.false_block, node.cold == 'false')
+                push(('label', otherwise))
+                push(('emit', JUMP, end))
+            else:
+                otherwise = end
+            _block(work, node.true_block, node.cold == 'true')
+            push(('emit', JUMP_IF_FALSE, otherwise))
+            push(('node', node.condition, True))
+        elif cls is WhileStmt:
+            top, end = _Label(), _Label()
+            if keep:
+                push(('emit', CONST, None))
+            push(('label', end))
+            push(('emit', JUMP, top))
+            _block(work, node.body, node.cold)
+            push(('emit', WHILE_TEST, end))
+            push(('node', node.condition, True))
+            push(('label', top))
+        elif cls is ForStmt:
+            # The test sits below the body, so an iteration is one jump
+            body, test = _Label(), _Label()
+            if keep:
+                push(('emit', CONST, None))
+            push(('emit', FOR_NEXT, (node, body)))
+            push(('label', test))
+            _block(work, node.body, node.cold)
+            push(('label', body))
+            push(('emit', JUMP, test))
+            push(('emit', FOR_START, node))
+            push(('node', node.stop, True))
+            push(('node', node.start, True))
+        elif cls in (PrintStmt, Append, FuncDef, Release, DeadStore):
+            # Statements without a value
+            if keep:
+                push(('emit', CONST, None))
+            if cls is PrintStmt:
+                push(('emit', PRINT, None))
+                push(('node', node.expr, True))
+            elif cls is Append:
+                push(('emit', APPEND, node))
+                push(('node', node.value, True))
+            elif cls is Release:
+                push(('emit', RELEASE, node))
+            elif cls is DeadStore:
+                push(('emit', DEAD_STORE, node))
+            else:
+                push(('emit', DEFINE, node))
+        elif cls is Return:
+            # Returns only run inside functions, on the call driver
+            raise Exception("'return' outside function")
+        else:
+            raise Exception(f"No visit method for node type: {cls.__name__}")
+    # Resolve jump targets to instruction indexes
+    for index, (opcode, argument) in enumerate(code):
+        if opcode in (JUMP, JUMP_IF_FALSE, WHILE_TEST):
+            code[index] = (opcode, argument.position)
+        elif opcode in (CACHE_LOAD, FOR_NEXT):
+            code[index] = (opcode, (argument[0], argument[1].position))
+    return code
+
+
+class StackInterpreter(Interpreter):
+    """
+    Interpreter that runs every node as flattened code on an explicit value
+    stack (see compile_node()), so evaluation depth is not limited by
+    Python's recursion limit. Results, output, errors and counters match the
+    recursive Interpreter, except that `nodes` counts executed instructions,
+    which is close to (not exactly) the number of nodes visited.
+    Function calls still run on the iterative call driver of src/functions.py.
+    """
+    def __init__(self, input_func=None, output=None, accountant=None):
+        super().__init__(input_func=input_func, output=output, accountant=accountant)
+        self._code = {}           # id(node) -> (node, code) cache for compile_node()
+
+    def visit(self, node):
+        cached = self._code.get(id(node))
+        if cached is None:
+            # Keep a reference to node so its id cannot be reused while cached
+            cached = self._code[id(node)] = (node, compile_node(node))
+        return self.execute(cached[1])
+
+    def run_block(self, statements):
+        # Run a statement list, flattening it the first time
+        cached = self._code.get(id(statements))
+        if cached is None:
+            cached = self._code[id(statements)] = (statements, compile_block(statements))
+        self.execute(cached[1])
+
+    def execute(self, code):
+        """
+        Run flattened code and return the value it leaves, if any.
+        """
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        global_vars = self.global_vars
+        frame = self.frame
+        accountant = self.accountant
+        expr_cache = self.expr_cache
+        plain_stores = accountant is None and expr_cache is None
+        steps = reads = writes = iterations = 0
+        pc = 0
+        end = len(code)
+        try:
+            while pc < end:
+                opcode, argument = code[pc]
+                pc += 1
+                steps += 1
+                if opcode == CONST:
+                    push(argument)
+                elif opcode == GLOBAL:
+                    reads += 1
+                    try:
+                        push(global_vars[argument])
+                    except KeyError:
+                        raise Exception(f"Variable '{argument}' is not defined") from None
+                elif opcode == BINOP_FAST:
+                    right = pop()
+                    if accountant is None:
+                        stack[-1] = argument.fast(stack[-1], right)
+                    else:
+                        stack[-1] = self.apply_binop(argument.op, stack[-1], right)
+                elif opcode == BINOP:
+                    right = pop()
+                    stack[-1] = self.apply_binop(argument.op, stack[-1], right)
+                elif opcode == LOCAL:
+                    reads += 1
+                    value = frame[argument.slot]
+                    if value is UNSET:
+                        raise Exception(f"Variable '{argument.name}' is not defined")
+                    push(value)
+                elif opcode == STORE or opcode == STORE_KEEP:
+                    value = pop() if opcode == STORE else stack[-1]
+                    if plain_stores:
+                        global_vars[argument] = value
+                        writes += 1
+                    else:
+                        self.store_global(argument, value)
+                elif opcode == WHILE_TEST:
+                    if pop():
+                        iterations += 1
+                    else:
+                        pc = argument
+                elif opcode == FOR_NEXT:
+                    node, target = argument
+                    value = next(stack[-1][0], None)
+                    if value is None:
+                        final = pop()[1]
+                        if final is not None:
+                            self.store_loop_var(node, final)
+                    else:
+                        pc = target
+                        iterations += 1
+                        if node.slot is not None:
+                            frame[node.slot] = value
+                            writes += 1
+                        elif plain_stores:
+                            global_vars[node.name] = value
+                            writes += 1
+                        else:
+                            self.store_global(node.name, value)
+                elif opcode == JUMP_IF_FALSE:
+                    if not pop():
+                        pc = argument
+                elif opcode == JUMP:
+                    steps -= 1
+                    pc = argument
+                elif opcode == POP:
+                    steps -= 1
+                    pop()
+                elif opcode == STORE_LOCAL:
+                    frame[argument] = stack[-1]
+                    writes += 1
+                elif opcode == UNARY:
+                    fast = argument.fast
+                    if fast is not None:
+                        stack[-1] = fast(stack[-1])
+                    else:
+                        stack[-1] = self.apply_unaryop(argument.op, stack[-1])
+                elif opcode == PRINT:
+                    print(pop(), file=self.output)
+                    self.print_count += 1
+                elif opcode == CALL:
+                    count = len(argument.args)
+                    if count:
+                        args = stack[-count:]
+                        del stack[-count:]
+                    else:
+                        args = []
+                    push(self.call_function(argument.name, args))
+                elif opcode == ARRAY:
+                    if argument:
+                        elements = stack[-argument:]
+                        del stack[-argument:]
+                    else:
+                        elements = []
+                    push(ArrayValue(pack(elements)))
+                elif opcode == INDEX:
+                    index = pop()
+                    stack[-1] = index_value(stack[-1], index)
+                elif opcode == APPEND:
+                    self.append_value(argument, pop())
+                elif opcode == INPUT:
+                    push(self.input_func() if self.input_func is not None else input())
+                elif opcode == CSE_STORE:
+                    self.cse_values[argument] = stack[-1]
+                elif opcode == CSE_LOAD:
+                    self.evaluations_avoided += argument.size
+                    push(copy_value(self.cse_values[argument.slot]))
+                elif opcode == DEFINE:
+                    self.visit_FuncDef(argument)
+                elif opcode == CACHE_LOAD:
+                    if expr_cache is not None:
+                        node, target = argument
+                        value = expr_cache.lookup(node)
+                        if value is not MISS:
+                            self.evaluations_avoided += node.size
+                            push(value)
+                            pc = target
+                elif opcode == CACHE_STORE:
+                    steps -= 1
+                    if expr_cache is not None:
+                        expr_cache.store(argument, stack[-1], self.global_vars)
+                elif opcode == FOR_START:
+                    stop = pop()
+                    start = pop()
+                    values = self.loop_range(start, stop)
+                    self.store_loop_var(argument, start)
+                    # Loop state: the counter and the variable's final value
+                    push((iter(values), stop if values else None))
+                elif opcode == RELEASE:
+                    self.visit_Release(argument)
+                elif opcode == DEAD_STORE:
+                    self.visit_DeadStore(argument)
+                elif opcode == LAZY:
+                    steps -= 1
+                    self.run_block(argument)
+                else:
+                    raise Exception(f"Unknown instruction {opcode}")
+        finally:
+            self.node_count += steps
+            self.var_reads += reads
+            self.var_writes += writes
+            self.loop_iterations += iterations
+        return stack[-1] if stack else None
@@ -0,0 +1,120 @@
+# stats.py
+# Run telemetry: per-phase timings and runtime counters for a single program run.
+# Lexing, parsing and execution are timed separately so the split can be fed
+# into external monitoring (see RunStats.to_json()).
+
+import json
+import time
+import tracemalloc
+
+from src.lexer import Lexer, TokenStream
+from src.my_parser import Parser
+from src.interpreter import Interpreter
+
+
+class RunStats:
+    """
+    Timings and counters collected for one run.
+    Attributes:
+        lex_time, parse_time, exec_time: Phase durations in seconds
+        tokens: Number of tokens produced by the lexer (including EOF)
+        statements: Number of top-level statements parsed
+        counters: Interpreter counters (nodes, loop_iterations, var_reads,
+                  var_writes, prints) accumulated during this run only
+        peak_memory: Peak traced memory in bytes, or None when not traced
+    """
+    def __init__(self):
+        self.lex_time = 0.0
+        self.parse_time = 0.0
+        self.exec_time = 0.0
+        self.tokens = 0
+        self.statements = 0
+        self.counters = {}
+        self.peak_memory = None
+
+    @property
+    def total_time(self):
+        # Sum of the three phase durations
+        return self.lex_time + self.parse_time + self.exec_time
+
+    def to_dict(self):
+        """
+        Return the stats as a JSON-serialisable dict.
+        """
+        return {
+            'phases': {
+                'lex': self.lex_time,
+                'parse': self.parse_time,
+                'exec': self.exec_time,
+                'total': self.total_time,
+            },
+            'tokens': self.tokens,
+            'statements': self.statements,
+            'counters': dict(self.counters),
+            'peak_memory': self.peak_memory,
+        }
+
+    def to_json(self, **kwargs):
+        """
+        Serialise the stats to a JSON string; keyword arguments are passed to json.dumps.
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def __repr__(self):
+        return (f"RunStats(lex={self.lex_time:.6f}s, parse={self.parse_time:.6f}s, "
+                f"exec={self.exec_time:.6f}s, counters={self.counters})")
+
+
+def run_with_stats(source, interpreter=None, trace_memory=False):
+    """
+    Lex, parse and execute source, timing each phase separately.
+    Returns a (result, stats) tuple where result is the value of the last
+    statement that produced one, like the test helpers' run_source().
+    If trace_memory is true, peak memory across all phases is recorded
+    with tracemalloc (this slows the run down noticeably).
+    """
+    if interpreter is None:
+        interpreter = Interpreter()
+    stats = RunStats()
+
+    started_tracing = False
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        tracemalloc.reset_peak()
+
+    try:
+        # Lex everything up front so lexing is timed on its own
+        start = time.perf_counter()
+        lexer = Lexer(source)
+        tokens = lexer.tokenize()
+        stats.lex_time = time.perf_counter() - start
+        stats.tokens = len(tokens)
+
+        start = time.perf_counter()
+        statements = Parser(TokenStream(tokens, lexer.lines)).parse()
+        stats.parse_time = time.perf_counter() - start
+        stats.statements = len(statements)
+        del tokens
+
+        before = interpreter.counters()
+        start = time.perf_counter()
+        result = None
+        try:
+            for stmt in statements:
+                val = interpreter.visit(stmt)
+                # Keep last evaluated non-None result
+                if val is not None:
+                    result = val
+        finally:
+            stats.exec_time = time.perf_counter() - start
+            after = interpreter.counters()
+            stats.counters = {key: after[key] - before[key] for key in after}
+    finally:
+        if trace_memory:
+            stats.peak_memory = tracemalloc.get_traced_memory()[1]
+            if started_tracing:
+                tracemalloc.stop()
+
+    return result, stats
@@ -0,0 +1,71 @@
+# streaming.py
+# Pipelined parse-and-execute for large programs.
+# Each top-level statement is executed as soon as the parser produces it and
+# is released before the next one is parsed, so the first output does not
+# wait for the whole parse and the AST for the whole program is never held
+# in memory at once (the source text itself still is).
+# A run can start part way through the source: iter_steps() reports the
+# position after every statement, and a checkpoint (src/checkpoint.py)
+# saved with that position lets a restarted worker resume from there.
+
+from src.lexer import Lexer
+from src.my_parser import Parser
+from src.my_token import TT_EOF
+from src.interpreter import Interpreter
+from src.positions import LineIndex
+from src.checkpoint import save_checkpoint
+
+
+def iter_steps(source, interpreter, start=0):
+    """
+    Parse and execute source one top-level statement at a time, beginning
+    at character offset start (0, or a position yielded earlier).
+    Yields (value, position) per statement: the statement's value (None for
+    statements without one) and the offset where the next statement
+    starts, len(source) after the last one.
+    A syntax error is only raised once execution reaches it.
+    """
+    text = source[start:] if start else source
+    parser = Parser(Lexer(text, offset=start, lines=LineIndex(source)))
+    for stmt in parser.iter_statements():
+        value = interpreter.visit(stmt)
+        token = parser.current_token
+        yield value, len(source) if token.type == TT_EOF else token.pos
+
+
+def iter_results(source, interpreter):
+    """
+    Parse and execute source one top-level statement at a time.
+    Yields the value of each statement (None for statements without one).
+    A syntax error is only raised once execution reaches it.
+    """
+    for value, _ in iter_steps(source, interpreter):
+        yield value
+
+
+def run_streaming(source, interpreter=None, start=0, checkpoint=None, checkpoint_every=1000):
+    """
+    Run source in pipelined mode and return the value of the last statement
+    that produced one, like Program.run() does.
+    start: Offset to begin at (see iter_steps())
+    checkpoint: Optional path; the interpreter's state and position are
+                saved there every checkpoint_every statements and at the
+                end (resume with load_checkpoint() and its position)
+    """
+    if interpreter is None:
+        interpreter = Interpreter()
+    result = None
+    position = start
+    count = 0
+    for val, position in iter_steps(source, interpreter, start):
+        # Keep last evaluated non-None result
+        if val is not None:
+            result = val
+        count += 1
+        if checkpoint is not None and count % checkpoint_every == 0:
+            save_checkpoint(checkpoint, interpreter.global_vars, interpreter.functions,
+                            source, position)
+    if checkpoint is not None:
+        save_checkpoint(checkpoint, interpreter.global_vars, interpreter.functions,
+                        source, position)
+    return result
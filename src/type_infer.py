@@ -0,0 +1,309 @@
+# type_infer.py
+# Flow-sensitive static type inference over VarAssign / IfStmt / WhileStmt /
+# ForStmt.
+# Each variable is tracked as the set of runtime types it may hold at each
+# program point. Every BinOp / UnaryOp site whose operand types are proven
+# gets an unchecked operator function in node.fast, which all engines call
+# instead of the isinstance checks in Interpreter.apply_binop. Sites whose
+# operands can only ever fail are reported as compile-time type errors.
+
+import operator
+
+from src.my_parser import (
+    Num, Bool, String, BinOp, UnaryOp,
+    VarAssign, VarAccess, PrintStmt,
+    IfStmt, WhileStmt, ForStmt, InputExpr,
+    ArrayLiteral, CSEStore, CSELoad
+)
+from src.my_token import (
+    TT_PLUS, TT_MINUS, TT_MUL, TT_DIV,
+    TT_EQ, TT_NE, TT_LT, TT_LTE,
+    TT_GT, TT_GTE, TT_AND, TT_OR, TT_NOT
+)
+
+ANY = frozenset(['int', 'float', 'bool', 'str', 'array'])
+ERROR = 'error'
+
+
+def _checked_div(left, right):
+    # Division keeps its runtime zero check even when types are proven
+    if right == 0:
+        raise Exception("Division by zero undefined")
+    return left / right
+
+def _and(left, right):
+    return bool(left) and bool(right)
+
+def _or(left, right):
+    return bool(left) or bool(right)
+
+# Unchecked implementations, valid once no operand type pair can fail
+FAST_BINOPS = {
+    TT_PLUS: operator.add,
+    TT_MINUS: operator.sub,
+    TT_MUL: operator.mul,
+    TT_DIV: _checked_div,
+}
+# Operators the interpreter never type-checks itself: always safe to tag
+UNCHECKED_BINOPS = {
+    TT_EQ: operator.eq,
+    TT_NE: operator.ne,
+    TT_LT: operator.lt,
+    TT_LTE: operator.le,
+    TT_GT: operator.gt,
+    TT_GTE: operator.ge,
+    TT_AND: _and,
+    TT_OR: _or,
+}
+FAST_UNARYOPS = {
+    TT_PLUS: operator.pos,
+    TT_MINUS: operator.neg,
+    TT_NOT: operator.not_,
+}
+
+
+def _number_result(left, right):
+    # Result type of arithmetic on two numeric operand types
+    if left == 'float' or right == 'float':
+        return 'float'
+    return 'int'
+
+def binop_result(op_type, left, right):
+    """
+    Result type name of op_type applied to one pair of operand type names,
+    or ERROR if the interpreter raises a TypeError for that pair.
+    """
+    if left == 'array' or right == 'array':
+        # Elementwise; element type errors can only show up at run time
+        return 'bool' if op_type in (TT_AND, TT_OR) else 'array'
+    if op_type in (TT_EQ, TT_NE, TT_AND, TT_OR):
+        return 'bool'
+    if op_type in (TT_LT, TT_LTE, TT_GT, TT_GTE):
+        if (left == 'str') != (right == 'str'):
+            return ERROR
+        return 'bool'
+    if op_type == TT_PLUS:
+        if left == 'str' and right == 'str':
+            return 'str'
+        if left == 'str' or right == 'str':
+            return ERROR
+        return _number_result(left, right)
+    if op_type == TT_MUL:
+        if left == 'str' or right == 'str':
+            # Repetition needs exactly one str and one int (bool counts as int)
+            other = right if left == 'str' else left
+            return 'str' if (left == 'str') != (right == 'str') and other in ('int', 'bool') else ERROR
+        return _number_result(left, right)
+    if op_type in (TT_MINUS, TT_DIV):
+        if left == 'str' or right == 'str':
+            return ERROR
+        return 'float' if op_type == TT_DIV else _number_result(left, right)
+    return ERROR
+
+def unaryop_result(op_type, operand):
+    # Result type name of a unary operator, or ERROR
+    if op_type == TT_NOT:
+        return 'bool'
+    if operand in ('str', 'array'):
+        return ERROR
+    return 'int' if operand == 'bool' else operand
+
+
+class TypeReport:
+    """
+    Result of infer_types().
+    Attributes:
+        sites: Number of operator nodes analysed (a shared node counts once)
+        proven: Number of those nodes tagged with an unchecked fast path
+        errors: Messages for operations that always raise a TypeError
+    """
+    def __init__(self):
+        self.sites = 0
+        self.proven = 0
+        self.errors = []
+
+    def __repr__(self):
+        return f"TypeReport(sites={self.sites}, proven={self.proven}, errors={self.errors!r})"
+
+
+class _Inference:
+    def __init__(self):
+        self.report = TypeReport()
+        # id(node) -> (node, fast function or None); shared nodes keep a
+        # fast path only if it is proven at every site they appear in
+        self.proposals = {}
+
+    def propose(self, node, fast):
+        entry = self.proposals.get(id(node))
+        if entry is not None and entry[1] is not fast:
+            fast = None
+        self.proposals[id(node)] = (node, fast)
+
+    # === Expressions ===
+
+    def expr(self, node, env, tag):
+        # Types of the values node may produce. Operands are analysed before
+        # their operator with an explicit stack (their types collect in
+        # `results`), so deep expressions do not hit the recursion limit
+        results = []
+        pending = [(node, tag, False)]
+        while pending:
+            node, tag, ready = pending.pop()
+            if ready:
+                if isinstance(node, BinOp):
+                    right = results.pop()
+                    results.append(self.binop(node, results.pop(), right, tag))
+                else:
+                    results.append(self.unaryop(node, results.pop(), tag))
+            elif isinstance(node, (BinOp, UnaryOp)):
+                pending.append((node, tag, True))
+                if isinstance(node, BinOp):
+                    pending.append((node.right, tag, False))
+                    pending.append((node.left, tag, False))
+                else:
+                    pending.append((node.expr, tag, False))
+            elif isinstance(node, CSEStore):
+                pending.append((node.expr, tag, False))
+            elif isinstance(node, CSELoad):
+                # The replaced expression is not executed here; only its type matters
+                pending.append((node.expr, False, False))
+            else:
+                results.append(self.leaf(node, env))
+        return results[0]
+
+    @staticmethod
+    def leaf(node, env):
+        # Types of a node without operands
+        if isinstance(node, Num):
+            return frozenset([type(node.value).__name__])
+        if isinstance(node, Bool):
+            return frozenset(['bool'])
+        if isinstance(node, (String, InputExpr)):
+            return frozenset(['str'])
+        if isinstance(node, VarAccess):
+            # Unknown variables may come from the host with any type
+            return env.get(node.name, ANY)
+        if isinstance(node, ArrayLiteral):
+            return frozenset(['array'])
+        return ANY
+
+    def binop(self, node, left, right, tag):
+        # Result types of a BinOp given its operand types
+        results = {binop_result(node.op.type, l, r) for l in left for r in right}
+        if tag:
+            self.tag_binop(node, left, right, results)
+        return frozenset(results - {ERROR}) or ANY
+
+    def unaryop(self, node, operand, tag):
+        # Result types of a UnaryOp given its operand types
+        results = {unaryop_result(node.op.type, t) for t in operand}
+        if tag:
+            if ERROR in results:
+                fast = None
+                if results == {ERROR}:
+                    self.report.errors.append(
+                        f"TypeError: bad operand type for unary {node.op.value}: "
+                        f"'{'/'.join(sorted(operand))}'")
+            else:
+                fast = FAST_UNARYOPS.get(node.op.type)
+            self.propose(node, fast)
+        return frozenset(results - {ERROR}) or ANY
+
+    def tag_binop(self, node, left, right, results):
+        op_type = node.op.type
+        if results == {ERROR}:
+            self.report.errors.append(
+                f"TypeError: unsupported operand types for {node.op.value}: "
+                f"'{'/'.join(sorted(left))}' and '{'/'.join(sorted(right))}'")
+        if ('array' in left or 'array' in right) and op_type not in (TT_AND, TT_OR):
+            # Arrays take the elementwise path in apply_binop
+            fast = None
+        elif op_type in UNCHECKED_BINOPS:
+            fast = UNCHECKED_BINOPS[op_type]
+        elif ERROR in results:
+            fast = None
+        else:
+            fast = FAST_BINOPS.get(op_type)
+        self.propose(node, fast)
+
+    # === Statements ===
+
+    @staticmethod
+    def join(first, second):
+        # Merge two environments at a control-flow join point
+        env = {}
+        for name in first.keys() | second.keys():
+            env[name] = first.get(name, ANY) | second.get(name, ANY)
+        return env
+
+    def block(self, statements, env, tag):
+        for stmt in statements:
+            env = self.stmt(stmt, env, tag)
+        return env
+
+    def stmt(self, node, env, tag):
+        if isinstance(node, VarAssign):
+            env = dict(env)
+            env[node.name] = self.expr(node.value, env, tag)
+            return env
+        if isinstance(node, PrintStmt):
+            self.expr(node.expr, env, tag)
+            return env
+        if isinstance(node, IfStmt):
+            self.expr(node.condition, env, tag)
+            true_env = self.block(node.true_block, env, tag)
+            false_env = self.block(node.false_block, env, tag) if node.false_block is not None else env
+            return self.join(true_env, false_env)
+        if isinstance(node, WhileStmt):
+            # Iterate to a fixpoint without tagging, then tag once with the
+            # stable loop-entry environment
+            entry = env
+            while True:
+                self.expr(node.condition, entry, False)
+                after_body = self.block(node.body, entry, False)
+                widened = self.join(entry, after_body)
+                if widened == entry:
+                    break
+                entry = widened
+            self.expr(node.condition, entry, tag)
+            self.block(node.body, entry, tag)
+            return entry
+        if isinstance(node, ForStmt):
+            for bound in (node.start, node.stop):
+                types = self.expr(bound, env, tag)
+                if tag and 'int' not in types:
+                    self.report.errors.append(
+                        f"TypeError: for loop bounds must be integers, got '{'/'.join(sorted(types))}'")
+            # The variable is an int at the top of every iteration, whatever
+            # the body assigns to it
+            entry = env
+            while True:
+                body_env = dict(entry)
+                body_env[node.name] = frozenset(['int'])
+                widened = self.join(entry, self.block(node.body, body_env, False))
+                if widened == entry:
+                    break
+                entry = widened
+            body_env = dict(entry)
+            body_env[node.name] = frozenset(['int'])
+            self.block(node.body, body_env, tag)
+            entry = dict(entry)
+            entry[node.name] = frozenset(['int'])
+            return entry
+        self.expr(node, env, tag)
+        return env
+
+
+def infer_types(statements):
+    """
+    Infer operand types for statements and tag proven operator sites in
+    place (node.fast). Returns a TypeReport.
+    """
+    inference = _Inference()
+    inference.block(statements, {}, True)
+    inference.report.sites = len(inference.proposals)
+    for node, fast in inference.proposals.values():
+        node.fast = fast
+        if fast is not None:
+            inference.report.proven += 1
+    return inference.report
@@ -0,0 +1,303 @@
+# vectorize.py
+# Evaluate one expression over whole columns of records.
+# evaluate_columns() takes an expression and a mapping from variable name to
+# a column of values (list or NumPy array) and returns the result column.
+# Work is done in chunks. Each chunk is first evaluated column-at-a-time:
+# operand types are checked once per column with the same rules as
+# src/type_infer.py, then each operator runs once over the whole column
+# (NumPy ufuncs for numeric columns when NumPy is installed, otherwise a
+# C-level map over the operator function). Whenever a chunk cannot be
+# evaluated that way with results identical to the interpreter (mixed or
+# unknown types, a possible type error, a zero divisor, values NumPy could
+# round or overflow), the chunk is evaluated row by row with an ordinary
+# Interpreter instead, which also raises exactly the error a per-row loop
+# would raise.
+
+import itertools
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from src.lexer import Lexer
+from src.my_parser import Parser, Num, Bool, String, VarAccess, BinOp, UnaryOp
+from src.interpreter import Interpreter
+from src.type_infer import (
+    ERROR, FAST_BINOPS, UNCHECKED_BINOPS, FAST_UNARYOPS,
+    binop_result, unaryop_result
+)
+from src.my_token import (
+    TT_PLUS, TT_MINUS, TT_MUL, TT_DIV,
+    TT_EQ, TT_NE, TT_LT, TT_LTE,
+    TT_GT, TT_GTE, TT_AND, TT_OR, TT_NOT
+)
+
+DEFAULT_CHUNK_SIZE = 65536
+
+SCALAR_TYPES = {int: 'int', float: 'float', bool: 'bool', str: 'str'}
+NUMERIC = ('int', 'float', 'bool')
+COMPARISONS = (TT_EQ, TT_NE, TT_LT, TT_LTE, TT_GT, TT_GTE)
+
+if numpy is not None:
+    NUMPY_DTYPES = {'int': numpy.int64, 'float': numpy.float64, 'bool': numpy.bool_}
+
+# Integers up to this size convert to float exactly
+EXACT_FLOAT_INT = 2 ** 53
+INT64_LIMIT = 2 ** 63
+
+
+def parse_expression(source):
+    """
+    Parse source as a single expression and return its AST node.
+    """
+    parser = Parser(Lexer(source))
+    node = parser.parse_or()
+    if parser.current_token.type != 'EOF':
+        parser.error('Expected end of expression')
+    return node
+
+
+class _Fallback(Exception):
+    # The chunk cannot be evaluated column-at-a-time with exact results
+    pass
+
+
+_NO_SCALAR = object()
+
+class _Column:
+    """
+    Values of one subexpression for every row of a chunk.
+    Attributes:
+        kinds: Frozenset of the type names the values may have
+        values: list or NumPy array, or None for a constant
+        scalar: The constant value when values is None
+    """
+    __slots__ = ('kinds', 'values', 'scalar')
+
+    def __init__(self, kinds, values=None, scalar=_NO_SCALAR):
+        self.kinds = kinds
+        self.values = values
+        self.scalar = scalar
+
+    @property
+    def is_scalar(self):
+        return self.values is None
+
+    @property
+    def is_numpy(self):
+        return numpy is not None and isinstance(self.values, numpy.ndarray)
+
+    @property
+    def kind(self):
+        # The single type name of the values, or None if they are mixed
+        return next(iter(self.kinds)) if len(self.kinds) == 1 else None
+
+    def items(self, length):
+        # The values as a Python sequence of length items
+        if self.is_scalar:
+            return itertools.repeat(self.scalar, length)
+        if self.is_numpy:
+            return self.values.tolist()
+        return self.values
+
+    def has_zero(self):
+        if self.is_scalar:
+            return self.scalar == 0
+        if self.is_numpy:
+            return bool((self.values == 0).any())
+        return 0 in self.values
+
+    def max_abs(self):
+        # Largest magnitude of a numeric column (bools count as 0 / 1)
+        if self.is_scalar:
+            return abs(self.scalar)
+        if len(self.values) == 0:
+            return 0
+        if self.is_numpy:
+            return max(abs(int(self.values.max())), abs(int(self.values.min())))
+        return max(map(abs, self.values))
+
+
+def _load_column(values):
+    # Wrap an input column, converting numeric data to NumPy when available
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        dtype = values.dtype
+        if dtype.kind == 'b':
+            return _Column(frozenset(['bool']), values)
+        if dtype.kind == 'f':
+            # Python floats are doubles: compute in float64 whatever the input width
+            return _Column(frozenset(['float']), values.astype(numpy.float64, copy=False))
+        if dtype.kind == 'i' or (dtype.kind == 'u' and dtype.itemsize < 8):
+            return _Column(frozenset(['int']), values.astype(numpy.int64, copy=False))
+        values = values.tolist()
+    kinds = set()
+    for value_type in set(map(type, values)):
+        if value_type not in SCALAR_TYPES:
+            raise _Fallback()
+        kinds.add(SCALAR_TYPES[value_type])
+    column = _Column(frozenset(kinds), values)
+    if numpy is not None and column.kind in NUMERIC:
+        try:
+            return _Column(column.kinds, numpy.array(values, dtype=NUMPY_DTYPES[column.kind]))
+        except OverflowError:
+            pass
+    return column
+
+
+class _Vectorizer:
+    def __init__(self, columns, length):
+        self.columns = columns    # name -> raw column slice for this chunk
+        self.length = length
+        self.loaded = {}          # name -> _Column
+
+    def column(self, node):
+        if isinstance(node, (Num, Bool, String)):
+            return _Column(frozenset([SCALAR_TYPES[type(node.value)]]), scalar=node.value)
+        if isinstance(node, VarAccess):
+            column = self.loaded.get(node.name)
+            if column is None:
+                if node.name not in self.columns:
+                    raise _Fallback()
+                column = self.loaded[node.name] = _load_column(self.columns[node.name])
+            return column
+        if isinstance(node, BinOp):
+            return self.binop(node, self.column(node.left), self.column(node.right))
+        if isinstance(node, UnaryOp):
+            return self.unaryop(node, self.column(node.expr))
+        raise _Fallback()
+
+    def binop(self, node, left, right):
+        op_type = node.op.type
+        results = {binop_result(op_type, l, r) for l in left.kinds for r in right.kinds}
+        if ERROR in results:
+            raise _Fallback()
+        if op_type == TT_DIV and right.has_zero():
+            raise _Fallback()
+        kinds = frozenset(results)
+        func = FAST_BINOPS.get(op_type) or UNCHECKED_BINOPS[op_type]
+        if left.is_scalar and right.is_scalar:
+            return _Column(kinds, scalar=func(left.scalar, right.scalar))
+        values = _numpy_binop(op_type, left, right)
+        if values is None:
+            values = list(map(func, left.items(self.length), right.items(self.length)))
+        return _Column(kinds, values)
+
+    def unaryop(self, node, operand):
+        op_type = node.op.type
+        results = {unaryop_result(op_type, kind) for kind in operand.kinds}
+        if ERROR in results:
+            raise _Fallback()
+        kinds = frozenset(results)
+        func = FAST_UNARYOPS[op_type]
+        if operand.is_scalar:
+            return _Column(kinds, scalar=func(operand.scalar))
+        if operand.is_numpy:
+            values = operand.values
+            if op_type == TT_NOT:
+                return _Column(kinds, values == 0)
+            if values.dtype == numpy.bool_:
+                values = values.astype(numpy.int64)
+            if op_type == TT_MINUS:
+                if operand.kind != 'float' and operand.max_abs() >= INT64_LIMIT:
+                    return _Column(kinds, list(map(func, operand.items(self.length))))
+                return _Column(kinds, -values)
+            return _Column(kinds, values.copy())
+        return _Column(kinds, list(map(func, operand.items(self.length))))
+
+
+def _numpy_binop(op_type, left, right):
+    """
+    Apply op_type with NumPy if the result is guaranteed to equal the
+    interpreter's, else return None.
+    """
+    if not (left.is_numpy or right.is_numpy):
+        return None
+    if left.kind not in NUMERIC or right.kind not in NUMERIC:
+        return None
+    left_int = left.kind != 'float'
+    right_int = right.kind != 'float'
+    left_max = left.max_abs() if left_int else 0
+    right_max = right.max_abs() if right_int else 0
+    # Integer operands (columns or scalars) must fit int64 ...
+    if left_max >= INT64_LIMIT or right_max >= INT64_LIMIT:
+        return None
+    # ... and results of integer arithmetic must too
+    if left_int and right_int:
+        if op_type in (TT_PLUS, TT_MINUS) and max(left_max, right_max) >= INT64_LIMIT // 2:
+            return None
+        if op_type == TT_MUL and left_max * right_max >= INT64_LIMIT:
+            return None
+    # Where an integer meets float arithmetic it must convert exactly
+    if op_type == TT_DIV or (op_type in COMPARISONS and left_int != right_int):
+        if max(left_max, right_max) > EXACT_FLOAT_INT:
+            return None
+
+    def operand(column, is_int):
+        if column.is_scalar:
+            return column.scalar
+        values = column.values
+        if not column.is_numpy:
+            values = numpy.array(values, dtype=NUMPY_DTYPES[column.kind])
+        if is_int and values.dtype == numpy.bool_ and op_type not in COMPARISONS:
+            # Python adds bools as ints; NumPy would use logical or
+            values = values.astype(numpy.int64)
+        return values
+
+    a = operand(left, left_int)
+    b = operand(right, right_int)
+    with numpy.errstate(all='ignore'):
+        if op_type == TT_AND:
+            return numpy.logical_and(a != 0, b != 0)
+        if op_type == TT_OR:
+            return numpy.logical_or(a != 0, b != 0)
+        if op_type == TT_DIV:
+            return numpy.true_divide(a, b, dtype=numpy.float64)
+        return (FAST_BINOPS.get(op_type) or UNCHECKED_BINOPS[op_type])(a, b)
+
+
+def _evaluate_rows(expr, columns, length):
+    # Reference path: one Interpreter.visit per row
+    interpreter = Interpreter()
+    env = interpreter.global_vars
+    lists = [(name, values.tolist() if numpy is not None and isinstance(values, numpy.ndarray) else values)
+             for name, values in columns.items()]
+    results = []
+    for row in range(length):
+        for name, values in lists:
+            env[name] = values[row]
+        results.append(interpreter.visit(expr))
+    return results
+
+
+def evaluate_columns(expr, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Evaluate expr once per row of columns and return the results as a list.
+    expr: An expression AST node, or source text (see parse_expression())
+    columns: Mapping from variable name to a list or NumPy array of values;
+             all columns must have the same length
+    chunk_size: Rows evaluated together; a chunk that cannot be vectorized
+                falls back to per-row evaluation on its own
+    The results (and any error raised) are the same as evaluating expr with
+    an Interpreter whose globals hold one row at a time, in row order.
+    """
+    if isinstance(expr, str):
+        expr = parse_expression(expr)
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise Exception(f"Columns must have the same length, got {sorted(lengths)}")
+    length = lengths.pop() if lengths else 0
+
+    results = []
+    for start in range(0, length, chunk_size):
+        stop = min(start + chunk_size, length)
+        chunk = {name: values[start:stop] for name, values in columns.items()}
+        try:
+            column = _Vectorizer(chunk, stop - start).column(expr)
+            values = column.items(stop - start)
+            results.extend(values)
+        except Exception:
+            # _Fallback or an error some row raises: per-row evaluation
+            # produces the exact results and the first error in row order
+            results.extend(_evaluate_rows(expr, chunk, stop - start))
+    return results
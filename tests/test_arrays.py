@@ -0,0 +1,134 @@
+#Array values, indexing, append and elementwise operations
+
+from src.lexer import Lexer
+from src.my_parser import Parser
+from src.interpreter import Interpreter
+from src.program import Program
+from src.arrays import ArrayValue, pack
+import io
+import pytest
+
+@pytest.fixture
+def interpreter():
+    return Interpreter()
+
+def run_source(source, interpreter):
+    result = None
+    for node in Parser(Lexer(source)).parse():
+        val = interpreter.visit(node)
+        if val is not None:
+            result = val
+    return result
+
+def test_literals_index_len_and_append(interpreter, capsys):
+    program = """
+    a = [1, 2, 3];
+    append(a, 4);
+    words = ["ab", "c"];
+    print a;
+    print words;
+    print len(a) + len(words[0]) + a[3];
+    """
+    run_source(program, interpreter)
+    assert capsys.readouterr().out == "[1, 2, 3, 4]\n['ab', 'c']\n10\n"
+    assert interpreter.global_vars['a'].typecode == 'q'
+    assert interpreter.global_vars['words'].typecode is None
+
+def test_storage_stays_exact(interpreter):
+    run_source("f = [1.5, 2.0]; m = [1, 2.5]; e = []; append(e, 2); big = [9223372036854775807] + 1;", interpreter)
+    g = interpreter.global_vars
+    assert g['f'].typecode == 'd'
+    assert g['m'].typecode is None and list(g['m']) == [1, 2.5]
+    assert g['e'].typecode == 'q'
+    assert list(g['big']) == [9223372036854775808]
+
+def test_elementwise_operations(interpreter):
+    program = """
+    a = [1, 2, 3];
+    b = a * 2 + [10, 20, 30];
+    d = a / 2;
+    c = b > 15;
+    s = ["x", "y"] + "!";
+    """
+    run_source(program, interpreter)
+    g = interpreter.global_vars
+    assert list(g['b']) == [12, 24, 36]
+    assert list(g['d']) == [0.5, 1.0, 1.5]
+    assert list(g['c']) == [False, True, True]
+    assert list(g['s']) == ["x!", "y!"]
+
+def test_append_in_function_and_optimized_run():
+    source = """
+    func squares(n) {
+        r = [];
+        i = 0;
+        while (i < n) { append(r, i * i); i = i + 1; }
+        return r;
+    }
+    s = squares(5) + 1;
+    t = s * 2;
+    u = s * 2;
+    append(t, 0);
+    """
+    for level in (0, 1, 2):
+        variables = Program(source, optimize=level).run().variables
+        assert list(variables['t']) == [2, 4, 10, 20, 34, 0]
+        # Each CSE load gets its own copy; the append must not leak into u
+        assert list(variables['u']) == [2, 4, 10, 20, 34]
+
+def test_append_copies_shared_arrays(interpreter):
+    run_source("a = [1, 2];", interpreter)
+    child = interpreter.fork()
+    run_source("append(a, 3);", child)
+    assert list(interpreter.global_vars['a']) == [1, 2]
+    assert list(child.global_vars['a']) == [1, 2, 3]
+
+    host = ArrayValue([1])
+    Program("append(h, 2);").run(variables={'h': host})
+    assert list(host) == [1]
+
+ALIASES = """
+%sfunc f() { return [1]; }
+x = f(); y = x; append(x, 2);
+z = f(); append(z, 3);
+print y; print f(); print z;
+"""
+
+@pytest.mark.parametrize("engine", ['recursive', 'stack'])
+@pytest.mark.parametrize("level", [0, 2, 3])
+def test_aliases_see_appends_everywhere(engine, level):
+    # memo, snapshots and host variables do not change what a program prints
+    def output(source, **kwargs):
+        out = io.StringIO()
+        Program(source, optimize=level).run(output=out, engine=engine, **kwargs)
+        return out.getvalue()
+
+    expected = "[1, 2]\n[1]\n[1, 3]\n"
+    assert output(ALIASES % "") == expected
+    assert output(ALIASES % "memo ") == expected
+
+    parent = Interpreter()
+    run_source("x = [1]; y = x;", parent)
+    snap = parent.snapshot()
+    for _ in range(2):
+        assert output("append(x, 2); print y;", snapshot=snap) == "[1, 2]\n"
+    assert output("append(x, 2); print y;", snapshot=parent.fork().snapshot()) == "[1, 2]\n"
+
+    host = ArrayValue(pack([1]))
+    assert output("append(x, 2); print y;", variables={'x': host, 'y': host}) == "[1, 2]\n"
+    assert list(host) == [1]
+
+@pytest.mark.parametrize("source, message", [
+    ("x = [1, 2] + [1];", "Array length mismatch"),
+    ("x = [1, 0]; y = 1 / x;", "Division by zero"),
+    ("x = [1][5];", "out of range"),
+    ('x = [1]["0"];', "index must be an integer"),
+    ("x = -[1];", "bad operand type for unary -"),
+    ("x = 5; append(x, 1);", "expects an array"),
+    ("x = 1 + append(a, 1);", "only be used as a statement"),
+    ("func len(x) { }", "built-in function"),
+    ("x = len(3);", "has no len"),
+])
+def test_array_errors(interpreter, source, message):
+    with pytest.raises(Exception, match=message):
+        run_source(source, interpreter)
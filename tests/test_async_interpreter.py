@@ -0,0 +1,84 @@
+#asyncio-cooperative execution
+
+from src.lexer import Lexer
+from src.my_parser import Parser
+from src.async_interpreter import AsyncInterpreter
+from src.program import Program
+import asyncio
+
+class AsyncSink:
+    def __init__(self):
+        self.lines = []
+    async def write(self, text):
+        await asyncio.sleep(0)
+        self.lines.append(text)
+
+def parse(source):
+    return Parser(Lexer(source)).parse()
+
+def test_async_input_and_output():
+    names = iter(["Alice", "Bob"])
+    async def read():
+        await asyncio.sleep(0)
+        return next(names)
+    sink = AsyncSink()
+    interpreter = AsyncInterpreter(input_func=read, output=sink)
+    program = 'a = input(); print "Hello, " + a + " and " + input(); 1 + 2'
+    result = asyncio.run(interpreter.interpret(parse(program)))
+    assert result == 3
+    assert sink.lines == ["Hello, Alice and Bob\n"]
+
+def count_yields(program, **kwargs):
+    # Run program with a heartbeat task; returns (run, heartbeats seen)
+    ticks = []
+
+    async def heartbeat():
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0)
+
+    async def main():
+        beat = asyncio.ensure_future(heartbeat())
+        run = await program.run_async(yield_every=50, **kwargs)
+        beat.cancel()
+        return run
+
+    run = asyncio.run(main())
+    return run, len(ticks)
+
+def test_long_loop_yields_to_event_loop():
+    run, ticks = count_yields(Program("i = 0; while (i < 2000) { i = i + 1; }"))
+    assert run.variables['i'] == 2000
+    # 2000 iterations with two steps each, yielding every 50 steps
+    assert ticks >= 40
+
+def test_function_bodies_yield_to_event_loop():
+    sources = [
+        "func f(n) { i = 0; while (i < n) { i = i + 1; } return i; } f(2000)",
+        "func f(n) { t = 0; for (i = 0; n) { t = t + 1; } return t; } f(2000)",
+        "func f(n) { if (n == 0) { return 0; } return f(n - 1) + 1; } f(2000)",
+    ]
+    for source in sources:
+        run, ticks = count_yields(Program(source))
+        assert run.result == 2000
+        assert ticks >= 40
+
+def test_async_input_and_output_in_functions():
+    names = iter(["Alice", "Bob"])
+    async def read():
+        await asyncio.sleep(0)
+        return next(names)
+    sink = AsyncSink()
+    source = 'func greet() { print "Hello, " + input(); return input(); } x = greet(); x'
+    run = asyncio.run(Program(source).run_async(inputs=read, output=sink))
+    assert run.result == "Bob"
+    assert sink.lines == ["Hello, Alice\n"]
+
+def test_concurrent_scripts_match_sync_results():
+    program = Program('s = ""; i = 0; while (i < n) { s = s + "x"; i = i + 1; } s')
+
+    async def main():
+        return await asyncio.gather(*(program.run_async({'n': n}, yield_every=10) for n in range(20)))
+
+    results = asyncio.run(main())
+    assert [run.result for run in results] == [program.run({'n': n}).result for n in range(20)]
@@ -0,0 +1,66 @@
+#Process-pool batch runner
+
+from src.batch import run_batch, run_source, main
+from src.interpreter import Interpreter
+from src.lexer import Lexer
+from src.my_parser import Parser
+import io
+import json
+import pytest
+
+@pytest.fixture
+def scripts(tmp_path):
+    paths = {}
+    sources = {
+        'hello': 'print "hello"; 1 + 1',
+        'echo': 'name = input(); print "Hi " + name;',
+        'broken': 'print "before"; x = 1 / 0;',
+        'forever': 'while (true) { x = 1; }',
+        'array': 'a = [1, 2]; append(a, [3.5, "x"]); a',
+    }
+    for name, source in sources.items():
+        path = tmp_path / f"{name}.txt"
+        path.write_text(source)
+        paths[name] = str(path)
+    return paths
+
+def test_run_source_captures_output_and_input():
+    res = run_source('a = input(); b = input(); print b + a; 7', "x\ny\n")
+    assert res.ok
+    assert res.output == "yx\n"
+    assert res.result == 7
+
+def test_run_source_reports_errors():
+    res = run_source('x = input(); y = input();', "only one line")
+    assert not res.ok
+    assert res.error_type == 'EOFError'
+
+def test_run_batch(scripts):
+    jobs = [scripts['hello'], (scripts['echo'], "Bob\n"), scripts['broken'], scripts['forever']]
+    results = {res.script: res for res in run_batch(jobs, workers=2, timeout=0.5)}
+    assert len(results) == 4
+    assert results[scripts['hello']].output == "hello\n"
+    assert results[scripts['hello']].result == 2
+    assert results[scripts['echo']].output == "Hi Bob\n"
+    assert results[scripts['broken']].output == "before\n"
+    assert results[scripts['broken']].error == "Division by zero undefined"
+    assert results[scripts['forever']].error_type == 'ScriptTimeout'
+
+def test_cli_json(scripts, tmp_path, capsys):
+    input_path = tmp_path / "input.txt"
+    input_path.write_text("Ann\n")
+    status = main([scripts['hello'], '--pair', scripts['echo'], str(input_path), '--json', '-w', '2'])
+    assert status == 0
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert sorted(line['output'] for line in lines) == ["Hi Ann\n", "hello\n"]
+
+def test_cli_json_array_result(scripts, capsys):
+    assert main([scripts['array'], '--json']) == 0
+    line = json.loads(capsys.readouterr().out)
+    assert line['result'] == [1, 2, [3.5, "x"]]
+
+def test_interpret_prints_the_result_to_output(capsys):
+    output = io.StringIO()
+    Interpreter(output=output).interpret(Parser(Lexer('print "a"; 1 + 2')).parse())
+    assert output.getvalue() == "a\n3\n"
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,21 @@
+#Benchmark suite smoke tests
+
+from benchmarks.bench import WORKLOADS, run_suite, compare_results
+import copy
+import pytest
+
+@pytest.mark.parametrize("name", sorted(WORKLOADS))
+def test_workloads_run(name):
+    results = run_suite([name], sizes=('small',), repeat=1, warmup=0)
+    entry = results['results'][f"{name}/small"]
+    assert set(entry['phases']) == {'lex', 'parse', 'exec'}
+    assert entry['source_bytes'] > 0
+
+def test_compare_flags_regressions():
+    baseline = run_suite(['while'], repeat=1, warmup=0)
+    current = copy.deepcopy(baseline)
+    current['results']['while/small']['phases']['exec']['median'] *= 2
+    rows = {(key, phase): regressed for key, phase, _, _, _, regressed
+            in compare_results(baseline, current, threshold=10)}
+    assert rows[('while/small', 'exec')] is True
+    assert rows[('while/small', 'lex')] is False
@@ -0,0 +1,174 @@
+#Checkpoint save and restore for warm starts
+
+from src.checkpoint import (
+    save_checkpoint, load_checkpoint, HEADER, INDEX_RECORD, ALIGNMENT, CHECKPOINT_VERSION
+)
+from src.program import Program
+from src.interpreter import Interpreter
+from src.streaming import iter_steps, run_streaming
+from src.profile_guided import guarded_binop
+from src.cli import main
+import asyncio
+import io
+import os
+import struct
+import pytest
+
+SETUP = """
+func scale(x) { return x * factor; }
+memo func fib(n) { if (n < 2) { return n; } return fib(n - 1) + fib(n - 2); }
+factor = 3;
+ints = [1, 2, 3];
+floats = [0.5, 1.5];
+mixed = ["a", [1, true], 2.5];
+empty = [];
+big = 123456789012345678901234567890;
+negative = -42;
+flag = false;
+ratio = 0.25;
+text = "café ☃";
+blank = "";
+"""
+
+@pytest.fixture
+def state():
+    return Program(SETUP, optimize=1).run()
+
+def test_round_trip(tmp_path, state):
+    path = str(tmp_path / "state.ckpt")
+    save_checkpoint(path, state.variables, state.functions, source=SETUP)
+    checkpoint = load_checkpoint(path)
+    assert checkpoint.version == CHECKPOINT_VERSION
+    assert checkpoint.position is None
+    assert checkpoint.matches(SETUP) and not checkpoint.matches(SETUP + " ")
+    variables = checkpoint.variables
+    assert list(variables) == list(state.variables)
+    for name, value in state.variables.items():
+        restored = variables[name]
+        assert type(restored) is type(value)
+        assert str(restored) == str(value)
+    assert variables['ints'].typecode == 'q' and variables['floats'].typecode == 'd'
+    assert variables['mixed'].data[1].data == [1, True]
+    assert set(checkpoint.functions) == {'scale', 'fib'}
+    assert checkpoint.functions['fib'].memo
+
+def test_none_values(tmp_path):
+    source = "func f() { x = 1; } v = f(); items = [1, f()];"
+    state = Program(source).run()
+    path = str(tmp_path / "state.ckpt")
+    save_checkpoint(path, state.variables, state.functions)
+    variables = load_checkpoint(path).variables
+    assert variables['v'] is None
+    assert variables['items'].data == [1, None]
+    script = tmp_path / "script.txt"
+    script.write_text(source)
+    assert main(['run', str(script), '--save-checkpoint', path]) == 0
+    assert load_checkpoint(path).variables['v'] is None
+
+def test_values_are_aligned_for_mapping(tmp_path, state):
+    path = str(tmp_path / "state.ckpt")
+    save_checkpoint(path, state.variables)
+    with open(path, 'rb') as f:
+        data = f.read()
+    count = HEADER.unpack_from(data)[3]
+    for record in INDEX_RECORD.iter_unpack(data[HEADER.size:HEADER.size + count * INDEX_RECORD.size]):
+        assert record[3] % ALIGNMENT == 0
+
+@pytest.mark.parametrize("engine", ['recursive', 'stack', 'async'])
+def test_warm_start_matches_replaying_the_setup(tmp_path, state, engine):
+    path = str(tmp_path / "state.ckpt")
+    save_checkpoint(path, state.variables, state.functions)
+    job = "append(ints, 4); print scale(len(ints)); print fib(30); print mixed; print text;"
+    expected = io.StringIO()
+    Program(SETUP + job).run(output=expected)
+    snapshot = load_checkpoint(path).snapshot()
+    for _ in range(2):
+        output = io.StringIO()
+        program = Program(job)
+        if engine == 'async':
+            asyncio.run(program.run_async(output=output, snapshot=snapshot))
+        else:
+            program.run(output=output, snapshot=snapshot, engine=engine)
+        assert output.getvalue() == expected.getvalue()
+    # append() in a run works on a copy of the checkpoint's array
+    assert len(snapshot['ints']) == 3
+
+def test_load_selected_names(tmp_path, state):
+    path = str(tmp_path / "state.ckpt")
+    save_checkpoint(path, state.variables, state.functions)
+    checkpoint = load_checkpoint(path, names=['big', 'missing'])
+    assert checkpoint.variables == {'big': 123456789012345678901234567890}
+
+def test_guarded_fast_paths_are_dropped(tmp_path):
+    state = Program("func add(a, b) { return a + b; }").run()
+    func = state.functions['add']
+    binop = func.body[0].expr
+    binop.fast = guarded_binop(binop.op, [(int, int)], lambda left, right: left + right)
+    path = str(tmp_path / "state.ckpt")
+    save_checkpoint(path, {}, state.functions)
+    restored = load_checkpoint(path).functions['add']
+    assert restored.body[0].expr.fast is None
+    output = io.StringIO()
+    Program("print add(2, 3);").run(output=output, snapshot=load_checkpoint(path).snapshot())
+    assert output.getvalue() == "5\n"
+
+def test_errors(tmp_path):
+    path = str(tmp_path / "state.ckpt")
+    with pytest.raises(Exception, match="Cannot checkpoint variable 'x' of type 'dict'"):
+        save_checkpoint(path, {'x': {}})
+    assert os.listdir(tmp_path) == []
+    (tmp_path / "junk").write_bytes(b"not a checkpoint" * 10)
+    with pytest.raises(Exception, match="is not a checkpoint file"):
+        load_checkpoint(str(tmp_path / "junk"))
+    save_checkpoint(path, {'a': "x" * 100})
+    data = bytearray(open(path, 'rb').read())
+    with open(path, 'wb') as f:
+        f.write(data[:-10])
+    with pytest.raises(Exception, match="truncated"):
+        load_checkpoint(path)
+    struct.pack_into('<H', data, 8, CHECKPOINT_VERSION + 1)
+    with open(path, 'wb') as f:
+        f.write(data)
+    with pytest.raises(Exception, match="Unsupported checkpoint version"):
+        load_checkpoint(path)
+
+def test_streaming_positions():
+    source = "a = 1;\nprint a;  b = a + 1;"
+    steps = list(iter_steps(source, Interpreter(output=io.StringIO())))
+    assert [position for _, position in steps] == [7, 17, len(source)]
+    interpreter = Interpreter(output=io.StringIO())
+    interpreter.global_vars['a'] = 5
+    assert [value for value, _ in iter_steps(source, interpreter, start=17)] == [6]
+
+def test_streaming_resumes_from_a_checkpoint(tmp_path):
+    source = "total = 0;\n" + "".join(f"total = total + {i};\nprint total;\n" for i in range(10))
+    expected = io.StringIO()
+    run_streaming(source, Interpreter(output=expected))
+    path = str(tmp_path / "stream.ckpt")
+    # Run the first few statements, checkpointing after every one, then stop
+    first = io.StringIO()
+    interpreter = Interpreter(output=first)
+    steps = iter_steps(source, interpreter)
+    for _ in range(7):
+        _, position = next(steps)
+        save_checkpoint(path, interpreter.global_vars, interpreter.functions, source, position)
+    checkpoint = load_checkpoint(path)
+    assert checkpoint.matches(source) and checkpoint.position == source.index("total = total + 3")
+    rest = io.StringIO()
+    resumed = Interpreter.from_snapshot(checkpoint.snapshot(), output=rest)
+    run_streaming(source, resumed, start=checkpoint.position, checkpoint=path, checkpoint_every=2)
+    assert first.getvalue() + rest.getvalue() == expected.getvalue()
+    assert load_checkpoint(path).position == len(source)
+
+def test_cli(tmp_path, capsys):
+    setup = tmp_path / "setup.txt"
+    setup.write_text('base = [1, 2]; func twice(x) { return 2 * x; }')
+    job = tmp_path / "job.txt"
+    job.write_text('append(base, 3); print twice(len(base));')
+    path = str(tmp_path / "state.ckpt")
+    assert main(['run', str(setup), '--save-checkpoint', path, '--stats']) == 0
+    assert "checkpoint: restore -  save " in capsys.readouterr().err
+    assert main(['run', str(job), '--checkpoint', path, '--engine', 'stack']) == 0
+    assert capsys.readouterr().out == "6\n"
+    assert main(['run', str(job), '--checkpoint', str(job)]) == 1
+    assert "is not a checkpoint file" in capsys.readouterr().err
@@ -0,0 +1,104 @@
+#Non-interactive file runner
+
+from src.cli import main, run_program, flushing_input, format_stats
+from src.limits import MemoryAccountant
+import io
+import json
+import pytest
+
+SCRIPT = """
+total = 0;
+i = 0;
+while (i < 10) {
+    total = total + i * 2;
+    i = i + 1;
+}
+print total;
+name = input();
+print "Hi " + name;
+"""
+
+@pytest.fixture
+def script(tmp_path):
+    path = tmp_path / "script.txt"
+    path.write_text(SCRIPT)
+    inputs = tmp_path / "input.txt"
+    inputs.write_text("Ann\n")
+    return str(path), str(inputs)
+
+@pytest.mark.parametrize("engine", ['recursive', 'stack', 'async'])
+@pytest.mark.parametrize("optimize", [0, 3])
+def test_run_file(script, capsys, engine, optimize):
+    path, inputs = script
+    assert main(['run', path, '--input', inputs, '--engine', engine, '-O', str(optimize)]) == 0
+    captured = capsys.readouterr()
+    assert captured.out == "90\nHi Ann\n"
+    assert captured.err == ""
+
+def test_run_stdin(monkeypatch, capsys):
+    monkeypatch.setattr('sys.stdin', io.StringIO('print 1 + 2;'))
+    assert main(['run', '-']) == 0
+    assert capsys.readouterr().out == "3\n"
+
+def test_output_file_and_stats(script, tmp_path, capsys):
+    path, inputs = script
+    out = tmp_path / "out.txt"
+    stats_path = tmp_path / "stats.json"
+    assert main(['run', path, '--input', inputs, '-o', str(out), '--stats',
+                 '--stats-json', str(stats_path), '--buffer-size', '16']) == 0
+    assert out.read_text() == "90\nHi Ann\n"
+    err = capsys.readouterr().err
+    assert err.startswith("engine recursive, optimize 0\nphases: lex ")
+    stats = json.loads(stats_path.read_text())
+    assert set(stats['phases']) == {'lex', 'parse', 'optimize', 'exec', 'total'}
+    assert stats['counters']['loop_iterations'] == 10
+    assert stats['counters']['prints'] == 2
+    assert stats['statements'] == 6
+
+def test_errors_exit_nonzero_after_flushing_output(tmp_path, capsys):
+    path = tmp_path / "broken.txt"
+    path.write_text('print "before"; x = 1 / 0;')
+    assert main(['run', str(path)]) == 1
+    captured = capsys.readouterr()
+    assert captured.out == "before\n"
+    assert captured.err.startswith("Error: ")
+
+def test_memory_limit(tmp_path, capsys):
+    path = tmp_path / "big.txt"
+    path.write_text('s = "ab"; i = 0; while (i < 20) { s = s + s; i = i + 1; }')
+    assert main(['run', str(path), '--max-memory', '100000']) == 1
+    assert "limit" in capsys.readouterr().err
+
+def test_timeout(tmp_path, capsys):
+    path = tmp_path / "forever.txt"
+    path.write_text('while (true) { x = 1; }')
+    assert main(['run', str(path), '--timeout', '0.2']) == 1
+    assert "timeout" in capsys.readouterr().err
+
+def test_run_program_stats():
+    output = io.StringIO()
+    accountant = MemoryAccountant()
+    stats = run_program('x = [1, 2, 3]; print x;', output, engine='stack', optimize=1,
+                        accountant=accountant, trace_memory=True)
+    assert output.getvalue() == "[1, 2, 3]\n"
+    assert stats['tokens'] == 14
+    assert stats['memory']['accounted_peak'] > 0
+    assert stats['memory']['traced_peak'] > 0
+    assert "memory: accounted_peak" in format_stats(stats)
+
+def test_parallel_parse_phase():
+    stats = run_program('print 1;' * 10, io.StringIO(), parse_workers=1)
+    assert stats['phases']['lex'] is None and stats['tokens'] is None
+    assert "lex -" in format_stats(stats)
+
+def test_input_flushes_output():
+    class Output(io.StringIO):
+        flushes = 0
+        def flush(self):
+            self.flushes += 1
+    output = Output()
+    read = flushing_input(output, "a\nb")
+    assert [read(), read()] == ['a', 'b']
+    assert output.flushes == 2
+    with pytest.raises(EOFError):
+        read()
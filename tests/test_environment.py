@@ -0,0 +1,57 @@
+#Copy-on-write snapshots and interpreter forks
+
+from src.lexer import Lexer
+from src.my_parser import Parser
+from src.interpreter import Interpreter
+from src.environment import freeze
+from src.program import Program
+import pytest
+
+def run(interpreter, source):
+    for stmt in Parser(Lexer(source)).parse():
+        interpreter.visit(stmt)
+
+@pytest.fixture
+def parent():
+    interpreter = Interpreter()
+    run(interpreter, 'base = 10; name = "setup";')
+    return interpreter
+
+def test_fork_isolation(parent):
+    first = parent.fork()
+    second = parent.fork()
+    run(first, 'base = base + 1; extra = 1;')
+    run(second, 'base = base + 2;')
+    run(parent, 'name = "changed";')
+    assert first.global_vars['base'] == 11
+    assert second.global_vars['base'] == 12
+    assert 'extra' not in second.global_vars
+    assert parent.global_vars['base'] == 10
+    assert first.global_vars['name'] == "setup"
+
+def test_snapshot_is_frozen(parent):
+    snap = parent.snapshot()
+    run(parent, 'base = 0;')
+    assert snap['base'] == 10
+    assert snap.to_dict() == {'base': 10, 'name': "setup"}
+
+def test_program_runs_from_snapshot(parent):
+    snap = parent.snapshot()
+    program = Program('base = base * 2; result = base + 1;')
+    assert program.run(snapshot=snap).variables['result'] == 21
+    assert program.run({'base': 1}, snapshot=snap).variables['result'] == 3
+    assert snap['base'] == 10
+
+def test_deep_chains_are_flattened():
+    interpreter = Interpreter()
+    for i in range(50):
+        run(interpreter, f'v{i} = {i};')
+        interpreter = interpreter.fork()
+    assert interpreter.snapshot().depth <= 16
+    assert interpreter.global_vars['v0'] == 0
+    assert interpreter.global_vars['v49'] == 49
+
+def test_empty_layers_are_skipped():
+    snap = freeze({'a': 1})
+    again = freeze(snap.new_environment())
+    assert again.depth == 1
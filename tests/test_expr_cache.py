@@ -0,0 +1,161 @@
+#Dependency-tracked expression cache
+
+from src.program import Program
+from src.expr_cache import ExprCache, MISS
+from src.optimizer import cache_pure_expressions
+from src.lexer import Lexer
+from src.my_parser import Parser, CachedExpr, WhileStmt
+from src.arrays import ArrayValue, pack
+from src.environment import Snapshot
+import io
+import pytest
+
+SOURCE = """
+total = 0;
+i = 0;
+while (i < n) {
+    total = total + (a * a + b * b) * (a - b) + i;
+    if (i == 5) { a = a + 1; }
+    i = i + 1;
+}
+print total;
+"""
+
+def expected(n=20, a=3, b=2):
+    total = 0
+    for i in range(n):
+        total = total + (a * a + b * b) * (a - b) + i
+        if i == 5:
+            a = a + 1
+    return total
+
+def parse(source):
+    return Parser(Lexer(source)).parse()
+
+def run(program, engine='recursive', expr_cache=None, **variables):
+    output = io.StringIO()
+    values = {'n': 20, 'a': 3, 'b': 2}
+    values.update(variables)
+    result = program.run(variables=values, output=output, engine=engine, expr_cache=expr_cache)
+    return output.getvalue(), result
+
+def test_pass_wraps_loop_invariant_expression():
+    statements, stats = cache_pure_expressions(parse(SOURCE))
+    loop = statements[2]
+    assert isinstance(loop, WhileStmt)
+    cached = loop.body[0].value.left.right
+    assert isinstance(cached, CachedExpr)
+    assert cached.reads == ('a', 'b')
+    assert cached.size == 11
+    assert stats.cached == 1 and stats.sites == 1
+
+def test_variables_written_every_iteration_are_not_cached():
+    statements, stats = cache_pure_expressions(parse(
+        "i = 0; while (i < 10) { x = (i * i + i * i) * 2; i = i + 1; }"))
+    assert stats.cached == 0
+    assert not isinstance(statements[1].body[0].value, CachedExpr)
+
+def test_top_level_code_is_not_cached():
+    _, stats = cache_pure_expressions(parse("x = (a * a + b * b) * 2;"))
+    assert stats.cached == 0
+
+def test_identical_expressions_share_an_entry():
+    statements, stats = cache_pure_expressions(parse(
+        "i = 0; while (i < 3) { x = (a * a + b) * 2; y = (a * a + b) * 2; i = i + 1; }"))
+    body = statements[1].body
+    assert body[0].value is body[1].value
+    assert stats.cached == 1 and stats.sites == 2
+
+@pytest.mark.parametrize("engine", ['recursive', 'stack'])
+def test_results_match_uncached(engine):
+    output, result = run(Program(SOURCE, optimize=3), engine)
+    assert output == f"{expected()}\n"
+    assert output == run(Program(SOURCE, optimize=2), engine)[0]
+    # One miss before and one after the write to a, hits for the rest
+    cache = result.expr_cache
+    assert cache.misses == 2 and cache.hits == 18
+    assert cache.invalidations == 1
+    assert cache.hit_rate == pytest.approx(0.9)
+
+def test_append_invalidates():
+    source = """
+    i = 0;
+    while (i < 4) {
+        ys = xs * 2 + xs * 3 - xs;
+        if (i == 1) { append(xs, 5); }
+        i = i + 1;
+    }
+    print ys;
+    """
+    output = io.StringIO()
+    result = Program(source, optimize=3).run(variables={'xs': ArrayValue(pack([1, 2]))}, output=output)
+    assert output.getvalue() == "[4, 8, 20]\n"
+    assert result.expr_cache.misses == 2 and result.expr_cache.hits == 2
+
+def test_default_cache_only_when_something_is_cached():
+    assert run(Program("print 1 + 2;", optimize=3))[1].expr_cache is None
+    assert run(Program(SOURCE, optimize=2))[1].expr_cache is None
+
+def test_bounded_entries_and_bytes():
+    cache = ExprCache(maxsize=2, max_bytes=10 ** 6)
+    nodes = [CachedExpr(None, (), 5) for _ in range(3)]
+    for number, node in enumerate(nodes):
+        cache.store(node, number, {})
+    assert cache.lookup(nodes[0]) is MISS
+    assert cache.lookup(nodes[2]) == 2
+    assert cache.evictions == 1
+    small = ExprCache(max_bytes=1)
+    small.store(nodes[0], "a long string value", {})
+    assert small.skipped == 1 and small.lookup(nodes[0]) is MISS
+
+def test_versions_invalidate():
+    cache = ExprCache()
+    node = CachedExpr(None, ('a',), 5)
+    cache.store(node, 1, {'a': 2})
+    assert cache.lookup(node) == 1
+    cache.bump('b')
+    assert cache.lookup(node) == 1
+    cache.bump('a')
+    assert cache.lookup(node) is MISS
+    assert cache.stats()['invalidations'] == 1
+
+def test_cached_arrays_are_copied():
+    source = """
+    i = 0;
+    while (i < 3) {
+        ys = xs * 2 + xs * 3;
+        append(ys, 0);
+        i = i + 1;
+    }
+    print ys;
+    """
+    output = io.StringIO()
+    result = Program(source, optimize=3).run(variables={'xs': ArrayValue(pack([1, 2]))}, output=output)
+    # Each hit hands out its own copy, and appending to it does not
+    # invalidate entries that read other arrays
+    assert output.getvalue() == "[5, 10, 0]\n"
+    assert result.expr_cache.hits == 2
+
+@pytest.mark.parametrize("engine", ['recursive', 'stack'])
+def test_appends_through_aliases_and_parameters_invalidate(engine):
+    loop = "i = 0; while (i < 3) { print a * 2 + 1 - 1; %s i = i + 1; }"
+    sources = [
+        "a = [1, 2]; b = a; " + loop % "append(b, 5);",
+        "func f(r) { append(r, 5); return 0; } a = [1, 2]; " + loop % "z = f(a);",
+    ]
+    for source in sources:
+        output = io.StringIO()
+        Program(source, optimize=3).run(output=output, engine=engine)
+        assert output.getvalue() == "[2, 4]\n[2, 4, 10]\n[2, 4, 10, 10]\n"
+
+def test_reused_cache_sees_new_host_values():
+    program = Program("i = 0; while (i < 2) { print n * 2 + n * 3 + 1; i = i + 1; }", optimize=3)
+    cache = ExprCache()
+    for n in (1, 10):
+        output = io.StringIO()
+        program.run(variables={'n': n}, output=output, expr_cache=cache)
+        assert output.getvalue() == f"{n * 5 + 1}\n" * 2
+    snapshot = Program("n = 4;").run(output=io.StringIO())
+    output = io.StringIO()
+    program.run(snapshot=Snapshot([snapshot.variables]), output=output, expr_cache=cache)
+    assert output.getvalue() == "21\n" * 2
@@ -0,0 +1,142 @@
+#Counted for-range loop
+
+from src.program import Program
+from src.lexer import Lexer
+from src.my_parser import Parser, ForStmt
+from src.type_infer import infer_types
+from src.profile_guided import record_profile, format_profile
+from src.parallel_parse import split_source
+import asyncio
+import io
+import pytest
+
+ENGINES = ['recursive', 'stack']
+
+def parse(source):
+    return Parser(Lexer(source)).parse()
+
+def run(source, engine='recursive', optimize=0, **variables):
+    output = io.StringIO()
+    result = Program(source, optimize=optimize).run(variables=variables, output=output, engine=engine)
+    return output.getvalue().split(), result
+
+def test_parse():
+    (stmt,) = parse("for (i = 0; n + 1) { print i; }")
+    assert isinstance(stmt, ForStmt)
+    assert stmt.name == 'i' and stmt.pos == 0
+    assert repr(stmt) == "ForStmt(i, Num(0), BinOp(VarAccess(n), +, Num(1)), [PrintStmt(VarAccess(i))])"
+
+@pytest.mark.parametrize("source", ["for (i; 3) { }", "for (i = 0, 3) { }", "for i = 0; 3 { }"])
+def test_syntax_errors(source):
+    with pytest.raises(Exception):
+        parse(source)
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("optimize", [0, 1, 2, 3])
+def test_counts_like_the_while_loop(engine, optimize):
+    source = """
+    total = 0;
+    for (i = 2; n) { total = total + i * (a + b) * (a + b); }
+    print total;
+    print i;
+    """
+    printed, result = run(source, engine, optimize, n=10, a=1, b=2)
+    assert printed == [str(sum(i * 9 for i in range(2, 10))), "10"]
+    assert result.counters['loop_iterations'] == 8
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_empty_range_leaves_the_start_value(engine):
+    printed, result = run('for (j = 5; 2) { print "never"; } print j;', engine)
+    assert printed == ["5"]
+    assert result.counters['loop_iterations'] == 0
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_bounds_are_evaluated_once_and_the_body_cannot_steer(engine):
+    source = """
+    n = 3;
+    for (i = 0; n) { print i; n = n + 1; i = 100; }
+    print n;
+    """
+    printed, _ = run(source, engine)
+    assert printed == ["0", "1", "2", "6"]
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("bounds", ["0; 2.5", '"a"; 3', "true; 3"])
+def test_bounds_must_be_integers(engine, bounds):
+    with pytest.raises(Exception, match="for loop bounds must be integers"):
+        run(f"for (i = {bounds}) {{ }}", engine)
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_nested_loops(engine):
+    source = "count = 0; for (i = 0; 4) { for (j = i; 4) { count = count + 1; } } print count;"
+    assert run(source, engine)[0] == ["10"]
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_inside_functions(engine):
+    source = """
+    func squares(n) { s = 0; for (k = 1; n + 1) { s = s + k * k; } return s; }
+    func twice(x) { return 2 * x; }
+    func calls(n) {
+        s = 0;
+        for (k = 0; n) {
+            if (k == 3) { return s; }
+            s = s + twice(k);
+        }
+        return k;
+    }
+    print squares(4);
+    print calls(10);
+    print calls(2);
+    """
+    assert run(source, engine)[0] == ["30", "6", "2"]
+    # The loop variable is a local
+    assert 'k' not in run(source, engine)[1].variables
+
+def test_async_engine():
+    source = "total = 0; for (i = 0; 1000) { total = total + i; } print total; print i;"
+    output = io.StringIO()
+    result = asyncio.run(Program(source).run_async(output=output, yield_every=10))
+    assert output.getvalue().split() == ["499500", "1000"]
+    assert result.counters['loop_iterations'] == 1000
+
+def test_type_inference():
+    statements = parse("x = 1.5; for (i = 0; 10) { y = i + 1; z = i * x; } w = i - 1;")
+    report = infer_types(statements)
+    body = statements[1].body
+    assert body[0].value.fast is not None
+    assert body[1].value.fast is not None
+    assert statements[2].value.fast is not None
+    assert report.errors == []
+    report = infer_types(parse('for (i = "a"; 3) { }'))
+    assert report.errors == ["TypeError: for loop bounds must be integers, got 'str'"]
+    with pytest.raises(Exception, match="bounds must be integers"):
+        Program('for (i = 0; "x") { }', optimize=1, strict=True)
+
+def test_memory_accounting_and_cache_paths():
+    from src.limits import MemoryAccountant
+    source = "s = 0; for (i = 0; 50) { s = s + (a * a + a * 3) * 2; } print s;"
+    for engine in ENGINES:
+        output = io.StringIO()
+        result = Program(source, optimize=3).run(variables={'a': 2}, output=output,
+                                                 engine=engine, accountant=MemoryAccountant())
+        assert output.getvalue() == f"{50 * 20}\n"
+        assert result.expr_cache.hits == 49
+
+def test_profile_marks_never_run_loops_cold():
+    source = "for (i = 0; n) { x = i; }\nfor (j = 0; 0) { print j; }\n"
+    profile = record_profile(source, variables={'n': 30}, output=io.StringIO())
+    assert profile.loops[0] == [1, 30]
+    report = format_profile(profile, source)
+    assert "1:1 for: entered 1, 30 iterations" in report
+    program = Program(source, profile=profile)
+    assert program.report['profile'].cold_blocks == 0
+    for _ in range(19):
+        profile.merge(record_profile(source, variables={'n': 30}, output=io.StringIO()))
+    program = Program(source, profile=profile)
+    assert program.statements[1].cold and not program.statements[0].cold
+    result = program.run(variables={'n': 3}, output=io.StringIO(), engine='stack')
+    assert result.variables['i'] == 3 and result.variables['j'] == 0
+
+def test_parallel_split_skips_the_loop_header():
+    source = "for (i = 0; 3) { x = i; } y = 1;"
+    assert split_source(source, 1) == [0, source.index("}") + 1]
@@ -0,0 +1,125 @@
+#User-defined functions, call frames and memoization
+
+from src.lexer import Lexer
+from src.my_parser import Parser, LocalAccess, LocalAssign
+from src.interpreter import Interpreter
+import pytest
+
+@pytest.fixture
+def interpreter():
+    return Interpreter()
+
+def run_source(source, interpreter):
+    result = None
+    for node in Parser(Lexer(source)).parse():
+        val = interpreter.visit(node)
+        if val is not None:
+            result = val
+    return result
+
+def test_define_and_call(interpreter, capsys):
+    program = """
+    scale = 10;
+    func area(w, h) {
+        a = w * h;
+        return a * scale;
+    }
+    greet("Ann");
+    func greet(name) { print "Hi " + name; }
+    greet("Bob");
+    print area(2, 3) + 1;
+    """
+    with pytest.raises(Exception, match="Function 'greet' is not defined"):
+        run_source(program, interpreter)
+    run_source(program.replace('greet("Ann");', ''), interpreter)
+    assert capsys.readouterr().out == "Hi Bob\n61\n"
+    # Locals stay in the frame and never leak into globals
+    assert 'a' not in interpreter.global_vars
+
+def test_locals_use_slots():
+    func = Parser(Lexer("func f(x) { y = x + 1; return y; }")).parse()[0]
+    assert func.local_names == ['x', 'y']
+    assert isinstance(func.body[0], LocalAssign)
+    assert isinstance(func.body[1].expr, LocalAccess)
+    assert func.body[1].expr.slot == 1
+
+def test_deep_recursion_does_not_hit_python_limit(interpreter):
+    program = """
+    func count(n) {
+        if (n == 0) { return 0; }
+        return 1 + count(n - 1);
+    }
+    count(50000)
+    """
+    assert run_source(program, interpreter) == 50000
+
+def test_return_from_loop_and_bare_return(interpreter):
+    program = """
+    func first_over(limit) {
+        i = 0;
+        while (true) {
+            i = i + 1;
+            if (i * i > limit) { return i; }
+        }
+    }
+    func nothing() { return; }
+    x = first_over(50);
+    y = nothing();
+    """
+    run_source(program, interpreter)
+    assert interpreter.global_vars['x'] == 8
+    assert interpreter.global_vars['y'] is None
+
+def test_memo_functions_use_lru_cache(interpreter):
+    program = """
+    memo func fib(n) {
+        if (n < 2) { return n; }
+        return fib(n - 1) + fib(n - 2);
+    }
+    fib(80)
+    """
+    assert run_source(program, interpreter) == 23416728348467685
+    stats = interpreter.memo_stats()['fib']
+    assert stats['misses'] == 81
+    assert stats['hits'] == 78
+    assert 0 < stats['hit_rate'] < 1
+
+def test_memo_cache_is_bounded(interpreter):
+    interpreter.memo_size = 4
+    run_source("memo func sq(n) { return n * n; } i = 0; while (i < 10) { sq(i); i = i + 1; }", interpreter)
+    stats = interpreter.memo_stats()['sq']
+    assert stats['size'] == 4
+    assert stats['evictions'] == 6
+
+def test_redefinition_drops_dependent_memo_results(interpreter, capsys):
+    run_source("""
+    memo func g(x) { return x; }
+    memo func f(x) { return g(x); }
+    print f(1);
+    memo func g(x) { return x + 100; }
+    print f(1);
+    """, interpreter)
+    assert capsys.readouterr().out == "1\n101\n"
+
+@pytest.mark.parametrize("source, message", [
+    ("return 1;", "'return' outside function"),
+    ("func f() { func g() { } }", "Nested function"),
+    ('memo func f(x) { print x; }', "must not print"),
+    ("k = 1; memo func f(n) { return n + k; }", "must not read global variable 'k'"),
+    ('func g(n) { print "side"; return n; } memo func f(n) { return g(n) + 1; } f(1)',
+     "must not call non-memo function 'g'"),
+    ("func f(a, a) { }", "Duplicate parameter"),
+    ("func f(a) { return a; } f(1, 2)", "expects 1 argument"),
+    ("func f() { return y; } f()", "Variable 'y' is not defined"),
+])
+def test_function_errors(interpreter, source, message):
+    with pytest.raises(Exception, match=message):
+        run_source(source, interpreter)
+
+def test_memo_functions_may_call_memo_functions_and_builtins(interpreter):
+    program = """
+    memo func sq(n) { return n * n; }
+    memo func f(n) { return sq(n) + len([n, n]); }
+    f(3)
+    """
+    assert run_source(program, interpreter) == 11
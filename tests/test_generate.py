@@ -0,0 +1,42 @@
+#Synthetic program generator
+
+from benchmarks.generate import generate_program, expected_output, main
+from src.program import Program
+import io
+import pytest
+
+def test_same_seed_same_program():
+    assert generate_program(7, target_bytes=3000) == generate_program(7, target_bytes=3000)
+    assert generate_program(7, target_bytes=3000) != generate_program(8, target_bytes=3000)
+
+def test_size_and_depth_targets():
+    source = generate_program(1, target_bytes=50000, max_depth=2)
+    assert 50000 <= len(source) < 60000
+    depth = deepest = 0
+    for char in source:
+        depth += {'{': 1, '}': -1}.get(char, 0)
+        deepest = max(deepest, depth)
+    # Blocks nest max_depth deep; a one-line clamp guard may add one more level
+    assert deepest <= 3
+
+@pytest.mark.parametrize("seed", range(5))
+def test_programs_run_identically_at_every_optimize_level(seed):
+    source = generate_program(seed, target_statements=300, max_depth=4)
+    expected = expected_output(source)
+    for level in (1, 2):
+        output = io.StringIO()
+        Program(source, optimize=level).run(output=output)
+        assert output.getvalue() == expected
+
+def test_cli_writes_program_and_expected_output(tmp_path):
+    program = tmp_path / "prog.txt"
+    expected = tmp_path / "prog.out"
+    assert main(['--seed', '2', '--statements', '50', '-o', str(program), '--expected', str(expected)]) == 0
+    assert expected.read_text() == expected_output(program.read_text())
+
+def test_programs_use_for_loops():
+    source = generate_program(3, target_statements=300)
+    assert "for (k" in source
+    output = io.StringIO()
+    Program(source).run(output=output)
+    assert output.getvalue() == expected_output(source)
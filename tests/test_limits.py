@@ -0,0 +1,59 @@
+#Memory accounting and limits
+
+from src.program import Program
+from src.interpreter import Interpreter
+from src.lexer import Lexer
+from src.my_parser import Parser
+from src.limits import MemoryAccountant, MemoryLimitError, str_size, value_size
+from src.environment import Snapshot
+import pytest
+
+def run_source(source, interpreter):
+    result = None
+    for node in Parser(Lexer(source)).parse():
+        val = interpreter.visit(node)
+        if val is not None:
+            result = val
+    return result
+
+@pytest.mark.parametrize("optimize", [0, 1, 2])
+@pytest.mark.parametrize("source", [
+    'x = "x" * 1000000000;',
+    'x = 1000000000 * "x";',
+    's = "ab"; while (true) { s = s + s; }',
+    'x = 3; while (true) { x = x * x; }',
+    'a = [1]; while (true) { append(a, 2); }',
+])
+def test_per_value_limit_stops_growth(source, optimize):
+    accountant = MemoryAccountant(max_value_bytes=100000)
+    with pytest.raises(MemoryLimitError, match="per-value limit"):
+        Program(source, optimize=optimize).run(accountant=accountant)
+    assert accountant.largest_value <= 100000
+
+def test_per_run_limit_counts_globals():
+    accountant = MemoryAccountant(max_total_bytes=50000)
+    source = 'i = 0; while (i < 100) { i = i + 1; if (i == 10) { a = "x" * 10000; } if (i == 20) { b = a + a; } if (i == 30) { c = b + b; } }'
+    with pytest.raises(MemoryLimitError, match="per-run limit"):
+        Program(source).run(accountant=accountant)
+    # a and b were stored before c was refused
+    assert accountant.total >= str_size(30000)
+    assert accountant.peak > accountant.total
+
+def test_reassignment_releases_memory():
+    interpreter = Interpreter(accountant=MemoryAccountant(max_total_bytes=30000))
+    run_source('i = 0; while (i < 50) { s = "y" * 20000; s = 0; i = i + 1; }', interpreter)
+    stats = interpreter.accountant.stats()
+    assert stats['total'] < 1000
+    assert str_size(20000) <= stats['peak'] < 30000
+
+@pytest.mark.parametrize("engine", ['recursive', 'stack'])
+def test_inherited_globals_are_counted(engine):
+    snapshot = Snapshot([{'big': "x" * 100000, 'small': 1}])
+    accountant = MemoryAccountant()
+    Program('big = "y"; small = 2;').run(snapshot=snapshot, accountant=accountant, engine=engine)
+    assert accountant.total == value_size("y") + value_size(2)
+    assert accountant.peak == value_size("x" * 100000) + value_size(1)
+
+def test_no_accountant_means_no_limits(capsys):
+    Program('print len("ab" * 300000);').run()
+    assert capsys.readouterr().out == "600000\n"
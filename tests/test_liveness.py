@@ -0,0 +1,185 @@
+#Liveness analysis and early release of dead values
+
+from src.program import Program
+from src.lexer import Lexer
+from src.my_parser import Parser, Release
+from src.optimizer import release_dead_values
+from src.type_infer import infer_types
+from src.limits import MemoryAccountant, MemoryLimitError
+from src.cli import main
+import asyncio
+import io
+import pytest
+
+ENGINES = ['recursive', 'stack']
+
+PIPELINE = """
+text = "ab" * n;
+upper = text + text;
+print len(upper);
+unused = 42;
+total = 0;
+i = 0;
+while (i < 3) {
+    part = text + "!";
+    total = total + len(part);
+    i = i + 1;
+}
+for (k = 0; 2) { total = total + k; }
+if (total > 10) { big = text * 2; print len(big); } else { print 0; }
+print total;
+"""
+
+def parse(source):
+    return Parser(Lexer(source)).parse()
+
+def run(source, engine='recursive', optimize=0, liveness=True, inputs=None, **variables):
+    output = io.StringIO()
+    program = Program(source, optimize=optimize, liveness=liveness)
+    result = program.run(variables=variables, inputs=inputs, output=output, engine=engine)
+    return output.getvalue().split(), result
+
+def test_releases_after_the_last_use():
+    statements, stats = release_dead_values(parse("a = 1; b = a + 1; print b; print a;"))
+    assert [repr(stmt) for stmt in statements] == [
+        "VarAssign(a, Num(1))",
+        "VarAssign(b, BinOp(VarAccess(a), +, Num(1)))",
+        "PrintStmt(VarAccess(b))",
+        "Release(b)",
+        "PrintStmt(VarAccess(a))",
+        "Release(a)",
+    ]
+    assert stats.releases == 2 and stats.names_released == 2 and stats.dead_stores == 0
+
+def test_loops_keep_values_read_by_later_iterations():
+    source = "s = 1; t = 0; while (t < 5) { u = s + t; t = u; } print t;"
+    statements, _ = release_dead_values(parse(source))
+    loop = statements[2]
+    # s is read by every iteration; u is dead once copied into t
+    assert [repr(stmt) for stmt in loop.body] == [
+        "VarAssign(u, BinOp(VarAccess(s), +, VarAccess(t)))",
+        "VarAssign(t, VarAccess(u))",
+        "Release(u)",
+    ]
+    assert repr(statements[3]) == "Release(s, u)"
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("optimize", [0, 1, 2, 3])
+def test_same_output_and_no_variables_left(engine, optimize):
+    expected, plain = run(PIPELINE, engine, optimize, liveness=False, n=4)
+    printed, result = run(PIPELINE, engine, optimize, n=4)
+    assert printed == expected == ["16", "16", "28"]
+    assert 'unused' in plain.variables
+    assert dict(result.variables) == {}
+
+def test_keep_names_and_host_variables():
+    printed, result = run(PIPELINE, liveness=['total', 'text'], n=2)
+    assert printed == ["8", "8", "16"]
+    assert set(result.variables) == {'total', 'text'}
+    # A host variable the program never reads is left alone
+    _, result = run("print 1;", other=5)
+    assert result.variables['other'] == 5
+
+def test_dead_stores():
+    statements, stats = release_dead_values(parse('a = 1; b = "x"; c = [1, a]; d = a or false; e = 0;'))
+    # a stays: a dead store still reads it when it runs under an accountant
+    assert stats.dead_stores == 3
+    assert [type(stmt).__name__ for stmt in statements[1:7]] == [
+        "DeadStore", "Release", "DeadStore", "Release", "DeadStore", "Release"]
+    assert repr(statements[1]) == "DeadStore(VarAssign(b, String('x')))"
+    assert repr(statements[6]) == "Release(a, d)"
+    # Operators whose types are not proven might raise, so they stay
+    statements = parse("x = 2; y = x == 3; z = 1;")
+    _, stats = release_dead_values(statements)
+    assert stats.dead_stores == 0
+    statements = parse("x = 2; y = x == 3; z = 1;")
+    infer_types(statements)
+    _, stats = release_dead_values(statements)
+    assert stats.dead_stores == 1
+    # Arithmetic may overflow or allocate, even with proven types
+    statements = parse('x = 2; y = x * 3; s = "ab" + "c"; z = 1;')
+    infer_types(statements)
+    _, stats = release_dead_values(statements)
+    assert stats.dead_stores == 0
+
+@pytest.mark.parametrize("source", [
+    "x = 1 / 0; y = 1;",
+    "x = missing; y = 1;",
+    'x = "a" - 1; y = 1;',
+    "x = [1, 2][5]; y = 1;",
+    'x = "a" * 100000000000000000000; y = 1; print y;',
+    'x = 1 < "a"; y = 1; print y;',
+])
+def test_dead_stores_that_can_fail_still_run(source):
+    with pytest.raises(Exception):
+        run(source, optimize=1)
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("source", [
+    's = "abcdefgh"; big = s * 100000; z = 1; print z;',
+    'x = "%s"; y = 1; print y;' % ("a" * 2000),
+], ids=["repeat", "literal"])
+def test_dead_stores_run_under_an_accountant(engine, source):
+    program = Program(source, optimize=1, liveness=True)
+    with pytest.raises(MemoryLimitError):
+        program.run(output=io.StringIO(), engine=engine, accountant=MemoryAccountant(max_value_bytes=1000))
+    # Without an accountant a dead store is skipped, and its variable released
+    _, result = run('x = 1; print x; x = "%s"; y = 1; print y;' % ("a" * 2000), engine, optimize=1)
+    assert dict(result.variables) == {}
+
+def test_dead_stores_with_effects_still_run():
+    printed, result = run("a = input(); b = input(); print b;", inputs="first\nsecond")
+    assert printed == ["second"]
+    source = "func f() { print 7; return 1; } x = f(); y = 2;"
+    assert run(source)[0] == ["7"]
+
+def test_the_last_assignment_is_the_result():
+    _, result = run("a = 3; b = a * 2;")
+    assert result.result == 6 and dict(result.variables) == {}
+
+def test_globals_read_by_functions_are_pinned():
+    source = """
+    scale = 10;
+    data = [1, 2];
+    func scaled(x) { return x * scale; }
+    func add(x) { append(data, x); return len(data); }
+    print scaled(2);
+    print add(3);
+    """
+    program = Program(source, liveness=True)
+    assert program.report['liveness'].pinned == 2
+    output = io.StringIO()
+    result = program.run(output=output)
+    assert output.getvalue().split() == ["20", "3"]
+    assert set(result.variables) == {'scale', 'data'}
+
+def test_calls_to_unknown_functions_pin_everything():
+    # get() may come from a snapshot and read any global
+    statements, stats = release_dead_values(parse("x = 5; y = 1; print get();"))
+    assert not any(isinstance(stmt, Release) for stmt in statements)
+    assert len(statements) == 3 and stats.pinned == 2
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_accounted_peak_drops(engine):
+    source = 'a = "x" * 100000; print len(a); b = "y" * 100000; print len(b);'
+    peaks = {}
+    for liveness in (False, True):
+        accountant = MemoryAccountant()
+        Program(source, liveness=liveness).run(output=io.StringIO(), engine=engine,
+                                                accountant=accountant)
+        peaks[liveness] = accountant.peak
+        if liveness:
+            assert accountant.total == 0
+    assert peaks[True] < peaks[False] - 90000
+
+def test_async_engine():
+    output = io.StringIO()
+    result = asyncio.run(Program(PIPELINE, liveness=True).run_async(variables={'n': 4}, output=output))
+    assert output.getvalue().split() == ["16", "16", "28"]
+    assert dict(result.variables) == {}
+
+def test_cli_flag(tmp_path, capsys):
+    path = tmp_path / "script.txt"
+    path.write_text('s = "ab" * 3; print s; t = 1;')
+    assert main(['run', str(path), '--liveness', '--engine', 'stack']) == 0
+    assert capsys.readouterr().out == "ababab\n"
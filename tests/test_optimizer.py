@@ -0,0 +1,89 @@
+#Hash-consing and common subexpression elimination
+
+from src.lexer import Lexer
+from src.my_parser import Parser
+from src.interpreter import Interpreter
+from src.optimizer import intern_subtrees, eliminate_common_subexpressions
+from src.program import Program
+import io
+import sys
+import pytest
+
+def parse(source):
+    return Parser(Lexer(source)).parse()
+
+PROGRAMS = [
+    'a = 2; b = 3; c = 4; if ((a * b + c) > 5) { x = (a * b + c) * 2; } y = a * b + c;',
+    'x = 1; y = x * 2; x = 5; z = x * 2; print z - y;',
+    'i = 0; t = 0; while (i * 2 < 10) { t = t + i * 2; i = i + 1; } print t; print i * 2;',
+    'a = 1; if (a > 0) { b = a + 1; } else { b = a + 1; a = 3; } print (a + 1) * (b + 1); print a + 1;',
+    's = "ab"; n = 3; print s * n + "!"; print s * n; n = 0; print s * n;',
+    # Arrays changed through a function parameter or an alias
+    'func f(r) { append(r, 9); return 0; } a = [1, 2]; x = a * 2; z = f(a); y = a * 2; print y;',
+    'a = [1, 2]; b = a; x = a * 2; append(b, 5); y = a * 2; print y;',
+    'func f(r) { append(r, 9); return 1; } a = [1]; x = len(a * 2); print len(a * 2) + f(a) + len(a * 2);',
+    'func f(r) { append(r, 1); return 0; } a = [1]; i = 0; x = len(a * 2); '
+    'while (len(a * 2) < 8) { i = i + f(a); } for (j = 0; 2) { print a * 2; f(a); }',
+]
+
+@pytest.mark.parametrize("source", PROGRAMS)
+@pytest.mark.parametrize("level", [1, 2, 3])
+def test_optimized_programs_match(source, level):
+    expected_out, optimized_out = io.StringIO(), io.StringIO()
+    expected = Program(source).run(output=expected_out)
+    optimized = Program(source, optimize=level).run(output=optimized_out)
+    assert optimized_out.getvalue() == expected_out.getvalue()
+    assert str(optimized.variables) == str(expected.variables)
+    assert str(optimized.result) == str(expected.result)
+
+def test_cse_reuses_within_region():
+    _, stats = eliminate_common_subexpressions(parse(PROGRAMS[0]))
+    assert stats.stores == 1
+    assert stats.loads == 2
+    assert stats.nodes_saved == 10
+
+def test_cse_respects_reassignment():
+    _, stats = eliminate_common_subexpressions(parse('x = a * b; a = 1; y = a * b;'))
+    assert stats.loads == 0
+
+def test_cse_skips_input():
+    _, stats = eliminate_common_subexpressions(parse('x = input() + "a"; y = input() + "a";'))
+    assert stats.loads == 0
+
+def test_cse_counts_evaluations_avoided():
+    statements, stats = eliminate_common_subexpressions(parse(PROGRAMS[2]))
+    assert stats.loads == 2
+    interpreter = Interpreter(output=io.StringIO())
+    for stmt in statements:
+        interpreter.visit(stmt)
+    # i * 2 (3 nodes) is reused once per iteration (5) and once after the loop
+    assert interpreter.evaluations_avoided == 18
+
+def test_cse_invalidates_after_calls_and_appends():
+    source = 'x = a * 2; z = f(a); y = a * 2; append(b, 1); w = a * 2;'
+    _, stats = eliminate_common_subexpressions(parse(source))
+    assert stats.loads == 0
+
+def test_interning_shares_subtrees():
+    source = "\n".join(f"x{i} = (price * qty + 1) * (price * qty + 1);" for i in range(20))
+    statements, stats = intern_subtrees(parse(source))
+    assert stats.nodes_after < stats.nodes_before
+    assert stats.bytes_saved > 0
+    assert statements[0].value is statements[19].value
+    assert statements[0].value.left is statements[0].value.right
+
+def test_program_reports_passes():
+    program = Program(PROGRAMS[0], optimize=2)
+    assert set(program.report) == {'cse', 'intern', 'types'}
+    assert Program(PROGRAMS[0]).report == {}
+
+@pytest.mark.parametrize("level", [1, 2, 3])
+def test_deep_expressions_do_not_hit_python_limit(level):
+    terms = " + ".join(["1"] * (sys.getrecursionlimit() * 5))
+    source = f"i = 0; while (i < 2) {{ x = i + {terms}; y = a + {terms}; i = i + 1; }} print x; print y;"
+    expected = sys.getrecursionlimit() * 5
+    for liveness in (False, True):
+        output = io.StringIO()
+        program = Program(source, optimize=level, liveness=liveness)
+        program.run(variables={'a': 0}, output=output, engine='stack')
+        assert output.getvalue() == f"{expected + 1}\n{expected}\n"
@@ -0,0 +1,98 @@
+#Parallel lexing and parsing
+
+from src.lexer import Lexer, Token
+from src.my_parser import Parser
+from src.parallel_parse import split_source, parse_parallel
+from src.positions import SourceError
+from src.program import Program
+import io
+import pickle
+import pytest
+
+SOURCE = """
+x = 1;
+s = "a; b } c \\" ; {";
+if (x > 0) { print s; }
+else { print "no"; }
+func f(a) { if (a > 1) { return a; } return 0; }
+while (x < 5) { x = x + 1; }
+xs = [1, 2];
+append(xs, f(3));
+print xs;
+y = x + 2
+print y
+"""
+
+def dump(node):
+    # Structural dump including token and node positions
+    if isinstance(node, list):
+        return [dump(item) for item in node]
+    if isinstance(node, Token):
+        return ('Token', node.type, node.value, node.pos)
+    if hasattr(node, '__dict__'):
+        return (type(node).__name__, {name: dump(value) for name, value in vars(node).items()})
+    return node
+
+def serial(source):
+    return Parser(Lexer(source)).parse()
+
+def chunks(source, chunk_size):
+    cuts = split_source(source, chunk_size) + [len(source)]
+    return [source[cuts[index]:cuts[index + 1]] for index in range(len(cuts) - 1)]
+
+def test_split_at_top_level_boundaries():
+    pieces = chunks(SOURCE, 1)
+    assert "".join(pieces) == SOURCE
+    assert pieces[0] == "\nx = 1;"
+    # Not inside the string, not before else, not inside braces
+    assert pieces[1] == '\ns = "a; b } c \\" ; {";'
+    assert pieces[2] == '\nif (x > 0) { print s; }\nelse { print "no"; }'
+    assert pieces[3] == "\nfunc f(a) { if (a > 1) { return a; } return 0; }"
+    # Statements without semicolons stay with the next boundary
+    assert pieces[-1] == "\ny = x + 2\nprint y\n"
+
+def test_chunk_size_is_a_minimum():
+    pieces = chunks(SOURCE, 40)
+    assert all(len(piece) >= 40 for piece in pieces[:-1])
+    assert len(pieces) < len(chunks(SOURCE, 1))
+    assert split_source(SOURCE, len(SOURCE)) == [0]
+
+def test_else_is_case_insensitive_and_whole_word():
+    source = "if (true) { x = 1; } ELSE { x = 2; } elsewhere = 3;"
+    assert chunks(source, 1) == ["if (true) { x = 1; } ELSE { x = 2; }", " elsewhere = 3;"]
+
+def test_unbalanced_brace_stops_splitting():
+    assert split_source("x = 1; } y = 2; z = 3;", 1) == [0, 6]
+
+def test_matches_serial_parse():
+    source = SOURCE * 20
+    assert dump(parse_parallel(source, workers=2, chunk_size=200)) == dump(serial(source))
+
+def test_single_chunk_parses_serially():
+    assert dump(parse_parallel(SOURCE, workers=2)) == dump(serial(SOURCE))
+
+@pytest.mark.parametrize("error", ["x = 1 +;", "if (x) { y = 1; } else print 2;", "x = 2 $ 3;", "return 1;"])
+def test_errors_match_serial(error):
+    source = SOURCE * 5 + "\n" + error + "\n" + SOURCE
+    with pytest.raises(SourceError) as expected:
+        serial(source)
+    with pytest.raises(SourceError) as raised:
+        parse_parallel(source, workers=2, chunk_size=100)
+    assert str(raised.value) == str(expected.value)
+    assert raised.value.pos == expected.value.pos
+    assert raised.value.line == SOURCE.count("\n") * 5 + 2
+
+def test_lexer_offset():
+    tokens = Lexer("print 1;", offset=100).tokenize()
+    assert [token.pos for token in tokens] == [100, 106, 107, 108]
+
+def test_tokens_pickle():
+    token = pickle.loads(pickle.dumps(Token('INT', 7, 12)))
+    assert (token.type, token.value, token.pos) == ('INT', 7, 12)
+
+def test_program_parse_workers():
+    output = io.StringIO()
+    Program(SOURCE * 3, parse_workers=2).run(output=output)
+    expected = io.StringIO()
+    Program(SOURCE * 3).run(output=expected)
+    assert output.getvalue() == expected.getvalue()
@@ -0,0 +1,76 @@
+#Source positions on tokens and in lexer/parser errors
+
+from src.lexer import Lexer, TokenStream
+from src.my_parser import Parser
+from src.positions import LineIndex, SourceError
+from src.my_token import TT_EOF
+import pytest
+
+def parse(source, pre_lexed=False):
+    lexer = Lexer(source)
+    if pre_lexed:
+        return Parser(TokenStream(lexer.tokenize(), lexer.lines)).parse()
+    return Parser(lexer).parse()
+
+def test_tokens_carry_offsets():
+    source = 'x = 12;\n  print "hi";'
+    tokens = Lexer(source).tokenize()
+    assert [(t.value, t.pos) for t in tokens[:4]] == [('x', 0), ('=', 2), (12, 4), (';', 6)]
+    assert tokens[4].pos == source.index('print')
+    assert tokens[5].pos == source.index('"hi"')
+    assert tokens[-1].type == TT_EOF and tokens[-1].pos == len(source)
+
+def test_line_index():
+    lines = LineIndex("ab\ncd\n\nef")
+    assert lines.line_col(0) == (1, 1)
+    assert lines.line_col(2) == (1, 3)     # the newline belongs to its line
+    assert lines.line_col(4) == (2, 2)
+    assert lines.line_col(6) == (3, 1)
+    assert lines.line_col(8) == (4, 2)
+    assert [lines.line_text(n) for n in (1, 2, 3, 4)] == ['ab', 'cd', '', 'ef']
+
+@pytest.mark.parametrize("source, message, line, column", [
+    ('x = 1;\ny = 2;\nprint "abc;', "Unterminated string literal", 3, 7),
+    ('x = 1;\n   y = 3 @ 4;', "Invalid character: @", 2, 10),
+    ('x = 1;\ny = 5.;', "Malformed number '5.'", 2, 5),
+    ('print 1 ! 2;', "Expected '=' after '!'", 1, 9),
+])
+def test_lexer_error_positions(source, message, line, column):
+    with pytest.raises(SourceError) as info:
+        Lexer(source).tokenize()
+    assert info.value.message == message
+    assert (info.value.line, info.value.column) == (line, column)
+    assert str(info.value) == f"{message} (line {line}, column {column})"
+
+@pytest.mark.parametrize("pre_lexed", [False, True])
+def test_parser_error_positions(pre_lexed):
+    source = 'x = 1;\nif (x > 0) {\n    print x +;\n}'
+    with pytest.raises(SourceError) as info:
+        parse(source, pre_lexed)
+    assert (info.value.line, info.value.column) == (3, 14)
+    assert "at token SEMI" in str(info.value)
+    assert str(info.value).endswith("(line 3, column 14)")
+
+def test_statement_errors_point_at_statement_start():
+    source = 'memo func f(n) {\n  return n;\n}\nmemo func g(n) {\n  print n;\n  return n;\n}'
+    with pytest.raises(SourceError, match="must not print") as info:
+        parse(source)
+    assert (info.value.line, info.value.column) == (4, 1)
+
+def test_line_index_built_only_on_error():
+    lexer = Lexer('x = 1;\ny = x + 2;\nprint y;')
+    Parser(lexer).parse()
+    assert lexer.lines._starts is None
+    with pytest.raises(SourceError):
+        Parser(Lexer('x = ;')).parse()
+
+def test_errors_without_positions():
+    # Hand-built token lists have no offsets; errors keep the plain message
+    lexer = Lexer('x = ;')
+    tokens = lexer.tokenize()
+    for token in tokens:
+        token.pos = None
+    with pytest.raises(SourceError) as info:
+        Parser(TokenStream(tokens)).parse()
+    assert info.value.line is None
+    assert "line" not in str(info.value)
@@ -0,0 +1,149 @@
+#Profile-guided optimisation
+
+from src.program import Program
+from src.profile_guided import (
+    Profile, record_profile, load_profile, profile_path, apply_profile,
+    guarded_binop, main, MIN_SAMPLES
+)
+from src.stack_interpreter import StackInterpreter, LAZY
+from src.lexer import Lexer
+from src.my_parser import Parser, BinOp, IfStmt, WhileStmt
+import io
+import json
+import operator
+import pytest
+
+SOURCE = """
+total = 0;
+i = 0;
+while (i < n) {
+    x = i * scale;
+    if (x > 10) { total = total + x / 2; } else { total = total + x; }
+    if (i < 0) { print "never"; total = 0; }
+    i = i + 1;
+}
+while (false) { print "no"; }
+print total;
+"""
+
+def run(program, engine='recursive', n=40, scale=3):
+    output = io.StringIO()
+    program.run(variables={'n': n, 'scale': scale}, output=output, engine=engine)
+    return output.getvalue()
+
+def profiled(runs=1):
+    profile = record_profile(SOURCE, variables={'n': 40, 'scale': 3}, output=io.StringIO())
+    for _ in range(runs - 1):
+        profile.merge(record_profile(SOURCE, variables={'n': 40, 'scale': 3}, output=io.StringIO()))
+    return profile
+
+def test_records_branches_loops_and_types():
+    profile = profiled()
+    assert profile.runs == 1
+    first_if = SOURCE.index("if (x")
+    assert profile.branches[first_if] == [36, 4]     # x > 10 from i = 4
+    assert profile.branches[SOURCE.index("if (i < 0")] == [0, 40]
+    assert profile.loops[SOURCE.index("while (i")] == [1, 40]
+    assert profile.loops[SOURCE.index("while (false")] == [1, 0]
+    assert profile.binops[SOURCE.index("* scale")] == {'int,int': 40}
+    assert profile.binops[SOURCE.index("/ 2")] == {'int,int': 36}
+    assert profile.binops[SOURCE.index("+ x / 2")] == {'int,float': 1, 'float,float': 35}
+
+def test_merge_and_save_round_trip(tmp_path):
+    profile = profiled(runs=3)
+    assert profile.runs == 3
+    assert profile.loops[SOURCE.index("while (i")] == [3, 120]
+    script = tmp_path / "script.txt"
+    script.write_text(SOURCE)
+    profile.save(profile_path(str(script)))
+    loaded = load_profile(str(script), SOURCE)
+    assert loaded.to_dict() == profile.to_dict()
+    # A profile of other source text is ignored
+    assert load_profile(str(script), SOURCE + "\nprint 1;") is None
+    with pytest.raises(Exception, match="different sources"):
+        loaded.merge(Profile("other"))
+
+@pytest.mark.parametrize("optimize", [0, 1, 2])
+@pytest.mark.parametrize("engine", ['recursive', 'stack'])
+def test_profile_never_changes_results(optimize, engine):
+    profile = profiled()
+    plain = Program(SOURCE, optimize=optimize)
+    guided = Program(SOURCE, optimize=optimize, profile=profile)
+    report = guided.report['profile']
+    # The `while (false)` loop was entered only once: too few samples
+    assert report.specialized > 0 and report.cold_blocks == 1
+    # Same inputs as recorded, and inputs that miss every guard and run cold code
+    for n, scale in ((40, 3), (40, 1.5), (5, -1), (3, "ab")):
+        try:
+            expected = run(plain, engine, n, scale)
+        except Exception as e:
+            with pytest.raises(Exception, match=str(e)[:20]):
+                run(guided, engine, n, scale)
+        else:
+            assert run(guided, engine, n, scale) == expected
+
+def test_guards_are_ordered_by_frequency():
+    profile = profiled()
+    pos = SOURCE.index("+ x / 2")
+    statements = Parser(Lexer(SOURCE)).parse()
+    apply_profile(statements, profile)
+    site = [node for node in _binops(statements) if node.op.pos == pos][0]
+    # float,float (35 samples) is checked before int,float (1 sample)
+    assert site.fast.pairs == ((float, float), (int, float))
+    guarded = guarded_binop(site.op, ((float, float), (int, float)), operator.add)
+    assert guarded(1.5, 2.0) == 3.5 and guarded(1, 2.0) == 3.0
+    assert guarded("a", "b") == "ab"     # guard miss: checked path
+    with pytest.raises(Exception, match="unsupported operand"):
+        guarded("a", 1)
+
+def _binops(statements):
+    pending, found = list(statements), []
+    while pending:
+        node = pending.pop()
+        if isinstance(node, BinOp):
+            found.append(node)
+            pending += [node.left, node.right]
+        elif isinstance(node, IfStmt):
+            pending += [node.condition] + node.true_block + (node.false_block or [])
+        elif isinstance(node, WhileStmt):
+            pending += [node.condition] + node.body
+        elif hasattr(node, 'value') and not isinstance(node.value, (int, float, str, bool)):
+            pending.append(node.value)
+        elif hasattr(node, 'expr'):
+            pending.append(node.expr)
+    return found
+
+def test_rarely_run_sites_are_left_alone():
+    profile = record_profile(SOURCE, variables={'n': MIN_SAMPLES - 1, 'scale': 3}, output=io.StringIO())
+    report = Program(SOURCE, profile=profile).report['profile']
+    assert report.specialized == 0 and report.cold_blocks == 0
+
+def test_stack_engine_flattens_cold_blocks_lazily():
+    program = Program(SOURCE, profile=profiled())
+    interpreter = StackInterpreter(output=io.StringIO())
+    interpreter.global_vars.update({'n': 40, 'scale': 3, 'i': 0, 'total': 0})
+    loop = program.statements[2]
+    interpreter.visit(loop)
+    code = interpreter._code[id(loop)][1]
+    lazy = [arg for op, arg in code if op == LAZY]
+    assert len(lazy) == 1 and id(lazy[0]) not in interpreter._code
+    # Reaching the cold block flattens and runs it
+    interpreter.global_vars.update({'i': -2, 'total': 5})
+    interpreter.visit(loop)
+    assert id(lazy[0]) in interpreter._code
+    assert interpreter.output.getvalue().count("never") == 2
+
+def test_cli_record_and_report(tmp_path, capsys):
+    script = tmp_path / "script.txt"
+    script.write_text(SOURCE.replace("n)", "30)").replace("i * scale", "i * 3"))
+    assert main(['record', str(script), '-q']) == 0
+    assert main(['record', str(script), '-q']) == 0
+    saved = json.loads((tmp_path / "script.txt.profile.json").read_text())
+    assert saved['runs'] == 2
+    assert main(['report', str(script)]) == 0
+    report = capsys.readouterr().out
+    assert "profile of 2 run(s)" in report
+    assert "while: entered 2, 60 iterations (30.0 per entry)" in report
+    assert "4:1 while" in report
+    script.write_text("print 1;")
+    assert main(['report', str(script)]) == 1
@@ -0,0 +1,43 @@
+#Compile-once, run-many programs
+
+from src.program import Program
+import io
+import pytest
+
+RULE = """
+if (price * qty > limit) {
+    verdict = "review";
+} else {
+    verdict = "ok";
+}
+total = price * qty;
+"""
+
+def test_run_many_with_variables():
+    program = Program(RULE)
+    first = program.run({'price': 10, 'qty': 5, 'limit': 40})
+    second = program.run({'price': 1, 'qty': 5, 'limit': 40})
+    assert first.variables['verdict'] == "review"
+    assert second.variables['verdict'] == "ok"
+    assert second.result == 5
+
+def test_no_state_leaks_between_runs():
+    program = Program('if (seen == 0) { counter = 1; } seen = 1;')
+    initial = {'seen': 0}
+    assert 'counter' in program.run(initial).variables
+    # The caller's mapping is not modified and the next run starts clean
+    assert initial == {'seen': 0}
+    with pytest.raises(Exception):
+        Program('counter').run()
+
+@pytest.mark.parametrize("inputs", ["Ann\nBob", ["Ann", "Bob"], iter(["Ann", "Bob"]).__next__])
+def test_input_sources_and_output_sink(inputs):
+    out = io.StringIO()
+    Program('a = input(); b = input(); print a + " & " + b;').run(inputs=inputs, output=out)
+    assert out.getvalue() == "Ann & Bob\n"
+
+def test_program_is_immutable():
+    program = Program("x = 1;")
+    assert isinstance(program.statements, tuple)
+    with pytest.raises(AttributeError):
+        program.statements = ()
@@ -0,0 +1,78 @@
+#Server mode with warm worker processes
+
+from src.server import InterpreterServer, Client, program_id
+from benchmarks.bench_server import load_test
+import asyncio
+import threading
+import pytest
+
+@pytest.fixture(params=['unix', 'tcp'])
+def address(request, tmp_path):
+    # Run a server on its own event loop thread for the test
+    ready = threading.Event()
+    state = {}
+
+    async def serve():
+        server = InterpreterServer(workers=1, cache_size=4, timeout=2)
+        path = str(tmp_path / "server.sock") if request.param == 'unix' else None
+        state['address'] = await server.start(path)
+        state['loop'] = asyncio.get_running_loop()
+        state['stop'] = asyncio.Event()
+        ready.set()
+        await state['stop'].wait()
+        await server.close()
+
+    thread = threading.Thread(target=lambda: asyncio.run(serve()))
+    thread.start()
+    assert ready.wait(30)
+    address = state['address']
+    yield {'path': address} if isinstance(address, str) else {'port': address[1]}
+    state['loop'].call_soon_threadsafe(state['stop'].set)
+    thread.join()
+
+def test_run_and_cached_program(address):
+    source = 'print "hi " + name; 2 * n'
+    with Client(**address) as client:
+        first = client.run(source, variables={'name': 'Ann', 'n': 21}, id=1)
+        assert first['ok'] and first['id'] == 1
+        assert first['output'] == "hi Ann\n"
+        assert first['result'] == 42
+        assert first['program'] == program_id(source)
+        assert not first['stats']['cached']
+        again = client.run(program=first['program'], variables={'name': 'Bo', 'n': 1})
+        assert again['output'] == "hi Bo\n"
+        assert again['stats']['cached']
+        assert set(again['stats']) >= {'compile_ms', 'run_ms', 'queue_ms', 'total_ms', 'worker'}
+
+def test_inputs_arrays_and_engines(address):
+    with Client(**address) as client:
+        response = client.run('a = input(); b = input(); xs = data; append(xs, 4); print b + a; xs',
+                              inputs=["x", "y"], variables={'data': [1, 2, 3]}, engine='stack')
+        assert response['output'] == "yx\n"
+        assert response['result'] == [1, 2, 3, 4]
+        compiled = client.compile("x = 1 + 2;", optimize=1)
+        assert compiled['ok'] and compiled['statements'] == 1
+        assert client.run(program=compiled['program'])['result'] == 3
+
+def test_errors(address):
+    with Client(**address) as client:
+        failed = client.run('print "before"; x = 1 / 0;')
+        assert not failed['ok']
+        assert failed['output'] == "before\n"
+        assert failed['error'] == "Division by zero undefined"
+        assert client.run('while (true) { x = 1; }', timeout=0.2)['error_type'] == 'ScriptTimeout'
+        assert "Unknown program id" in client.run(program="nope")['error']
+        assert "Unknown op" in client.request(op='explode')['error']
+        client.file.write(b"not json\n")
+        client.file.flush()
+        assert "Invalid JSON" in client.file.readline().decode()
+        # The connection still works after errors
+        assert client.request(op='ping')['ok']
+        stats = client.request(op='stats')['stats']
+        assert stats['workers'] == 1 and stats['errors'] >= 5
+
+def test_load_test_client(address):
+    results = load_test(lambda: Client(**address), connections=3, requests=10)
+    assert results['requests'] == 10 and results['errors'] == 0
+    assert results['latency_ms']['p50'] <= results['latency_ms']['max']
+    assert results['requests_per_second'] > 0
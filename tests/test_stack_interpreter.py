@@ -0,0 +1,100 @@
+#Explicit-stack evaluator
+
+from src.program import Program
+from src.stack_interpreter import StackInterpreter, compile_node, POP, JUMP
+from src.interpreter import Interpreter
+from src.limits import MemoryAccountant, MemoryLimitError
+from src.lexer import Lexer
+from src.my_parser import Parser
+from benchmarks.generate import generate_program
+import io
+import pytest
+
+def run(source, engine, optimize=0, **kwargs):
+    output = io.StringIO()
+    result = Program(source, optimize=optimize).run(output=output, engine=engine, **kwargs)
+    return output.getvalue(), result
+
+def test_long_chain_evaluates():
+    source = "x = " + " + ".join(["1"] * 100000) + "; print x - 1;"
+    assert run(source, 'stack')[0] == "99999\n"
+    with pytest.raises(RecursionError):
+        run(source, 'recursive')
+
+def test_long_chain_in_function_and_loop():
+    chain = " + ".join(["n"] * 50000)
+    source = f"""
+    func f(n) {{ return {chain}; }}
+    total = 0;
+    i = 0;
+    while (i < 3) {{ total = total + f(i); i = i + 1; }}
+    print total;
+    """
+    assert run(source, 'stack')[0] == "150000\n"
+
+def test_long_statement_chain_in_block():
+    body = "x = x + 1;\n" * 20000
+    source = f"x = 0; if (true) {{ {body} }} else {{ x = -1; }} print x;"
+    assert run(source, 'stack')[0] == "20000\n"
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("optimize", [0, 2])
+def test_matches_recursive_on_generated_programs(seed, optimize):
+    source = generate_program(seed, target_statements=150)
+    out_stack, result_stack = run(source, 'stack', optimize)
+    out_rec, result_rec = run(source, 'recursive', optimize)
+    assert out_stack == out_rec
+    assert str(result_stack.result) == str(result_rec.result)
+    assert {k: str(v) for k, v in result_stack.variables.items()} == \
+           {k: str(v) for k, v in result_rec.variables.items()}
+
+def test_counters_match_recursive():
+    source = """
+    a = [1, 2];
+    i = 0;
+    while (i < 5) { append(a, i); if (i > 2) { print a[i]; } i = i + 1; }
+    """
+    counters = {}
+    for cls in (Interpreter, StackInterpreter):
+        interpreter = cls(output=io.StringIO())
+        for stmt in Parser(Lexer(source)).parse():
+            interpreter.visit(stmt)
+        counters[cls] = interpreter.counters()
+    recursive, stack = counters[Interpreter], counters[StackInterpreter]
+    for name in ('loop_iterations', 'var_reads', 'var_writes', 'prints'):
+        assert recursive[name] == stack[name]
+    assert stack['nodes'] > 0
+
+def test_input_and_results():
+    output, result = run("x = input(); y = x + \"!\"; print y;", 'stack', inputs="hi")
+    assert output == "hi!\n"
+    assert result.result == "hi!"
+
+@pytest.mark.parametrize("source, message", [
+    ("print y;", "Variable 'y' is not defined"),
+    ("x = 1 / 0;", "Division by zero"),
+    ("x = 1 + \"a\";", "unsupported operand"),
+    ("x = [1, 2][5];", "out of range"),
+    ("func f(a) { return a; } x = f();", "expects 1 argument"),
+])
+def test_errors_match_recursive(source, message):
+    for engine in ('recursive', 'stack'):
+        with pytest.raises(Exception, match=message):
+            run(source, engine)
+
+def test_accountant_limits_apply():
+    source = 's = "ab"; i = 0; while (i < 20) { s = s + s; i = i + 1; }'
+    with pytest.raises(MemoryLimitError):
+        run(source, 'stack', optimize=1, accountant=MemoryAccountant(max_value_bytes=10000))
+
+def test_compiled_code_is_flat():
+    stmt = Parser(Lexer("while (x < 3) { x = x + 1; print x; }")).parse()[0]
+    code = compile_node(stmt, keep=False)
+    assert (JUMP, 0) in code
+    assert all(type(arg).__name__ != '_Label' for _, arg in code)
+    expr = Parser(Lexer("1 + 2;")).parse()[0]
+    assert compile_node(expr, keep=False)[-1] == (POP, None)
+
+def test_unknown_engine():
+    with pytest.raises(Exception, match="Unknown engine 'fast'"):
+        Program("x = 1;").run(engine='fast')
@@ -0,0 +1,47 @@
+#Run telemetry: phase timings and counters
+
+from src.stats import run_with_stats
+from src.interpreter import Interpreter
+import json
+import pytest
+
+@pytest.fixture
+def interpreter():
+    return Interpreter()
+
+def test_counters(interpreter, capsys):
+    program = """
+    x = 3;
+    while (x > 0) {
+        print x;
+        x = x - 1;
+    }
+    x
+    """
+    result, stats = run_with_stats(program, interpreter)
+    assert result == 0
+    assert stats.statements == 3
+    assert stats.counters['loop_iterations'] == 3
+    assert stats.counters['prints'] == 3
+    assert stats.counters['var_writes'] == 4
+    # 4 condition reads, 3 prints, 3 decrements and the final access
+    assert stats.counters['var_reads'] == 11
+    assert stats.counters['nodes'] > 0
+    assert capsys.readouterr().out == "3\n2\n1\n"
+
+def test_counters_are_per_run(interpreter):
+    run_with_stats("x = 1;", interpreter)
+    _, stats = run_with_stats("y = x + 1;", interpreter)
+    assert stats.counters['var_writes'] == 1
+    assert stats.counters['var_reads'] == 1
+
+def test_json_export_and_memory(interpreter):
+    _, stats = run_with_stats('s = "ab" * 1000;', interpreter, trace_memory=True)
+    data = json.loads(stats.to_json())
+    assert set(data['phases']) == {'lex', 'parse', 'exec', 'total'}
+    assert data['tokens'] == 7
+    assert data['peak_memory'] >= 2000
+
+def test_memory_not_traced_by_default(interpreter):
+    _, stats = run_with_stats("1 + 2", interpreter)
+    assert stats.peak_memory is None
@@ -0,0 +1,48 @@
+#Pipelined parse-and-execute
+
+from src.lexer import Lexer
+from src.my_parser import Parser
+from src.interpreter import Interpreter
+from src.streaming import run_streaming, iter_results
+import pytest
+import tracemalloc
+
+@pytest.fixture
+def interpreter():
+    return Interpreter()
+
+def test_same_result_as_full_parse(interpreter):
+    program = 'x = 2; while (x > 0) { x = x - 1; } if (x == 0) { y = "done"; } "!" + y'
+    assert run_streaming(program, interpreter) == "!done"
+    assert interpreter.global_vars == {'x': 0, 'y': "done"}
+
+def test_output_before_later_syntax_error(interpreter, capsys):
+    # The first statement runs before the broken one is even parsed
+    with pytest.raises(Exception):
+        run_streaming('print "first"; x = (1 + ;', interpreter)
+    assert capsys.readouterr().out == "first\n"
+
+def test_iter_results_is_lazy(interpreter):
+    results = iter_results("a = 1; b = a + 1; 10 * b", interpreter)
+    assert next(results) == 1
+    assert interpreter.global_vars == {'a': 1}
+    assert list(results) == [2, 20]
+
+def test_peak_memory_bounded_by_statement(interpreter):
+    source = "x = 0;\n" + "x = x + (1 + 2) * (3 - 4) / 5;\n" * 3000
+
+    def peak(run):
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    def full_parse():
+        full_interpreter = Interpreter()
+        for stmt in Parser(Lexer(source)).parse():
+            full_interpreter.visit(stmt)
+
+    full = peak(full_parse)
+    streamed = peak(lambda: run_streaming(source))
+    assert streamed * 4 < full
@@ -0,0 +1,63 @@
+#Sharing one compiled Program across threads
+
+from src.program import Program, run_in_threads
+from src.arrays import ArrayValue
+from benchmarks.bench_threads import bench_scaling
+import io
+import threading
+import pytest
+
+SOURCE = """
+memo func fib(n) {
+    if (n < 2) { return n; }
+    return fib(n - 1) + fib(n - 2);
+}
+values = seed;
+i = 0;
+while (i < 50) {
+    append(values, i * k + k * 2);
+    i = i + 1;
+}
+print fib(k + 20) + len(values) * (k * 2) + values[3];
+"""
+
+def expected(k):
+    output = io.StringIO()
+    Program(SOURCE).run(variables={'k': k, 'seed': ArrayValue([0, 1])}, output=output)
+    return output.getvalue()
+
+@pytest.mark.parametrize("optimize", [0, 2])
+def test_concurrent_runs_do_not_interfere(optimize):
+    program = Program(SOURCE, optimize=optimize)
+    seed = ArrayValue([0, 1])
+    threads = 8
+    barrier = threading.Barrier(threads)
+    outputs = {}
+
+    def worker(k):
+        barrier.wait()
+        for _ in range(3):
+            output = io.StringIO()
+            program.run(variables={'k': k, 'seed': seed}, output=output)
+            assert outputs.setdefault(k, output.getvalue()) == output.getvalue()
+
+    workers = [threading.Thread(target=worker, args=(k,)) for k in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    assert outputs == {k: expected(k) for k in range(threads)}
+    # The shared host array was never modified by any run
+    assert list(seed) == [0, 1]
+
+def test_run_in_threads_keeps_job_order_and_raises():
+    program = Program("y = 10 / x;")
+    results = run_in_threads(program, [{'variables': {'x': x}} for x in (1, 2, 4, 5)], workers=3)
+    assert [r.variables['y'] for r in results] == [10.0, 5.0, 2.5, 2.0]
+    with pytest.raises(Exception, match="Division by zero"):
+        run_in_threads(program, [{'variables': {'x': 1}}, {'variables': {'x': 0}}])
+
+def test_scaling_benchmark_runs():
+    rows = bench_scaling([1, 2], runs=2, repeat=1)
+    assert [row['threads'] for row in rows] == [1, 2]
+    assert rows[0]['speedup'] == 1.0
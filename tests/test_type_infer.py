@@ -0,0 +1,59 @@
+#Static type inference and unchecked fast paths
+
+from src.lexer import Lexer
+from src.my_parser import Parser
+from src.type_infer import infer_types
+from src.program import Program
+import operator
+import pytest
+
+def parse(source):
+    return Parser(Lexer(source)).parse()
+
+def test_tags_proven_sites():
+    statements = parse('x = 1; y = x + 2; s = "a" * y; print -y;')
+    report = infer_types(statements)
+    assert statements[1].value.fast is operator.add
+    assert statements[2].value.fast is operator.mul
+    assert statements[3].expr.fast is operator.neg
+    assert report.proven == report.sites == 3
+    assert report.errors == []
+
+def test_loop_fixpoint_widens_types():
+    statements = parse('x = 1; while (x < 10) { s = "n" * x; x = x + 0.5; }')
+    report = infer_types(statements)
+    body = statements[1].body
+    # x is int or float at the top of the loop: + is proven, repetition is not
+    assert body[0].value.fast is None
+    assert body[1].value.fast is operator.add
+    assert report.errors == []
+
+def test_unknown_and_mixed_types_stay_checked():
+    statements = parse('if (c) { v = "a"; } else { v = 1; } w = v + 1; z = host - 1;')
+    infer_types(statements)
+    assert statements[1].value.fast is None
+    assert statements[2].value.fast is None
+
+def test_guaranteed_type_errors_are_reported():
+    report = infer_types(parse('s = "a"; n = s - 1; ok = 1 + 2; bad = s < 3;'))
+    assert len(report.errors) == 2
+    assert report.errors[0].startswith("TypeError: unsupported operand types for -")
+    with pytest.raises(Exception):
+        Program('s = "a"; n = s - 1;', optimize=1, strict=True)
+
+@pytest.mark.parametrize("source", [
+    'x = true + true;',
+    'x = "ab" * true + "!";',
+    'x = 3 * "xy";',
+    'x = -true; y = not 0;',
+    'a = 1; b = 2.5; x = a / b * (a - b);',
+    'x = 1 / (2 - 2);',
+    'x = "b" < "a"; y = 1 == "1";',
+])
+def test_fast_paths_match_checked_paths(source):
+    def outcome(optimize):
+        try:
+            return Program(source, optimize=optimize).run().variables
+        except Exception as e:
+            return str(e)
+    assert outcome(1) == outcome(0)
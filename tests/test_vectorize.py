@@ -0,0 +1,70 @@
+#Vectorized evaluation of one expression over columns
+
+from src.vectorize import evaluate_columns, parse_expression, _evaluate_rows, _Vectorizer
+import pytest
+
+def per_row(source, columns):
+    # Reference result: one Interpreter.visit per row
+    expr = parse_expression(source)
+    length = len(next(iter(columns.values())))
+    try:
+        return _evaluate_rows(expr, columns, length)
+    except Exception as e:
+        return str(e)
+
+def vectorized(source, columns, chunk_size=4):
+    try:
+        return evaluate_columns(source, columns, chunk_size=chunk_size)
+    except Exception as e:
+        return str(e)
+
+COLUMNS = {
+    'price': [1.5, 2.0, 10.25, 0.5, 3.0, 7.75, 1.0, 2.5, 4.0, 9.0],
+    'qty': [3, 0, 2, 10, 1, 4, 7, 0, 5, 2],
+    'region': ["EU", "US", "EU", "EU", "APAC", "US", "EU", "EU", "US", "EU"],
+    'flag': [True, False, True, True, False, False, True, False, True, True],
+}
+
+@pytest.mark.parametrize("source", [
+    'price * qty > 10 and region == "EU"',
+    'qty + flag * 2 - -qty',
+    'not flag or qty >= 5',
+    'region + "-" + region',
+    'region * qty',
+    '(price - 1) / 2 <= qty',
+    '1 + 2 * 3',
+])
+def test_matches_per_row_evaluation(source):
+    expected = per_row(source, COLUMNS)
+    assert not isinstance(expected, str)
+    assert vectorized(source, COLUMNS) == expected
+    assert vectorized(source, COLUMNS, chunk_size=1000) == expected
+
+@pytest.mark.parametrize("source, columns", [
+    # A zero divisor in the third chunk
+    ('price / qty', COLUMNS),
+    # Type errors only on some rows
+    ('qty + mixed', {'qty': [1, 2, 3, 4, 5], 'mixed': [1, 2.5, "x", 4, True]}),
+    ('a < b', {'a': [1, 2, 3], 'b': [2, 1, "3"]}),
+    ('-s', {'s': ["a"]}),
+    ('missing + 1', {'qty': [1, 2]}),
+])
+def test_errors_match_per_row_evaluation(source, columns):
+    expected = per_row(source, columns)
+    assert isinstance(expected, str)
+    assert vectorized(source, columns) == expected
+
+def test_mixed_numeric_and_big_ints():
+    columns = {'a': [1, 2.5, 2 ** 70, True], 'b': [3, 4, 5, 2 ** 64]}
+    for source in ('a * b', 'a + b > b', 'b / 2'):
+        assert vectorized(source, columns) == per_row(source, columns)
+
+def test_column_lengths_must_match():
+    with pytest.raises(Exception, match="same length"):
+        evaluate_columns('a + b', {'a': [1, 2], 'b': [1]})
+
+def test_clean_columns_stay_vectorized():
+    # No per-row fallback is needed when every row is well typed
+    expr = parse_expression('price * qty > 10 and region == "EU" or not flag')
+    column = _Vectorizer(COLUMNS, 10).column(expr)
+    assert list(column.items(10)) == per_row('price * qty > 10 and region == "EU" or not flag', COLUMNS)